@@ -5,6 +5,7 @@ from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.resources import Resource
 from opentelemetry import trace
 from functools import lru_cache
+from typing import Literal
 
 
 class Settings(BaseSettings):
@@ -21,6 +22,93 @@ class Settings(BaseSettings):
     frontend_url: str = "https://jaeger.biscuitbobby.eu.org" # "http://localhost:5173"
     temp_dir: str = "temp"
     host: str = "https://gateway.biscuitbobby.eu.org" # "http://localhost:8000"
+
+    # max number of scanner model requests in flight
+    scan_concurrency: int = 16
+    # scan tools/call input alongside the upstream call instead of after it
+    concurrent_input_scan: bool = False
+    # verdict cache for repeated tool inputs/outputs (0 disables it)
+    scan_cache_size: int = 10_000
+    scan_cache_ttl: float = 3600.0
+
+    # scanner tiers, cheapest first. "local" is opt-in: it applies each
+    # policy's local_rules / local_allow regexes and escalates everything else
+    scan_tiers: list[str] = ["llm"]
+    local_max_chars: int = 20_000  # larger texts always escalate
+
+    # micro-batching of llm scans that share a policy set (1 disables it)
+    scan_batch_size: int = 1
+    scan_batch_delay_ms: float = 5.0
+
+    # write-behind persistence of scan results
+    scan_write_batch: int = 200  # max records per transaction
+    scan_write_interval_ms: float = 50.0  # max time a record waits to be flushed
+    scan_write_queue: int = 10_000  # queued records before scans wait on the writer
+
+    # "inprocess" dispatches /v1/{alias} to sub-proxy apps inside the gateway;
+    # "multiplex" serves every sub-proxy from one uvicorn server by path;
+    # "port" runs each sub-proxy on its own uvicorn server for isolation;
+    # "workers" spreads them over sub_proxy_workers processes, one loop each
+    sub_proxy_mode: Literal["inprocess", "multiplex", "port", "workers"] = "inprocess"
+    # multiplex server port (0 = kernel-assigned); port and workers mode
+    # servers always bind kernel-assigned ports, recorded in the route table
+    sub_proxy_port: int = 8001
+    sub_proxy_workers: int = 0  # 0 = one worker per CPU
+    # start sub-proxies on their first /v1/{alias} request instead of at boot,
+    # and stop them after sub_proxy_idle_timeout seconds unused (0 = never)
+    sub_proxy_lazy: bool = False
+    sub_proxy_idle_timeout: float = 600.0
+    # how long a reloaded alias's old sub-proxy may finish in-flight requests
+    sub_proxy_drain_timeout: float = 30.0
+    # largest request body /v1/{alias} will forward; bigger ones get a 413
+    max_request_body: int = 100 * 1024 * 1024
+
+    # per-alias upstream pool defaults; an alias's "pool" entry in
+    # config.json overrides any of them
+    pool_max_connections: int = 100
+    pool_max_keepalive: int = 20
+    pool_keepalive_expiry: float = 30.0
+    pool_timeout: float = 10.0  # seconds a request may wait for a free slot
+    pool_http2: bool = False
+
+    # gateway cache for idempotent MCP methods, seconds per method (0 = off);
+    # an alias's "cache" entry in config.json overrides these per method
+    response_cache_ttl: dict[str, float] = {
+        "tools/list": 30.0,
+        "prompts/list": 30.0,
+        "resources/list": 30.0,
+        "resources/templates/list": 30.0,
+        "resources/read": 10.0,
+    }
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # per-alias admission control; an alias's "limits" entry in config.json
+    # overrides any of them
+    admission_max_concurrency: int = 64  # calls in flight per alias
+    admission_max_queue: int = 256  # waiting calls before 429s
+    admission_queue_timeout: float = 5.0  # seconds in queue before a 503
+    admission_adaptive: bool = False  # AIMD the limit against upstream latency
+    admission_min_concurrency: int = 4
+    admission_target_latency_ms: float = 1000.0
+
+    # circuit breakers per alias, fed by request outcomes and active probes
+    breaker_window: int = 20  # recent calls the error rate is taken over
+    breaker_min_calls: int = 5  # calls in the window before it can trip
+    breaker_failure_rate: float = 0.5
+    breaker_slow_call_ms: float = 30_000.0  # slower calls count as failures
+    breaker_open_seconds: float = 15.0  # fail fast this long before a trial call
+    health_probe_interval: float = 10.0
+    health_probe_timeout: float = 2.0
+
+    # /inventory listings: refreshed in the background after inventory_ttl
+    # (served stale meanwhile); failed listings are retried after
+    # inventory_error_ttl; a listing taking over inventory_timeout fails
+    inventory_ttl: float = 60.0
+    inventory_error_ttl: float = 5.0
+    inventory_timeout: float = 10.0
+
+    # how often the policy store checks the policy files for external edits
+    policy_poll_interval: float = 2.0
     # database_url: str
 
 
@@ -4,9 +4,29 @@ from fastmcp.utilities.lifespan import combine_lifespans
 from src.analyzer.urls import router as analyzer_router
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from src.gateway.urls import router as gateway_router
+from src.gateway.pools import PoolExhausted, upstream_pools
+from src.gateway.admission import Rejected, admission
+from src.gateway.inventory import inventory
+from src.gateway.health import health
+from src.gateway.singleflight import http_inflight, rewrite_jsonrpc_id
+from src.gateway.cache import (
+    IDEMPOTENT_METHODS,
+    auth_identity,
+    params_hash,
+)
+from src.analyzer.writer import scan_writer
+from src.analyzer.models import run_migrations
 from src.policies.urls import router as policy_router
-from src.sub_proxy.test import ServerRoutes, run_all
+from src.sub_proxy.test import (
+    ServerRoutes,
+    ensure_started,
+    get_app,
+    is_running,
+    run_all,
+)
+from src.sub_proxy.workers import worker_pool
 from src.oauth.urls import router as oauth_router
 from contextlib import asynccontextmanager
 from src.gateway.views import mcp
@@ -14,37 +34,34 @@ import uvicorn
 import asyncio
 import httpx
 import logging
+import json
+import time
 
 logger = logging.getLogger(__name__)
 
 routes = ServerRoutes()
-# Set reasonable timeouts to prevent hanging connections
-# None for read timeout allows long-running streams, but connect/write have limits
-TIMEOUT = httpx.Timeout(
-    connect=10.0,  # 10 seconds to establish connection
-    read=None,     # No timeout for reading (allows streaming)
-    write=30.0,    # 30 seconds to write request
-    pool=10.0      # 10 seconds to get connection from pool
-)
 mcp_app = mcp.http_app(path="/")
 
-# Shared client — created once, reused across requests, properly closed on shutdown
-_http_client: httpx.AsyncClient | None = None
-
-
-def get_http_client() -> httpx.AsyncClient:
-    return _http_client
-
 
 @asynccontextmanager
 async def app_lifespan(app):
-    global _http_client
-    _http_client = httpx.AsyncClient(timeout=TIMEOUT)
+    # Backfills can take a while on a big scan.db; keep them off the loop
+    await asyncio.to_thread(run_migrations)
+    scan_writer.start()
+    health.start()
+    inventory.start(mcp, is_running)
     asyncio.create_task(run_all())
     try:
         yield
     finally:
-        await _http_client.aclose()
+        # per-alias upstream clients, see src/gateway/pools.py
+        await upstream_pools.aclose()
+        await worker_pool.aclose()
+        await inventory.stop()
+        await health.stop()
+        await routes.flush()
+        # flush queued scan results before the process exits
+        await scan_writer.drain()
 
 
 app = FastAPI(
@@ -61,38 +78,397 @@ app.add_middleware(
 
 # Headers that must not be forwarded downstream as-is
 _HOP_BY_HOP = frozenset(
-    {"transfer-encoding", "content-encoding", "content-length", "connection",
-     "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
-     "upgrade"}
+    {
+        "transfer-encoding",
+        "content-encoding",
+        "content-length",
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailers",
+        "upgrade",
+    }
 )
 
 
+# Request headers that describe the client connection, not the body
+_REQUEST_HOP_BY_HOP = frozenset(
+    {
+        "host",
+        "connection",
+        "keep-alive",
+        "te",
+        "trailers",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+
+
+def check_content_length(request: Request, limit: int):
+    """Reject a declared oversized body before reading any of it."""
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail="Request body too large")
+
+
+async def limited_body(request: Request, limit: int):
+    """Yield the request body chunk by chunk, stopping with a 413 past `limit`."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise HTTPException(status_code=413, detail="Request body too large")
+        yield chunk
+
+
+# Small idempotent JSON-RPC requests are read up front so identical ones can
+# share an upstream call; anything bigger streams through untouched
+COALESCE_MAX_BODY = 64 * 1024
+
+
+def sub_app_scope(scope, path: str) -> dict:
+    sub_scope = dict(scope)
+    sub_scope.update(
+        path=path,
+        raw_path=path.encode(),
+        root_path="",
+        path_params={},
+    )
+    return sub_scope
+
+
+def replay_receive(body: bytes, receive=None):
+    """A receive channel that yields an already-read body, then `receive`."""
+    sent = False
+
+    async def _receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        if receive is None:
+            await asyncio.Event().wait()  # never disconnects
+        return await receive()
+
+    return _receive
+
+
+class ASGIDispatch(Response):
+    """
+    Hands the request straight to an in-process sub-proxy app: no loopback
+    socket, no second HTTP parse. The body was already read (and its size
+    checked) by proxy_alias; the sub-app gets it replayed from `receive` and
+    streams its response through `send`.
+    """
+
+    def __init__(self, app, path: str, body: bytes, on_done=None):
+        self.app = app
+        self.path = path
+        self.body = body
+        self.on_done = on_done
+        self.background = None
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(
+                sub_app_scope(scope, self.path),
+                replay_receive(self.body, receive),
+                send,
+            )
+        finally:
+            if self.on_done is not None:
+                self.on_done()
+
+
+def unavailable(breaker) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Upstream unavailable: {breaker.reason}",
+        headers={"Retry-After": str(breaker.retry_after())},
+    )
+
+
+def check_circuits(alias: str, inprocess: bool):
+    """Fail fast while the alias's upstream or sub-proxy port is known down."""
+    targets = ("upstream",) if inprocess else ("upstream", "sub_proxy")
+    for target in targets:
+        breaker = health.breaker(alias, target)
+        if breaker.is_open():
+            raise unavailable(breaker)
+
+
+async def send_to_port(
+    alias: str, client: httpx.AsyncClient, request: httpx.Request, **kwargs
+):
+    """client.send() through the sub-proxy port's breaker, recording the outcome."""
+    breaker = health.breaker(alias, "sub_proxy")
+    if not breaker.allow():
+        raise unavailable(breaker)
+
+    start = time.perf_counter()
+    try:
+        response = await client.send(request, **kwargs)
+    except httpx.RequestError as exc:
+        breaker.record(False, (time.perf_counter() - start) * 1000, repr(exc))
+        raise
+    except BaseException:
+        breaker.abandon_trial()
+        raise
+
+    breaker.record(response.status_code < 500, (time.perf_counter() - start) * 1000)
+    return response
+
+
+async def admit(alias: str, request: Request):
+    """
+    Queue for the alias's "http" admission gate, then take a pool slot.
+    Returns the pool and a release() to call once the response is done.
+    GET is the long-lived SSE notification stream, so it only takes a pool
+    slot: it would pin an admission slot and skew latency for its lifetime.
+    """
+    limiter, started = None, None
+    if request.method != "GET":
+        limiter = admission.get(alias, "http")
+        try:
+            started = await limiter.acquire()
+        except Rejected as e:
+            raise HTTPException(
+                status_code=e.status,
+                detail=e.reason,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    pool = upstream_pools.get(alias)
+    try:
+        await pool.acquire()
+    except BaseException as e:
+        if limiter is not None:
+            limiter.release(started)
+        if isinstance(e, PoolExhausted):
+            raise HTTPException(
+                status_code=503,
+                detail="Upstream pool exhausted",
+                headers={"Retry-After": "1"},
+            )
+        raise
+
+    def release():
+        pool.release()
+        if limiter is not None:
+            limiter.release(started)
+
+    return pool, release
+
+
+async def read_idempotent(request: Request):
+    """
+    (body, message) for a small POST; `message` is the JSON-RPC request when
+    it is a single idempotent call that can be coalesced, else None.
+    (None, None) when the body should stream through unread.
+    """
+    length = request.headers.get("content-length", "")
+    if (
+        request.method != "POST"
+        or not length.isdigit()
+        or int(length) > COALESCE_MAX_BODY
+    ):
+        return None, None
+
+    body = await request.body()
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return body, None
+
+    if (
+        isinstance(message, dict)
+        and message.get("method") in IDEMPOTENT_METHODS
+        and message.get("id") is not None
+    ):
+        return body, message
+    return body, None
+
+
+async def fetch_buffered(
+    alias: str, request: Request, body: bytes, target_url: str | None
+):
+    """
+    Run one request to the alias and buffer the whole response, so it can be
+    handed to every coalesced caller. Not tied to the caller's connection.
+    """
+    pool, release = await admit(alias, request)
+    try:
+        if target_url is None:
+            status, raw_headers, chunks = 500, [], []
+
+            async def capture(message):
+                nonlocal status, raw_headers
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    raw_headers = message.get("headers", [])
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await get_app(alias)(
+                sub_app_scope(request.scope, f"/v1/{alias}/"),
+                replay_receive(body),
+                capture,
+            )
+            headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in raw_headers}
+            content = b"".join(chunks)
+        else:
+            headers = {
+                k: v
+                for k, v in request.headers.items()
+                if k.lower() not in _REQUEST_HOP_BY_HOP
+            }
+            forwarded_request = pool.client.build_request(
+                request.method,
+                target_url,
+                headers=headers,
+                content=body,
+                params=request.query_params,
+            )
+            try:
+                response = await send_to_port(alias, pool.client, forwarded_request)
+            except httpx.RequestError as exc:
+                logger.error("Upstream request failed for alias=%s: %s", alias, exc)
+                raise HTTPException(
+                    status_code=502, detail="Upstream unreachable"
+                ) from exc
+            status, headers, content = (
+                response.status_code,
+                dict(response.headers),
+                response.content,
+            )
+    finally:
+        release()
+
+    safe_headers = {k: v for k, v in headers.items() if k.lower() not in _HOP_BY_HOP}
+    return status, safe_headers, content
+
+
+async def coalesced_call(
+    alias: str, request: Request, body: bytes, message: dict, target_url: str | None
+):
+    """
+    Identical concurrent calls share one upstream request; ids are rewritten.
+    Only a 2xx is shared: if the leader's call fails or gets an error
+    status, the others make their own request rather than copy its error.
+    """
+    key = (
+        alias,
+        message["method"],
+        params_hash(message.get("params")),
+        auth_identity(request.headers),
+        request.headers.get("accept", ""),
+    )
+    led = False
+
+    async def lead():
+        nonlocal led
+        led = True
+        return await fetch_buffered(alias, request, body, target_url)
+
+    try:
+        status, headers, content = await http_inflight.do(key, lead)
+    except Exception:
+        if led:
+            raise
+        status = None
+
+    if not led:
+        if status is None or not 200 <= status < 300:
+            status, headers, content = await fetch_buffered(
+                alias, request, body, target_url
+            )
+        else:
+            content = rewrite_jsonrpc_id(
+                content, headers.get("content-type", ""), message["id"]
+            )
+            # The session header belongs to the caller that made the real request
+            headers = {
+                k: v for k, v in headers.items() if k.lower() != "mcp-session-id"
+            }
+
+    return Response(content=content, status_code=status, headers=headers)
+
+
 @app.api_route("/v1/{alias}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_alias(alias: str, request: Request):
-    sd = routes.all()
-    print(sd)
-    if alias not in sd:
-        raise HTTPException(status_code=404, detail="Alias not found")
+    max_body = settings.max_request_body
+    check_content_length(request, max_body)
+
+    if settings.sub_proxy_lazy:
+        # First request to a sleeping alias starts it; others wait on the same start
+        try:
+            entry = await ensure_started(alias)
+        except Exception as e:
+            print(f"Failed to start proxy '{alias}': {e}")
+            raise HTTPException(status_code=502, detail="Failed to start alias")
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Alias not found")
 
-    port = sd[alias]
-    target_url = f"http://localhost:{port}/v1/{alias}/"
+    inprocess = settings.sub_proxy_mode == "inprocess"
+    if inprocess:
+        sub_app = get_app(alias)
+        if sub_app is None:
+            raise HTTPException(status_code=404, detail="Alias not found")
+        target_url = None
+    else:
+        port = routes.get(alias)
+        if port is None:
+            raise HTTPException(status_code=404, detail="Alias not found")
+        target_url = f"http://localhost:{port}/v1/{alias}/"
 
-    headers = {k: v for k, v in request.headers.items() if k.lower() != "host"}
-    client = get_http_client()
+    check_circuits(alias, inprocess)
 
+    body, message = await read_idempotent(request)
+    if message is not None:
+        return await coalesced_call(alias, request, body, message, target_url)
+
+    if inprocess:
+        if body is None:
+            # The MCP app reads whole bodies anyway. Reading it here turns an
+            # oversized one into a clean 413 instead of a disconnect mid-read
+            body = b"".join([chunk async for chunk in limited_body(request, max_body)])
+        _, release = await admit(alias, request)
+        return ASGIDispatch(sub_app, f"/v1/{alias}/", body, on_done=release)
+
+    pool, release = await admit(alias, request)
+    headers = {
+        k: v for k, v in request.headers.items() if k.lower() not in _REQUEST_HOP_BY_HOP
+    }
+    client = pool.client
+
+    # Stream the body upstream as it arrives instead of buffering it here
+    has_body = (
+        "content-length" in request.headers or "transfer-encoding" in request.headers
+    )
+    if body is None and has_body:
+        body = limited_body(request, max_body)
     forwarded_request = client.build_request(
         request.method,
         target_url,
         headers=headers,
-        content=await request.body(),
+        content=body,
         params=request.query_params,
     )
 
     try:
-        response = await client.send(forwarded_request, follow_redirects=False, stream=True)
+        response = await send_to_port(
+            alias, client, forwarded_request, follow_redirects=False, stream=True
+        )
     except httpx.RequestError as exc:
+        release()
         logger.error("Upstream request failed for alias=%s: %s", alias, exc)
         raise HTTPException(status_code=502, detail="Upstream unreachable") from exc
+    except BaseException:
+        release()
+        raise
 
     content_type = response.headers.get("content-type", "")
     # Only treat as streaming when the upstream explicitly says so — not just because
@@ -103,11 +479,11 @@ async def proxy_alias(alias: str, request: Request):
     )
 
     safe_headers = {
-        k: v for k, v in response.headers.items()
-        if k.lower() not in _HOP_BY_HOP
+        k: v for k, v in response.headers.items() if k.lower() not in _HOP_BY_HOP
     }
 
     if is_streaming:
+
         async def stream_generator():
             try:
                 async for chunk in response.aiter_bytes():
@@ -119,15 +495,23 @@ async def proxy_alias(alias: str, request: Request):
                     "Upstream closed stream early for alias=%s: %s", alias, exc
                 )
             except Exception as exc:
-                logger.error("Unexpected error while streaming alias=%s: %s", alias, exc)
+                logger.error(
+                    "Unexpected error while streaming alias=%s: %s", alias, exc
+                )
             finally:
                 await response.aclose()
 
+        async def finish():
+            # Runs even if the client left before the generator started
+            await response.aclose()
+            release()
+
         return StreamingResponse(
             stream_generator(),
             status_code=response.status_code,
             headers=safe_headers,
             media_type=content_type,
+            background=BackgroundTask(finish),
         )
 
     # Non-streaming: buffer the full response body before returning
@@ -135,9 +519,12 @@ async def proxy_alias(alias: str, request: Request):
         content = await response.aread()
     except (httpx.RemoteProtocolError, httpx.ReadError) as exc:
         logger.error("Failed to read upstream response for alias=%s: %s", alias, exc)
-        raise HTTPException(status_code=502, detail="Upstream closed connection early") from exc
+        raise HTTPException(
+            status_code=502, detail="Upstream closed connection early"
+        ) from exc
     finally:
         await response.aclose()
+        release()
 
     return Response(
         content=content,
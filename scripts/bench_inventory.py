@@ -0,0 +1,113 @@
+"""
+/inventory latency: listing every alias on demand (what the first request
+after an add or delete used to wait for) against rendering the in-memory
+inventory cache, fresh and stale.
+
+Aliases are stand-in proxies whose list_* calls take --upstream-ms and
+return --tools tools each, so only the gateway side is measured.
+
+    python -m scripts.bench_inventory --aliases 50 --tools 20 --upstream-ms 200
+"""
+
+from pathlib import Path
+import statistics
+import tempfile
+import argparse
+import asyncio
+import time
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRATCH = tempfile.mkdtemp(prefix="bench-inventory-")
+os.chdir(SCRATCH)
+os.makedirs("temp", exist_ok=True)
+Path("config.json").write_text("{}")
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+from config import settings  # noqa: E402  (always import first, for telemetry)
+from src.gateway.inventory import inventory  # noqa: E402
+from src.gateway.models import proxy_info  # noqa: E402
+from mcp.types import Tool  # noqa: E402
+
+
+class SlowProxy:
+    def __init__(self, alias: str, tools: int, delay: float):
+        self.alias = alias
+        self.delay = delay
+        self.tools = [
+            Tool(
+                name=f"{alias}_tool_{i}",
+                description=f"Tool {i} of {alias}",
+                inputSchema={
+                    "type": "object",
+                    "properties": {"text": {"type": "string"}},
+                },
+            )
+            for i in range(tools)
+        ]
+
+    async def list_tools(self):
+        await asyncio.sleep(self.delay)
+        return self.tools
+
+    async def list_prompts(self):
+        await asyncio.sleep(self.delay)
+        return []
+
+    async def list_resources(self):
+        await asyncio.sleep(self.delay)
+        return []
+
+    def __str__(self):
+        return f"SlowProxy({self.alias})"
+
+
+def timed(fn, n: int) -> float:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def run(aliases: int, tools: int, delay: float, n: int):
+    proxies = [SlowProxy(f"alias_{i}", tools, delay) for i in range(aliases)]
+    extra = lambda alias: {"health": {}}  # noqa: E731
+
+    start = time.perf_counter()
+    await asyncio.gather(*(proxy_info(p) for p in proxies))
+    on_demand = (time.perf_counter() - start) * 1000
+
+    inventory.revalidate(proxies)
+    while inventory.stats()["aliases"] < aliases:
+        await asyncio.sleep(0.01)
+    fresh = timed(lambda: inventory.render(proxies, extra), n)
+
+    settings.inventory_ttl = 0  # everything stale: served while refetched
+    stale = timed(lambda: inventory.render(proxies, extra), n)
+    await inventory.stop()
+
+    size = len(inventory.render(proxies, extra))
+    print(
+        f"{aliases} aliases x {tools} tools, upstream {delay * 1000:.0f} ms, {size} bytes"
+    )
+    print(f"  on demand (cold):  {on_demand:9.2f} ms")
+    print(f"  cache, fresh:      {fresh:9.3f} ms")
+    print(f"  cache, stale:      {stale:9.3f} ms")
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aliases", type=int, default=50)
+    parser.add_argument("--tools", type=int, default=20)
+    parser.add_argument("--upstream-ms", type=float, default=200.0)
+    parser.add_argument("--renders", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.aliases, args.tools, args.upstream_ms / 1000, args.renders))
+
+
+if __name__ == "__main__":
+    main_()
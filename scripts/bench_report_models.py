@@ -0,0 +1,73 @@
+"""
+Per-scan CPU and allocation cost of building the structured-output scanner.
+
+"rebuild" is what every scan used to do: a new Enum + Report class and a new
+with_structured_output() runnable. "registry" goes through make_report and
+structured_runnable, which build them once per policy set.
+
+    python -m scripts.bench_report_models --scans 200
+"""
+
+from langchain_openai import ChatOpenAI
+from src.analyzer.models import (
+    _build_report,
+    clear_report_registry,
+    make_report,
+    structured_runnable,
+)
+import tracemalloc
+import argparse
+import time
+
+
+def policies(n: int) -> dict:
+    return {f"policy_{i}": f"Description of threat number {i}." for i in range(n)}
+
+
+def rebuild(model, active):
+    return model.with_structured_output(_build_report(active))
+
+
+def registry(model, active):
+    return structured_runnable(model, make_report(active))
+
+
+def measure(fn, model, active, scans):
+    tracemalloc.start()
+    start = time.process_time()
+    for _ in range(scans):
+        fn(model, active)
+    cpu = time.process_time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size for stat in snapshot.statistics("filename"))
+    return cpu / scans * 1e6, allocated / scans, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--policies", type=int, nargs="+", default=[10, 25, 50])
+    args = parser.parse_args()
+
+    # Nothing is sent: building the runnable never touches the network
+    model = ChatOpenAI(api_key="bench", base_url="http://localhost:1", model="bench")
+
+    print(
+        f"{'policies':>8} {'mode':>9} {'cpu/scan':>12} {'retained/scan':>14} {'peak':>10}"
+    )
+    for n in args.policies:
+        active = policies(n)
+        for name, fn in (("rebuild", rebuild), ("registry", registry)):
+            clear_report_registry()
+            cpu, retained, peak = measure(fn, model, active, args.scans)
+            print(
+                f"{n:>8} {name:>9} {cpu:>9.1f} us {retained / 1024:>11.1f} KB "
+                f"{peak / 1024:>7.1f} KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
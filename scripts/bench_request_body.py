@@ -0,0 +1,145 @@
+"""
+Peak gateway memory while forwarding large request bodies in port mode.
+
+"buffered" forwards the way proxy_alias used to, reading the whole body
+with request.body() before sending it upstream. "streamed" is the current
+proxy_alias, which passes request.stream() through to the upstream. Each
+run happens in a fresh process so ru_maxrss is that run's own peak; the
+client and the upstream sink both stream, so the growth over the baseline
+is what the gateway held.
+
+    python -m scripts.bench_request_body --sizes 1 10 50 100
+"""
+
+from pathlib import Path
+import subprocess
+import tempfile
+import argparse
+import resource
+import asyncio
+import socket
+import json
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+CHUNK = b"x" * (1024 * 1024)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def child(mode: str, size_mb: int) -> dict:
+    os.chdir(tempfile.mkdtemp(prefix="bench-body-"))
+    os.makedirs("temp", exist_ok=True)
+    Path("config.json").write_text("{}")
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+    from config import settings  # always import first for telemetry
+    from starlette.responses import JSONResponse
+    from starlette.applications import Starlette
+    from fastapi import Request, Response
+    from starlette.routing import Route
+    import uvicorn
+    import httpx
+
+    import main
+
+    settings.sub_proxy_mode = "port"
+    settings.max_request_body = (size_mb + 1) * 1024 * 1024
+
+    async def sink(request):
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+        return JSONResponse({"received": received})
+
+    upstream = Starlette(routes=[Route("/v1/bench/", sink, methods=["POST"])])
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(upstream, host="127.0.0.1", port=port, log_level="warning")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    main.routes.add("bench", port)
+
+    @main.app.post("/bench/buffered/{alias}")
+    async def buffered(alias: str, request: Request):
+        client = main.upstream_pools.get(alias).client
+        r = await client.post(
+            f"http://localhost:{port}/v1/{alias}/", content=await request.body()
+        )
+        return Response(r.content, status_code=r.status_code)
+
+    path = "/v1/bench" if mode == "streamed" else "/bench/buffered/bench"
+
+    async def body():
+        for _ in range(size_mb):
+            yield CHUNK
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://gw", timeout=None
+    ) as client:
+        await client.post(path, content=b"{}")  # warm up imports and pools
+        baseline = peak_rss_mb()
+        r = await client.post(
+            path,
+            content=body(),
+            headers={"content-length": str(size_mb * len(CHUNK))},
+        )
+        r.raise_for_status()
+        peak = peak_rss_mb()
+
+    await main.upstream_pools.aclose()
+    server.should_exit = True
+    await task
+    return {"baseline_mb": baseline, "peak_mb": peak, "growth_mb": peak - baseline}
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "SIZE_MB"))
+    args = parser.parse_args()
+
+    if args.child:
+        mode, size = args.child
+        print(json.dumps(asyncio.run(child(mode, int(size)))))
+        return
+
+    print(f"{'body':>7} {'mode':>9} {'baseline':>10} {'peak':>10} {'growth':>10}")
+    for size in args.sizes:
+        for mode in ("buffered", "streamed"):
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "scripts.bench_request_body",
+                    "--child",
+                    mode,
+                    str(size),
+                ],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(
+                f"{size:>4} MB {mode:>9} {r['baseline_mb']:>7.1f} MB "
+                f"{r['peak_mb']:>7.1f} MB {r['growth_mb']:>7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main_()
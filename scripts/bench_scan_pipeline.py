@@ -0,0 +1,162 @@
+"""
+Throughput of LoggingMiddleware with N concurrent tools/call requests.
+
+Compares the old blocking scan path (sync model call + sync sqlite write on
+the event loop) against the async dynamic_scan. The scanner model and the
+database are replaced by fakes with fixed latencies so the numbers only
+reflect how the gateway schedules the work.
+
+    python -m scripts.bench_scan_pipeline --requests 64 --model-latency 0.2
+"""
+
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+from config import settings  # always import first for telemetry
+from opentelemetry import trace
+from types import SimpleNamespace
+import argparse
+import asyncio
+import time
+
+from src.policies.models import PolicySnapshot
+from src.analyzer.tiers import build_scanner
+from src.analyzer import filters, writer
+from src.gateway import middleware
+from src.gateway.middleware import LoggingMiddleware
+
+tracer = trace.get_tracer("bench.scan_pipeline")
+
+
+class FakeReport:
+    threat = False
+    rating = 0.0
+    category = None
+    description = ""
+
+    def model_dump(self):
+        return {"threat": False, "rating": 0.0, "category": None, "description": ""}
+
+
+class FakeStructuredModel:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return FakeReport()
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return FakeReport()
+
+
+class FakeModel:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def with_structured_output(self, schema):
+        return FakeStructuredModel(self.latency)
+
+
+def blocking_scan_factory(model, db_latency):
+    """The pre-async dynamic_scan: model call and database write on the event loop."""
+
+    async def blocking_scan(logger, traceparent, text_type, text, server_alias):
+        structured = model.with_structured_output(None)
+        ai_msg = structured.invoke([("human", str(text))])
+        time.sleep(db_latency)
+        return filters.ScanSuccess(result=ai_msg)
+
+    return blocking_scan
+
+
+def fake_store_factory(db_latency):
+    def fake_store_many(records):
+        time.sleep(db_latency)
+
+    return fake_store_many
+
+
+async def tools_call(mw, tool_latency):
+    async def call_next(context):
+        await asyncio.sleep(tool_latency)
+        return SimpleNamespace(meta={}, content="ok", structured_content=None)
+
+    context = SimpleNamespace(
+        method="tools/call",
+        message=SimpleNamespace(meta={}, name="echo", arguments={"x": 1}),
+    )
+    with tracer.start_as_current_span("tools/call"):
+        await mw.on_message(context, call_next)
+
+
+async def loop_lag_probe(stop: asyncio.Event, interval=0.01):
+    """Worst observed delay of a 10 ms timer: what other traffic would feel."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(n, tool_latency):
+    mw = LoggingMiddleware("bench")
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(tools_call(mw, tool_latency) for _ in range(n)))
+    elapsed = time.perf_counter() - start
+
+    await writer.scan_writer.drain()
+    stop.set()
+    return elapsed, await probe
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    parser.add_argument("--tool-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    fake_model = FakeModel(args.model_latency)
+    # llm tier only: the benchmark is about scheduling, not local pre-filtering
+    filters.scanner = build_scanner(["llm"], fake_model)
+    snapshot = PolicySnapshot(
+        1,
+        {"prompt_injection": "bench policy"},
+        {"bench": ("prompt_injection",)},
+        {"prompt_injection": 1},
+    )
+    filters.policy_store = SimpleNamespace(snapshot=lambda: snapshot)
+    writer.scan_writer.sink = fake_store_factory(args.db_latency)
+    # every request carries the same arguments; don't let cache hits skew it
+    filters.verdict_cache.max_entries = 0
+
+    async_scan = middleware.dynamic_scan
+    modes = {
+        "blocking": blocking_scan_factory(fake_model, args.db_latency),
+        "async": async_scan,
+    }
+
+    print(
+        f"{args.requests} concurrent tools/call, model={args.model_latency}s "
+        f"db={args.db_latency}s tool={args.tool_latency}s "
+        f"scan_concurrency={settings.scan_concurrency}"
+    )
+    for name, scan in modes.items():
+        middleware.dynamic_scan = scan
+        elapsed, lag = asyncio.run(run(args.requests, args.tool_latency))
+        print(
+            f"{name:>9}: {elapsed:7.2f}s  {args.requests / elapsed:8.1f} req/s  "
+            f"max loop lag {lag * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Memory of N aliases served on both surfaces: the /mcp server and a
+per-alias sub-proxy.
+
+"separate" is the old layout: each surface builds its own proxy with
+create_proxy(), so every alias has two upstream clients and, for stdio
+upstreams, two server subprocesses. "shared" goes through mount_proxy(),
+where both surfaces mount one reference-counted upstream.
+
+Every alias points at a small stdio MCP server (this script with --serve).
+After one tools/list through each surface, the script reports the RSS of
+the whole process tree (gateway plus upstream subprocesses) and the number
+of upstream processes. Each mode runs in a fresh process.
+
+    python -m scripts.bench_shared_upstream --aliases 50
+"""
+
+from pathlib import Path
+import subprocess
+import tempfile
+import argparse
+import asyncio
+import json
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def serve():
+    from fastmcp import FastMCP
+
+    def echo(text: str) -> str:
+        return text
+
+    server = FastMCP("bench-upstream")
+    for i in range(20):
+        server.tool(echo, name=f"tool_{i}", description=f"Echo tool {i}")
+    server.run(transport="stdio", show_banner=False)
+
+
+def tree_rss_mb(pid: int) -> tuple[float, int]:
+    """RSS of `pid` and all its descendants, and the descendant count."""
+    total, children, stack = 0, 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                kids = [int(c) for c in f.read().split()]
+        except OSError:
+            continue
+        children += len(kids)
+        stack.extend(kids)
+    return total / 1024 / 1024, children
+
+
+async def child(mode: str, n: int) -> dict:
+    os.chdir(tempfile.mkdtemp(prefix="bench-upstream-"))
+    os.makedirs("temp", exist_ok=True)
+    Path("config.json").write_text("{}")
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+    import config  # noqa: F401  (always import first, for telemetry)
+    from src.gateway.models import mount_proxy
+    from fastmcp.server import create_proxy
+    from fastmcp import FastMCP, Client
+
+    cfg = {
+        "command": sys.executable,
+        "args": ["-m", "scripts.bench_shared_upstream", "--serve"],
+        "cwd": str(ROOT),
+    }
+
+    gateway = FastMCP("gateway")
+    subs = []
+    baseline, _ = tree_rss_mb(os.getpid())
+
+    for i in range(n):
+        alias = f"alias_{i}"
+        sub = FastMCP(alias)
+        if mode == "separate":
+            gateway.mount(create_proxy({alias: cfg}, name=alias), namespace=alias)
+            sub.mount(create_proxy({alias: cfg}, name=alias), namespace=alias)
+        else:
+            await mount_proxy(gateway, alias, cfg)
+            await mount_proxy(sub, alias, cfg)
+        subs.append(sub)
+
+    # One listing through every surface opens the upstream sessions
+    async with Client(gateway) as client:
+        tools = len(await client.list_tools())
+    for sub in subs:
+        async with Client(sub) as client:
+            await client.list_tools()
+
+    rss, processes = tree_rss_mb(os.getpid())
+    return {
+        "tools": tools,
+        "baseline_mb": baseline,
+        "rss_mb": rss,
+        "growth_mb": rss - baseline,
+        "upstream_processes": processes,
+    }
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aliases", type=int, default=50)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--child", metavar="MODE")
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve()
+
+    if args.child:
+        result = asyncio.run(child(args.child, args.aliases))
+        print(json.dumps(result), flush=True)
+        # Leave the upstream subprocesses to die with us
+        os._exit(0)
+
+    print(f"{args.aliases} aliases, mounted on /mcp and on a sub-proxy each")
+    print(f"{'mode':>9} {'tools':>6} {'tree rss':>10} {'growth':>10} {'upstreams':>10}")
+    for mode in ("separate", "shared"):
+        out = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "scripts.bench_shared_upstream",
+                "--child",
+                mode,
+                "--aliases",
+                str(args.aliases),
+            ],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:>9} {r['tools']:>6} {r['rss_mb']:>7.1f} MB "
+            f"{r['growth_mb']:>7.1f} MB {r['upstream_processes']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main_()
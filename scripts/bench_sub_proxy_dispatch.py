@@ -0,0 +1,152 @@
+"""
+Latency and throughput of /v1/{alias} in the two sub-proxy modes.
+
+"port" forwards over loopback HTTP to a uvicorn server per alias (the old
+behaviour); "inprocess" hands the request to the sub-proxy ASGI app
+directly. Both modes serve the same echo app, so the difference is the
+cost of the hop itself.
+
+Run from the repository root; the gateway is imported in a scratch
+directory with an empty config.json so no real upstreams are started.
+
+    python -m scripts.bench_sub_proxy_dispatch --requests 2000 --concurrency 32
+"""
+
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.applications import Starlette
+from starlette.routing import Route
+from pathlib import Path
+import statistics
+import tempfile
+import argparse
+import asyncio
+import socket
+import time
+import uvicorn
+import httpx
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRATCH = tempfile.mkdtemp(prefix="bench-dispatch-")
+os.chdir(SCRATCH)
+os.makedirs("temp", exist_ok=True)
+Path("config.json").write_text("{}")
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+# The gateway reads its config from the scratch directory at import time
+from config import settings  # noqa: E402  (always import first, for telemetry)
+import main  # noqa: E402
+from src.sub_proxy import test as sub_proxy  # noqa: E402
+
+ALIAS = "bench"
+BODY = b'{"jsonrpc":"2.0","id":1,"method":"tools/call","params":{"name":"echo"}}'
+
+
+async def echo(request):
+    body = await request.body()
+    if request.headers.get("accept") == "text/event-stream":
+
+        async def events():
+            for i in range(3):
+                yield f"data: {i}\n\n".encode()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+    return JSONResponse({"jsonrpc": "2.0", "id": 1, "result": {"size": len(body)}})
+
+
+def echo_app():
+    return Starlette(routes=[Route(f"/v1/{ALIAS}/", echo, methods=["GET", "POST"])])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def drive(client, n, concurrency, stream):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+    headers = {"accept": "text/event-stream"} if stream else {}
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            r = await client.post(f"/v1/{ALIAS}", content=BODY, headers=headers)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+async def run_mode(mode, n, concurrency, stream):
+    settings.sub_proxy_mode = mode
+    app = echo_app()
+    server = None
+
+    if mode == "port":
+        port = free_port()
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        main.routes.add(ALIAS, port)
+        sub_proxy._running_servers[ALIAS] = sub_proxy.SubProxy(
+            ALIAS, app, task, port=port, server=server
+        )
+    else:
+        sub_proxy._running_servers[ALIAS] = sub_proxy.SubProxy(
+            ALIAS,
+            app,
+            asyncio.create_task(asyncio.sleep(0)),
+            stop_event=asyncio.Event(),
+        )
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        await drive(client, min(n, 100), concurrency, stream)  # warm up
+        elapsed, latencies = await drive(client, n, concurrency, stream)
+
+    await main.upstream_pools.aclose()
+    sub_proxy._running_servers.pop(ALIAS, None)
+    main.routes.remove(ALIAS)
+    if server is not None:
+        server.should_exit = True
+        await task
+
+    latencies.sort()
+    return {
+        "rps": n / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--stream", action="store_true", help="SSE responses")
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} POST /v1/{ALIAS}, concurrency {args.concurrency}, "
+        f"{'SSE' if args.stream else 'JSON'} responses"
+    )
+    for mode in ("port", "inprocess"):
+        r = asyncio.run(run_mode(mode, args.requests, args.concurrency, args.stream))
+        print(
+            f"{mode:>10}: {r['rps']:8.1f} req/s  p50 {r['p50']:7.2f} ms  "
+            f"p99 {r['p99']:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main_()
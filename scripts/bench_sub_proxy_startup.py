@@ -0,0 +1,145 @@
+"""
+Sub-proxy startup time, RSS and open file descriptors against alias count.
+
+"port" starts one uvicorn server per alias; "multiplex" serves every alias
+from one server by path prefix; "lazy" (multiplex with sub_proxy_lazy)
+starts nothing at boot, and the first-request column is how long ten
+concurrent first requests to one cold alias wait on its shared start. Each (mode, count) runs in a fresh
+process and stops timing once every alias is accepting connections.
+Aliases point at an unused URL: upstreams connect lazily, so nothing is
+dialled. Servers bind kernel-assigned ports; --occupy holds that many
+ports from the old fixed range (8001 up) to show startup doesn't care.
+
+    python -m scripts.bench_sub_proxy_startup --aliases 10 50 100 200 --occupy 50
+"""
+
+from pathlib import Path
+import subprocess
+import tempfile
+import argparse
+import asyncio
+import json
+import time
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+async def child(mode: str, n: int, occupy: int) -> dict:
+    os.chdir(tempfile.mkdtemp(prefix="bench-startup-"))
+    os.makedirs("temp", exist_ok=True)
+    Path("config.json").write_text("{}")
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+    from config import settings  # always import first for telemetry
+    from src.sub_proxy.sockets import bind_socket
+    from src.sub_proxy import test as sub_proxy
+
+    # Other listeners where fixed port allocation would have started
+    held = []
+    for port in range(8001, 8001 + occupy):
+        try:
+            held.append(bind_socket("127.0.0.1", port))
+            held[-1].listen()
+        except OSError:
+            pass
+
+    settings.sub_proxy_mode = "multiplex" if mode == "lazy" else mode
+    settings.sub_proxy_lazy = mode == "lazy"
+    settings.sub_proxy_port = 0
+    cfg = {"url": "http://127.0.0.1:9/mcp"}
+
+    baseline_rss, baseline_fds = rss_mb(), open_fds()
+    start = time.perf_counter()
+
+    if mode == "lazy":
+        sub_proxy._lazy_config.update({f"alias_{i}": cfg for i in range(n)})
+        boot = time.perf_counter() - start
+        boot_rss, boot_fds = rss_mb() - baseline_rss, open_fds() - baseline_fds
+
+        start = time.perf_counter()
+        await asyncio.gather(*(sub_proxy.ensure_started("alias_0") for _ in range(10)))
+        first = time.perf_counter() - start
+
+        await sub_proxy.stop_server("alias_0")
+        return {
+            "startup_s": boot,
+            "rss_growth_mb": boot_rss,
+            "fds": boot_fds,
+            "first_request_ms": first * 1000,
+        }
+
+    # start_server() returns once the alias is accepting connections
+    await asyncio.gather(*(sub_proxy.start_server(f"alias_{i}", cfg) for i in range(n)))
+
+    elapsed = time.perf_counter() - start
+    result = {
+        "startup_s": elapsed,
+        "rss_growth_mb": rss_mb() - baseline_rss,
+        "fds": open_fds() - baseline_fds,
+    }
+
+    await asyncio.gather(
+        *(sub_proxy.stop_server(a) for a in list(sub_proxy._running_servers))
+    )
+    return result
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aliases", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--occupy", type=int, default=0)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "ALIASES"))
+    args = parser.parse_args()
+
+    if args.child:
+        mode, n = args.child
+        result = asyncio.run(child(mode, int(n), args.occupy))
+        print(json.dumps(result), flush=True)
+        return
+
+    print(
+        f"{'aliases':>7} {'mode':>9} {'startup':>10} {'rss growth':>11} "
+        f"{'fds':>6} {'first request':>14}"
+    )
+    for n in args.aliases:
+        for mode in ("port", "multiplex", "lazy"):
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "scripts.bench_sub_proxy_startup",
+                    "--child",
+                    mode,
+                    str(n),
+                    "--occupy",
+                    str(args.occupy),
+                ],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            first = (
+                f"{r['first_request_ms']:>11.0f} ms" if "first_request_ms" in r else ""
+            )
+            print(
+                f"{n:>7} {mode:>9} {r['startup_s'] * 1000:>7.0f} ms "
+                f"{r['rss_growth_mb']:>8.1f} MB {r['fds']:>6} {first:>14}"
+            )
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,150 @@
+"""
+Sub-proxy throughput against the number of worker processes.
+
+Each run starts the aliases in sub_proxy_mode="workers" with a given worker
+count (1 is the single-loop baseline), then driver processes, one per CPU,
+call tools/list on every alias through its worker for a fixed time.
+Listings are answered from the worker's response cache after the first
+call, so the number is the sub-proxies' own MCP/JSON overhead rather than
+the upstream's. Every alias points at a small stdio MCP server (see
+bench_shared_upstream).
+
+    python -m scripts.bench_sub_proxy_workers --workers 1 2 4 --aliases 8 --seconds 10
+"""
+
+from pathlib import Path
+import subprocess
+import tempfile
+import argparse
+import asyncio
+import json
+import time
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+async def drive(urls: list[str], seconds: float, loops: int) -> int:
+    from fastmcp import Client
+
+    calls = 0
+    deadline = time.perf_counter() + seconds
+
+    async def loop(client):
+        nonlocal calls
+        while time.perf_counter() < deadline:
+            await client.list_tools()
+            calls += 1
+
+    clients = [Client(url) for url in urls]
+    for client in clients:
+        await client.__aenter__()
+    try:
+        await asyncio.gather(*(loop(c) for c in clients for _ in range(loops)))
+    finally:
+        for client in clients:
+            await client.__aexit__(None, None, None)
+    return calls
+
+
+async def child(workers: int, aliases: int, seconds: float) -> dict:
+    os.chdir(tempfile.mkdtemp(prefix="bench-workers-"))
+    os.makedirs("temp", exist_ok=True)
+    Path("config.json").write_text("{}")
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+    from config import settings  # always import first for telemetry
+    from src.sub_proxy import test as sub_proxy
+    from src.sub_proxy.workers import worker_pool
+
+    settings.sub_proxy_mode = "workers"
+    settings.sub_proxy_workers = workers
+    cfg = {
+        "command": sys.executable,
+        "args": ["-m", "scripts.bench_shared_upstream", "--serve"],
+        "cwd": str(ROOT),
+    }
+
+    try:
+        await asyncio.gather(
+            *(sub_proxy.start_server(f"alias_{i}", cfg) for i in range(aliases))
+        )
+        urls = [
+            f"http://127.0.0.1:{entry.port}/v1/{alias}/"
+            for alias, entry in sub_proxy._running_servers.items()
+        ]
+
+        drivers = os.cpu_count() or 1
+        procs = [
+            await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "scripts.bench_sub_proxy_workers",
+                "--drive",
+                json.dumps(urls[d::drivers] or urls),
+                "--seconds",
+                str(seconds),
+                cwd=ROOT,
+                stdout=asyncio.subprocess.PIPE,
+            )
+            for d in range(drivers)
+        ]
+        outputs = await asyncio.gather(*(p.communicate() for p in procs))
+        calls = sum(int(out.decode().strip().splitlines()[-1]) for out, _ in outputs)
+    finally:
+        await worker_pool.aclose()
+
+    return {"calls": calls, "rps": calls / seconds, "drivers": drivers}
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+")
+    parser.add_argument("--aliases", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--child", type=int, metavar="WORKERS")
+    parser.add_argument("--drive", metavar="URLS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.drive:
+        calls = asyncio.run(drive(json.loads(args.drive), args.seconds, loops=4))
+        print(calls, flush=True)
+        return
+
+    if args.child:
+        result = asyncio.run(child(args.child, args.aliases, args.seconds))
+        print(json.dumps(result), flush=True)
+        return
+
+    cpus = os.cpu_count() or 1
+    counts = args.workers or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+    print(f"{args.aliases} aliases, tools/list for {args.seconds:.0f}s, {cpus} CPUs")
+    print(f"{'workers':>7} {'calls/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in counts:
+        out = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "scripts.bench_sub_proxy_workers",
+                "--child",
+                str(workers),
+                "--aliases",
+                str(args.aliases),
+                "--seconds",
+                str(args.seconds),
+            ],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        baseline = baseline or r["rps"]
+        print(f"{workers:>7} {r['rps']:>10.1f} {r['rps'] / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from config import settings
+import threading
+import hashlib
+import time
+
+
+@dataclass
+class CachedVerdict:
+    report: object
+    expires_at: float
+
+
+def verdict_key(text: str, text_type: str, policies, version) -> tuple:
+    """(content hash, text_type, sorted policy set, policy-definition revisions)"""
+    digest = hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()
+    return digest, text_type, tuple(sorted(policies)), version
+
+
+class VerdictCache:
+    """
+    LRU + TTL cache of scan verdicts.
+    Entries are evicted when they expire, when the cache is full, or when a
+    policy they were scanned against is edited.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[tuple, CachedVerdict] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.expires_at <= time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry.report
+
+    def put(self, key: tuple, report):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = CachedVerdict(report, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_policy(self, policy_name: str) -> int:
+        """Drop every verdict whose policy set includes `policy_name`."""
+        with self._lock:
+            stale = [k for k in self._data if policy_name in k[2]]
+            for k in stale:
+                del self._data[k]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+verdict_cache = VerdictCache(settings.scan_cache_size, settings.scan_cache_ttl)
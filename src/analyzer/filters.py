@@ -1,15 +1,16 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
+from src.analyzer.cache import verdict_cache, verdict_key
 from dataclasses import dataclass
 from typing import Literal, Union
-from src.analyzer.models import (
-    store,
-    make_report,
-    get_scan_id,
-)
+from src.analyzer.tiers import TieredResult, build_scanner
+from src.analyzer.models import ScanRecord, get_scan_id
+from src.analyzer.writer import scan_writer
+from config import settings
+import time
 import os
 
-from src.policies.views import GLOBAL_POLICIES, get_policies, load_json
+from src.policies.models import policy_store
 
 if "GOOGLE_API_KEY" in os.environ:
     model = ChatGoogleGenerativeAI(
@@ -47,42 +48,71 @@ class ScanSuccess:
 @dataclass
 class ScanFailure:
     error: str
+    threat: bool = False  # False when the scan itself failed
 
 
-def dynamic_scan(
+scanner = build_scanner(settings.scan_tiers, model)
+
+
+async def dynamic_scan(
     logger, traceparent: str, text_type: Literal["input", "output"], text, server_alias
 ) -> Union[ScanSuccess, ScanFailure]:
     scan_id = get_scan_id(traceparent)
     text = str(text)
 
-    policies = get_policies(server_alias)["policies"]
+    snapshot = policy_store.snapshot()
+    policies = snapshot.for_key(server_alias)
     print(f"Policies: {policies}")
 
     if not policies:
         print("No policies configured, skipping scan")
         return ScanSuccess(result={"threat": False})
 
-    selected_policies = {
-        policy: load_json(GLOBAL_POLICIES, {})[policy] for policy in policies
-    }
-
-    model_with_structure = model.with_structured_output(make_report(selected_policies))
+    selected_policies = snapshot.select(policies)
 
-    messages = [
-        (
-            "system",
-            f"You are an auditing assistant that checks for these threats:\n{selected_policies}.",
-        ),
-        ("human", text),
-    ]
+    cache_key = verdict_key(text, text_type, policies, snapshot.revision_of(policies))
 
     try:
-        ai_msg = model_with_structure.invoke(messages)
-        store(scan_id, text_type, text, {text_type: ai_msg.model_dump()})
-        logger.info(f"scan:{ai_msg}")
+        start = time.perf_counter()
+        cached = verdict_cache.get(cache_key)
+
+        if cached is None:
+            scanned = await scanner.scan(
+                text, selected_policies, snapshot.select_rules(policies)
+            )
+            verdict_cache.put(cache_key, scanned)
+        else:
+            print("Verdict cache hit, skipping scan")
+            scanned = TieredResult(
+                cached.report,
+                "cache",
+                [
+                    {
+                        "tier": "cache",
+                        "decision": "threat" if cached.report.threat else "clean",
+                        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+                        "score": None,
+                    }
+                ],
+            )
+
+        ai_msg = scanned.report
+
+        # Cached verdicts are stored too so the analyzer sees every scan.
+        await scan_writer.enqueue(
+            ScanRecord(
+                scan_id,
+                text_type,
+                text,
+                {text_type: scanned.dump()},
+                alias=server_alias,
+                policy_version=snapshot.version,
+            )
+        )
+        logger.info(f"scan:{ai_msg} tiers:{scanned.trail}")
 
         if ai_msg.threat:
-            return ScanFailure(error=f"Disallowed (category: {ai_msg})")
+            return ScanFailure(error=f"Disallowed (category: {ai_msg})", threat=True)
 
         return ScanSuccess(result=ai_msg)
     except Exception as e:
@@ -11,50 +11,97 @@ def init_graph_state():
         "rating_count": 0,
         "min_rating": float("inf"),
         "max_rating": 0,
+        "tier_decisions": defaultdict(int),
+        "tier_calls": defaultdict(int),
+        "tier_latency_ms": defaultdict(float),
+        "tier_scans": 0,
+        "escalations": 0,
     }
 
 
-def build_graph_payload(scans, state=None):
-    if state is None:
-        state = init_graph_state()
-
-    for scan in scans:
-        rating = scan.get("rating")
-        is_threat = scan.get("threat")
-        category = scan.get("category")
-
-        # Rating distribution and statistics
-        if rating is not None:
-            state["ratings"][rating] += 1
-            state["rating_sum"] += rating
-            state["rating_count"] += 1
-            state["min_rating"] = min(state["min_rating"], rating)
-            state["max_rating"] = max(state["max_rating"], rating)
-
-            # Threat severity (only for threats)
-            if is_threat:
-                if rating <= 3:
-                    state["threat_severity"]["low"] += 1
-                elif rating <= 7:
-                    state["threat_severity"]["medium"] += 1
-                else:
-                    state["threat_severity"]["high"] += 1
-
-        # Count threats
+def add_scan(
+    state,
+    rating,
+    is_threat,
+    category,
+    tier=None,
+    escalated=False,
+    latency_ms=0.0,
+    count=1,
+):
+    """
+    Fold `count` identical verdicts into the state. Lets SQL group-by
+    results and individual scans share the same aggregation.
+    """
+    # Rating distribution and statistics
+    if rating is not None:
+        state["ratings"][rating] += count
+        state["rating_sum"] += rating * count
+        state["rating_count"] += count
+        state["min_rating"] = min(state["min_rating"], rating)
+        state["max_rating"] = max(state["max_rating"], rating)
+
+        # Threat severity (only for threats)
         if is_threat:
-            state["threats"] += 1
+            if rating <= 3:
+                state["threat_severity"]["low"] += count
+            elif rating <= 7:
+                state["threat_severity"]["medium"] += count
+            else:
+                state["threat_severity"]["high"] += count
 
-            # ---- Threat type classification ----
+    # Count threats
+    if is_threat:
+        state["threats"] += count
 
-            # Prefer structured category
-            if category:
-                threat_type = category.strip().lower()
+        # ---- Threat type classification ----
 
-            # Fallback to keyword heuristics only if category missing
-            else:
-                threat_type = "unknown"
+        # Prefer structured category
+        if category:
+            threat_type = category.strip().lower()
+
+        # Fallback to keyword heuristics only if category missing
+        else:
+            threat_type = "unknown"
+
+        state["threat_types"][threat_type] += count
+
+    # Deciding tier, used to tune local escalation thresholds
+    if tier:
+        decision = "threat" if is_threat else "clean"
+        state["tier_decisions"][f"{tier}:{decision}"] += count
+        state["tier_calls"][tier] += count
+        state["tier_latency_ms"][tier] += latency_ms or 0
+        state["tier_scans"] += count
+        if escalated:
+            state["escalations"] += count
+
+    return state
+
+
+def scan_tier_stats(scan: dict) -> tuple:
+    """(deciding tier, whether any tier escalated, total latency) of a stored scan."""
+    trail = scan.get("tiers") or []
+    escalated = any(step.get("decision") == "escalate" for step in trail)
+    latency_ms = sum(step.get("latency_ms") or 0 for step in trail)
+    return scan.get("tier"), escalated, latency_ms
 
-            state["threat_types"][threat_type] += 1
+
+def build_graph_payload(scans, state=None):
+    if state is None:
+        state = init_graph_state()
+
+    for scan in scans:
+        tier, escalated, latency_ms = scan_tier_stats(scan)
+        add_scan(
+            state,
+            scan.get("rating"),
+            scan.get("threat"),
+            scan.get("category"),
+            tier,
+            escalated,
+            latency_ms,
+        )
 
     return state
 
@@ -93,6 +140,8 @@ def finalize_graph(state):
         for threat_type, count in state["threat_types"].items()
     }
 
+    tier_calls = state["tier_calls"]
+
     return {
         # Graph 1: Rating Distribution
         "rating_distribution": dict(state["ratings"]),
@@ -117,6 +166,78 @@ def finalize_graph(state):
             if state["rating_count"] > 0
             else 0,
         },
+        # Graph 5: Scanner Tiers
+        "tier_breakdown": {
+            "decisions": dict(state["tier_decisions"]),
+            "scans": dict(tier_calls),
+            "avg_latency_ms": {
+                tier: round(state["tier_latency_ms"][tier] / count, 3)
+                for tier, count in tier_calls.items()
+                if count
+            },
+            "escalations": state["escalations"],
+            "escalation_rate": round(
+                state["escalations"] / state["tier_scans"] * 100, 2
+            )
+            if state["tier_scans"] > 0
+            else 0,
+        },
         # Legacy
         "threats": threat_total,
     }
+
+
+# -------------------------
+# Rollup state (de)serialization
+# -------------------------
+_COUNTERS = (
+    "ratings",
+    "threat_types",
+    "tier_decisions",
+    "tier_calls",
+    "tier_latency_ms",
+)
+_TOTALS = ("threats", "rating_sum", "rating_count", "tier_scans", "escalations")
+
+
+def merge_graph_state(dst, src):
+    """Add the counts of `src` into `dst`. Both must come from init_graph_state."""
+    for key in _COUNTERS:
+        for k, v in src[key].items():
+            dst[key][k] += v
+    for key in _TOTALS:
+        dst[key] += src[key]
+    for k, v in src["threat_severity"].items():
+        dst["threat_severity"][k] += v
+    dst["min_rating"] = min(dst["min_rating"], src["min_rating"])
+    dst["max_rating"] = max(dst["max_rating"], src["max_rating"])
+    return dst
+
+
+def dump_graph_state(state) -> dict:
+    """JSON-safe copy of the state, for storing in rollup rows."""
+    data = {key: dict(state[key]) for key in _COUNTERS}
+    data["ratings"] = {str(k): v for k, v in state["ratings"].items()}
+    data.update({key: state[key] for key in _TOTALS})
+    data["threat_severity"] = dict(state["threat_severity"])
+    data["min_rating"] = (
+        None if state["min_rating"] == float("inf") else state["min_rating"]
+    )
+    data["max_rating"] = state["max_rating"]
+    return data
+
+
+def load_graph_state(data: dict):
+    state = init_graph_state()
+    for key in _COUNTERS:
+        state[key].update(data.get(key) or {})
+    state["ratings"] = defaultdict(
+        int, {float(k): v for k, v in (data.get("ratings") or {}).items()}
+    )
+    for key in _TOTALS:
+        state[key] = data.get(key, 0)
+    state["threat_severity"].update(data.get("threat_severity") or {})
+    if data.get("min_rating") is not None:
+        state["min_rating"] = data["min_rating"]
+    state["max_rating"] = data.get("max_rating", 0)
+    return state
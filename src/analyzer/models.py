@@ -1,14 +1,23 @@
 from sqlalchemy import create_engine, Column, String, JSON, DateTime, func
-from src.policies.views import GLOBAL_POLICIES, load_json
+from sqlalchemy import Boolean, Float, Index, Integer, delete, insert, select
+from sqlalchemy import inspect
 from sqlalchemy.orm import declarative_base, sessionmaker
 from pydantic import BaseModel, Field, ConfigDict
-from sqlalchemy import insert, select
-from typing import Literal, Optional
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from src.analyzer.graphs import (
+    add_scan,
+    dump_graph_state,
+    init_graph_state,
+    load_graph_state,
+    merge_graph_state,
+    scan_tier_stats,
+)
+from typing import Optional
 from enum import Enum
 
 
-def make_report(active_policies: dict) -> type:
-    """Return a Report model scoped to the given active policies."""
+def _build_report(active_policies: dict) -> type:
     category_enum = Enum("CategoryEnum", {k: k for k in active_policies})
     category_desc = (
         "The exact policy key that was violated. "
@@ -28,6 +37,66 @@ def make_report(active_policies: dict) -> type:
     return Report
 
 
+def _build_batch_report(report: type) -> type:
+    class BatchReport(BaseModel):
+        """Analysis of several numbered LLM I/O items"""
+
+        reports: list[report] = Field(
+            ..., description="One report per numbered item, in the same order"
+        )
+
+    return BatchReport
+
+
+# -------------------------
+# Report registry
+# -------------------------
+# Report classes, their batch wrappers and the structured-output runnables
+# bound to them are built once per policy set and reused by every scan.
+# Keys include the policy descriptions, so an edited policy never hits a
+# stale entry; clear_report_registry() just frees the old ones.
+
+_reports: dict[tuple, type] = {}
+_batch_reports: dict[type, type] = {}
+_runnables: dict[tuple, object] = {}
+
+
+def policy_set_key(active_policies: dict) -> tuple:
+    return tuple(sorted(active_policies.items()))
+
+
+def make_report(active_policies: dict) -> type:
+    """Return a Report model scoped to the given active policies."""
+    key = policy_set_key(active_policies)
+    report = _reports.get(key)
+    if report is None:
+        report = _reports[key] = _build_report(dict(key))
+    return report
+
+
+def make_batch_report(report: type) -> type:
+    """Return a model holding one `report` per scanned item, in order."""
+    batch = _batch_reports.get(report)
+    if batch is None:
+        batch = _batch_reports[report] = _build_batch_report(report)
+    return batch
+
+
+def structured_runnable(model, schema: type):
+    """model.with_structured_output(schema), built once per (model, schema)."""
+    key = (id(model), schema)
+    runnable = _runnables.get(key)
+    if runnable is None:
+        runnable = _runnables[key] = model.with_structured_output(schema)
+    return runnable
+
+
+def clear_report_registry():
+    _reports.clear()
+    _batch_reports.clear()
+    _runnables.clear()
+
+
 DATABASE_URL = "sqlite:///scan.db"
 
 engine = create_engine(DATABASE_URL, echo=False, future=True)
@@ -48,6 +117,56 @@ class Scan(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 
+class ScanResult(Base):
+    """One row per verdict, so analytics can aggregate in SQL."""
+
+    __tablename__ = "scan_results"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    scan_id = Column(String, nullable=False)
+    alias = Column(String, nullable=True)
+    text_type = Column(String, nullable=False)
+    threat = Column(Boolean, nullable=False, default=False)
+    rating = Column(Float, nullable=True)
+    category = Column(String, nullable=True)
+    tier = Column(String, nullable=True)
+    escalated = Column(Boolean, nullable=False, default=False)
+    latency_ms = Column(Float, nullable=True)
+    policy_version = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_scan_results_scan_id", "scan_id"),
+        Index("ix_scan_results_created_at", "created_at"),
+        Index("ix_scan_results_alias_created_at", "alias", "created_at"),
+        Index("ix_scan_results_threat_category", "threat", "category", "created_at"),
+        Index("ix_scan_results_text_type_created_at", "text_type", "created_at"),
+    )
+
+
+class ScanRollup(Base):
+    """
+    Graph state (see graphs.init_graph_state) of every verdict for one alias
+    and category within one minute/hour/day bucket, maintained at write time.
+    """
+
+    __tablename__ = "scan_rollups"
+
+    granularity = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    alias = Column(String, primary_key=True)  # "" when the alias is unknown
+    category = Column(String, primary_key=True)  # "" for verdicts without one
+    state = Column(JSON, nullable=False)
+
+
+class Migration(Base):
+    __tablename__ = "migrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 Base.metadata.create_all(bind=engine)
 
 # -------------------------
@@ -89,39 +208,298 @@ def get_scan_id(traceparent: str) -> str:
     return parts[1]
 
 
+@dataclass
+class ScanRecord:
+    scan_id: str
+    text_type: str
+    text: str
+    scan_results: dict
+    alias: Optional[str] = None
+    policy_version: Optional[int] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def result_rows(
+    scan_id: str,
+    text_type: str,
+    scan_results: dict,
+    created_at: datetime,
+    alias: Optional[str] = None,
+    policy_version: Optional[int] = None,
+) -> list[dict]:
+    """Flatten the verdicts in a scans blob into scan_results rows."""
+    verdicts = []
+    normalize_scans(scan_results, verdicts)
+
+    rows = []
+    for verdict in verdicts:
+        tier, escalated, latency_ms = scan_tier_stats(verdict)
+        rows.append(
+            {
+                "scan_id": scan_id,
+                "alias": alias,
+                "text_type": text_type,
+                "threat": bool(verdict.get("threat")),
+                "rating": verdict.get("rating"),
+                "category": verdict.get("category"),
+                "tier": tier,
+                "escalated": escalated,
+                "latency_ms": latency_ms,
+                "policy_version": policy_version,
+                "created_at": created_at,
+            }
+        )
+    return rows
+
+
+# -------------------------
+# Rollups
+# -------------------------
+
+GRANULARITIES = ("minute", "hour", "day")
+
+
+def as_utc(ts: datetime) -> datetime:
+    """Naive UTC, the way sqlite hands datetimes back."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """Start of the bucket holding `ts`."""
+    ts = as_utc(ts).replace(second=0, microsecond=0)
+    if granularity in ("hour", "day"):
+        ts = ts.replace(minute=0)
+    if granularity == "day":
+        ts = ts.replace(hour=0)
+    return ts
+
+
+def rollup_deltas(rows: list[dict], deltas: dict | None = None) -> dict:
+    """Fold scan_results rows into {(granularity, bucket, alias, category): state}."""
+    if deltas is None:
+        deltas = {}
+
+    for row in rows:
+        for granularity in GRANULARITIES:
+            key = (
+                granularity,
+                bucket_start(row["created_at"], granularity),
+                row["alias"] or "",
+                row["category"] or "",
+            )
+            state = deltas.get(key)
+            if state is None:
+                state = deltas[key] = init_graph_state()
+            add_scan(
+                state,
+                row["rating"],
+                row["threat"],
+                row["category"],
+                row["tier"],
+                row["escalated"],
+                row["latency_ms"],
+            )
+    return deltas
+
+
+def apply_rollups(session, deltas: dict):
+    """Merge bucket deltas into scan_rollups, inside the caller's transaction."""
+    for (granularity, bucket, alias, category), delta in deltas.items():
+        rollup = session.get(ScanRollup, (granularity, bucket, alias, category))
+        if rollup is None:
+            session.add(
+                ScanRollup(
+                    granularity=granularity,
+                    bucket=bucket,
+                    alias=alias,
+                    category=category,
+                    state=dump_graph_state(delta),
+                )
+            )
+        else:
+            merged = merge_graph_state(load_graph_state(rollup.state), delta)
+            rollup.state = dump_graph_state(merged)
+
+
 # -------------------------
 # Main store function
 # -------------------------
 
 
-def store(
-    scan_id: str, text_type: Literal["input", "output"], text: dict, scan_results: dict
-):
+def store_many(records: list[ScanRecord]):
+    """
+    Persist a batch of scan records in a single transaction. Records for the
+    same scan are applied in order.
+    """
+    scan_ids = list(dict.fromkeys(r.scan_id for r in records))
+
     with SessionLocal.begin() as session:
-        stmt = (
-            insert(Scan)
-            .values(scan_id=scan_id, input=None, output=None, scans={})
-            .prefix_with("OR IGNORE")
+        session.execute(
+            insert(Scan).prefix_with("OR IGNORE"),
+            [
+                {"scan_id": scan_id, "input": None, "output": None, "scans": {}}
+                for scan_id in scan_ids
+            ],
         )
 
-        result = session.execute(stmt)
+        scans = {
+            scan.scan_id: scan
+            for scan in session.execute(
+                select(Scan).where(Scan.scan_id.in_(scan_ids))
+            ).scalars()
+        }
 
-        scan = session.execute(select(Scan).where(Scan.scan_id == scan_id)).scalar_one()
+        rows = []
+        for record in records:
+            scan = scans[record.scan_id]
 
-        setattr(scan, text_type, text)
+            setattr(scan, record.text_type, record.text)
 
-        current = dict(scan.scans) if scan.scans else {}
+            current = dict(scan.scans) if scan.scans else {}
+            deep_update(current, {record.text_type: record.scan_results})
+            scan.scans = current
 
-        report = {text_type: scan_results}
+            rows.extend(
+                result_rows(
+                    record.scan_id,
+                    record.text_type,
+                    record.scan_results,
+                    record.created_at,
+                    record.alias,
+                    record.policy_version,
+                )
+            )
 
-        deep_update(current, report)
+        if rows:
+            session.execute(insert(ScanResult), rows)
+            apply_rollups(session, rollup_deltas(rows))
 
-        scan.scans = current
 
-        result = {
-            "input": scan.input,
-            "output": scan.output,
-            "scans": scan.scans,
-        }
+# -------------------------
+# Migrations
+# -------------------------
+
+
+def backfill_scan_results(chunk_size: int = 1000) -> int:
+    """
+    Populate scan_results from the existing Scan.scans blobs. Runs once;
+    an interrupted run starts over, since nothing else writes before it
+    finishes. Alias and policy version are unknown for old scans.
+    """
+    name = "backfill_scan_results"
+
+    with SessionLocal.begin() as session:
+        if session.get(Migration, name) is not None:
+            return 0
+        session.execute(delete(ScanResult))
+
+    total = 0
+    last_id = ""
+    while True:
+        with SessionLocal.begin() as session:
+            scans = session.execute(
+                select(Scan.scan_id, Scan.scans, Scan.created_at)
+                .where(Scan.scan_id > last_id)
+                .order_by(Scan.scan_id)
+                .limit(chunk_size)
+            ).all()
+            if not scans:
+                break
+
+            rows = []
+            for scan in scans:
+                created_at = scan.created_at or datetime.now(timezone.utc)
+                for text_type, node in (scan.scans or {}).items():
+                    rows.extend(result_rows(scan.scan_id, text_type, node, created_at))
+
+            if rows:
+                session.execute(insert(ScanResult), rows)
+
+            total += len(rows)
+            last_id = scans[-1].scan_id
+
+    with SessionLocal.begin() as session:
+        session.add(Migration(name=name))
+
+    if total:
+        print(f"[ANALYZER] Backfilled {total} scan result(s)")
+    return total
+
+
+def key_rollups_by_category() -> bool:
+    """
+    scan_rollups gained a category key. A table from before that is dropped
+    and the rollup backfill re-armed; the rollups are derived from
+    scan_results, so nothing is lost.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("scan_rollups")}
+    if "category" in columns:
+        return False
+
+    ScanRollup.__table__.drop(engine)
+    ScanRollup.__table__.create(engine)
+    with SessionLocal.begin() as session:
+        session.execute(
+            delete(Migration).where(Migration.name == "backfill_scan_rollups")
+        )
+    print("[ANALYZER] Rebuilding scan_rollups with a category key")
+    return True
+
+
+def backfill_scan_rollups(chunk_size: int = 10_000) -> int:
+    """Build scan_rollups from scan_results. Runs once, like the backfill above."""
+    name = "backfill_scan_rollups"
+
+    with SessionLocal.begin() as session:
+        if session.get(Migration, name) is not None:
+            return 0
+        session.execute(delete(ScanRollup))
+
+    columns = (
+        ScanResult.id,
+        ScanResult.alias,
+        ScanResult.threat,
+        ScanResult.rating,
+        ScanResult.category,
+        ScanResult.tier,
+        ScanResult.escalated,
+        ScanResult.latency_ms,
+        ScanResult.created_at,
+    )
+
+    total = 0
+    last_id = 0
+    while True:
+        with SessionLocal.begin() as session:
+            rows = session.execute(
+                select(*columns)
+                .where(ScanResult.id > last_id)
+                .order_by(ScanResult.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+
+            apply_rollups(session, rollup_deltas([r._asdict() for r in rows]))
+
+            total += len(rows)
+            last_id = rows[-1].id
+
+    with SessionLocal.begin() as session:
+        session.add(Migration(name=name))
+
+    if total:
+        print(f"[ANALYZER] Rolled up {total} scan result(s)")
+    return total
+
 
-        return result
+def run_migrations():
+    """
+    Bring scan.db's derived tables up to date. Called once by the gateway at
+    startup, before the scan writer starts; each step is a no-op once done.
+    """
+    backfill_scan_results()
+    key_rollups_by_category()
+    backfill_scan_rollups()
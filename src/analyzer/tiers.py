@@ -0,0 +1,172 @@
+from src.analyzer.batcher import ScanBatcher, audit_messages
+from dataclasses import dataclass, field
+from abc import ABC, abstractmethod
+from src.analyzer.models import make_report, structured_runnable
+from src.policies.models import NO_RULES
+from typing import Literal, Optional
+from config import settings
+import asyncio
+import time
+
+Decision = Literal["clean", "threat", "escalate"]
+
+
+@dataclass
+class TierVerdict:
+    decision: Decision
+    rating: float = 0.0
+    category: Optional[str] = None
+    description: str = ""
+    score: Optional[float] = None
+    report: Optional[object] = None  # set by tiers that build their own Report
+
+
+# --------------------
+# tiers
+# --------------------
+class Tier(ABC):
+    name = "tier"
+
+    @abstractmethod
+    async def scan(self, text: str, policies: dict, rules: dict) -> TierVerdict:
+        """`rules` maps each policy to its LocalRules."""
+
+
+class LocalTier(Tier):
+    """
+    Each policy's own regex rules, with no network calls. It only answers
+    on positive evidence: a threat rule matched, or every policy's allowlist
+    matched. Anything else goes to the next tier.
+    """
+
+    name = "local"
+
+    async def scan(self, text: str, policies: dict, rules: dict) -> TierVerdict:
+        if len(text) > settings.local_max_chars:
+            return TierVerdict("escalate", description="too large for local tier")
+
+        for policy in policies:
+            rule = rules.get(policy, NO_RULES).threat_re
+            match = rule.search(text) if rule else None
+            if match:
+                return TierVerdict(
+                    "threat",
+                    rating=8.0,
+                    category=policy,
+                    description=f"Matched local rule: {match.group(0)[:80]!r}",
+                )
+
+        allowed = [rules.get(policy, NO_RULES).allow_re for policy in policies]
+        if allowed and all(rule and rule.search(text) for rule in allowed):
+            return TierVerdict(
+                "clean", description="Allowed by every policy's local allowlist"
+            )
+
+        return TierVerdict("escalate")
+
+
+class LLMTier(Tier):
+    name = "llm"
+
+    def __init__(self, model):
+        self.model = model
+        # Bounds the number of model requests in flight so a burst of tool
+        # calls can't open an unbounded number of them at once.
+        self._slots = asyncio.Semaphore(settings.scan_concurrency)
+        self.batcher = None
+        if settings.scan_batch_size > 1:
+            self.batcher = ScanBatcher(
+                model,
+                self._slots,
+                settings.scan_batch_size,
+                settings.scan_batch_delay_ms / 1000,
+            )
+
+    async def scan(self, text: str, policies: dict, rules: dict) -> TierVerdict:
+        if self.batcher is not None:
+            ai_msg = await self.batcher.submit(text, policies)
+        else:
+            model_with_structure = structured_runnable(
+                self.model, make_report(policies)
+            )
+            async with self._slots:
+                ai_msg = await model_with_structure.ainvoke(
+                    audit_messages(policies, text)
+                )
+
+        return TierVerdict(
+            "threat" if ai_msg.threat else "clean",
+            rating=ai_msg.rating,
+            category=ai_msg.category,
+            description=ai_msg.description,
+            report=ai_msg,
+        )
+
+
+TIERS = {
+    "local": lambda model: LocalTier(),
+    "llm": LLMTier,
+}
+
+
+@dataclass
+class TieredResult:
+    report: object
+    tier: str
+    trail: list = field(default_factory=list)
+
+    def dump(self) -> dict:
+        return {**self.report.model_dump(), "tier": self.tier, "tiers": self.trail}
+
+
+UNRESOLVED = {
+    "clean": "",
+    "threat": "",
+    "escalate": "No tier gave a confident verdict",
+}
+
+
+class TieredScanner:
+    """
+    Runs tiers cheapest first and stops at the first confident verdict.
+    Every tier consulted is recorded with its decision and latency.
+    """
+
+    def __init__(self, tiers: list[Tier]):
+        self.tiers = tiers
+
+    async def scan(
+        self, text: str, policies: dict, rules: dict | None = None
+    ) -> TieredResult:
+        trail = []
+        verdict = TierVerdict("escalate")
+        tier = None
+
+        for tier in self.tiers:
+            start = time.perf_counter()
+            verdict = await tier.scan(text, policies, rules or {})
+            trail.append(
+                {
+                    "tier": tier.name,
+                    "decision": verdict.decision,
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "score": verdict.score,
+                }
+            )
+            if verdict.decision != "escalate":
+                break
+
+        report = verdict.report
+        if report is None:
+            report = make_report(policies)(
+                threat=verdict.decision == "threat",
+                rating=verdict.rating,
+                category=verdict.category,
+                description=verdict.description or UNRESOLVED[verdict.decision],
+            )
+
+        return TieredResult(report, tier.name if tier else "none", trail)
+
+
+def build_scanner(names: list[str], model) -> TieredScanner:
+    return TieredScanner([TIERS[name](model) for name in names])
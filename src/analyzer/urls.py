@@ -1,9 +1,14 @@
 from src.analyzer.graphs import init_graph_state, build_graph_payload, finalize_graph
 from src.analyzer.models import Scan, get_db, normalize_scans
-from src.analyzer.views import list_scans, status
+from src.analyzer.views import list_scans, rollup_graph_state, status
+from src.analyzer.cache import verdict_cache
+from src.analyzer.writer import scan_writer
+from src.analyzer.filters import scanner
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
+from datetime import datetime
 from sqlalchemy import select
+from typing import Literal
 
 router = APIRouter()
 
@@ -35,28 +40,24 @@ def get_graphs(scan_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/scans/graphs")
-def get_all_graphs(db: Session = Depends(get_db)):
+def get_all_graphs(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    granularity: Literal["minute", "hour", "day"] = "day",
+    alias: str | None = None,
+    category: str | None = None,
+    db: Session = Depends(get_db),
+):
     """
-    Streams ALL scans without loading entire table into memory.
+    Merges the pre-aggregated rollup buckets in [since, until).
     """
-
-    rows = db.execute(select(Scan.scans)).scalars()
-
-    graph_state = init_graph_state()
-
-    total_scans = 0
-
-    for scans_json in rows:
-        normalized = []
-        normalize_scans(scans_json or {}, normalized)
-
-        total_scans += len(normalized)
-
-        # Incremental aggregation
-        build_graph_payload(normalized, graph_state)
+    graph_state = rollup_graph_state(db, granularity, since, until, alias, category)
 
     return {
-        "total_scans": total_scans,
+        "since": since,
+        "until": until,
+        "granularity": granularity,
+        "total_scans": graph_state["rating_count"],
         "threats": graph_state["threats"],
         "graphs": finalize_graph(graph_state),
     }
@@ -69,3 +70,13 @@ def reports(
     db: Session = Depends(get_db),
 ):
     return list_scans(limit, cursor, db)
+
+
+@router.get("/scans/metrics")
+def scan_metrics():
+    batchers = [t.batcher for t in scanner.tiers if getattr(t, "batcher", None)]
+    return {
+        "cache": verdict_cache.stats(),
+        "batcher": batchers[0].stats() if batchers else None,
+        "writer": scan_writer.stats(),
+    }
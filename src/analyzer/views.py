@@ -1,10 +1,18 @@
+from src.analyzer.graphs import (
+    init_graph_state,
+    load_graph_state,
+    merge_graph_state,
+)
 from sqlalchemy import select, and_, or_
 from sqlalchemy.orm import Session
 from fastapi import Depends, Query
-from datetime import datetime
+from datetime import datetime, timedelta
 from src.analyzer.models import (
     SessionLocal,
     Scan,
+    ScanRollup,
+    as_utc,
+    bucket_start,
     get_db,
 )
 import base64
@@ -45,6 +53,53 @@ def status(scan_id: str):
         }
 
 
+def rollup_graph_state(
+    db: Session,
+    granularity: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    alias: str | None = None,
+    category: str | None = None,
+):
+    """
+    Merge the rollup buckets covering [since, until), optionally for one
+    alias and/or one threat category. Buckets are whole, so
+    the range is widened to the enclosing `granularity` boundaries. Cost
+    grows with the number of buckets read, not with the number of scans.
+    """
+    stmt = select(ScanRollup.state).where(ScanRollup.granularity == granularity)
+
+    if since is not None:
+        stmt = stmt.where(ScanRollup.bucket >= bucket_start(since, granularity))
+    if until is not None:
+        stmt = stmt.where(ScanRollup.bucket < until_bucket(until, granularity))
+    if alias is not None:
+        stmt = stmt.where(ScanRollup.alias == alias)
+    if category is not None:
+        stmt = stmt.where(ScanRollup.category == category)
+
+    state = init_graph_state()
+    for data in db.execute(stmt).scalars():
+        merge_graph_state(state, load_graph_state(data))
+
+    return state
+
+
+def until_bucket(until: datetime, granularity: str) -> datetime:
+    """First bucket that starts at or after `until`."""
+    start = bucket_start(until, granularity)
+    if start == as_utc(until):
+        return start
+    return start + BUCKET_WIDTH[granularity]
+
+
+BUCKET_WIDTH = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
 def build_graph_payload(scans: list[dict]) -> dict:
     ratings = [s["rating"] for s in scans]
     threats = [s["threat"] for s in scans]
@@ -0,0 +1,161 @@
+from src.analyzer.models import ScanRecord, store_many
+from config import settings
+import asyncio
+import pickle
+import time
+import os
+
+
+class ScanWriter:
+    """
+    Write-behind queue for scan results. Records are buffered in memory and
+    flushed in one transaction every `flush_interval` seconds or once
+    `batch_size` records are waiting. The queue is bounded: when it is full,
+    enqueue() waits, which pushes back on the scans producing records.
+
+    The gateway process is the only one that writes scan.db. Sub-proxy
+    worker processes swap `sink` for pipe_sink(), which sends each batch to
+    the gateway (see receive_batches()), so rollups are never updated from
+    two processes at once.
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sink = store_many  # blocking, called off the event loop with each batch
+
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run(), name="scan-writer")
+
+    async def enqueue(self, record: ScanRecord):
+        # Sub-proxies can scan before the app lifespan has started us
+        self.start()
+
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put(record)
+        self.enqueued += 1
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        start = time.perf_counter()
+        try:
+            # sqlite is blocking, keep it off the event loop
+            await asyncio.to_thread(self.sink, batch)
+            self.flushed += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"[SCAN WRITER] Failed to persist {len(batch)} scan(s): {e}")
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.batches += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self.total_flush_ms += elapsed
+            for _ in batch:
+                self._queue.task_done()
+
+    async def drain(self, timeout: float = 30.0):
+        """Flush everything still queued, then stop. Used on shutdown."""
+        if self._task is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[SCAN WRITER] Drain timed out, {self._queue.qsize()} scan(s) lost")
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "backpressure_waits": self.backpressure_waits,
+            "flush_latency_ms": {
+                "last": round(self.last_flush_ms, 3),
+                "max": round(self.max_flush_ms, 3),
+                "avg": round(self.total_flush_ms / self.batches, 3)
+                if self.batches
+                else 0,
+            },
+        }
+
+
+def pipe_sink(fd: int):
+    """A sink that sends each batch down a pipe, length-prefixed and pickled."""
+    pipe = os.fdopen(fd, "wb")
+
+    def send(batch: list[ScanRecord]):
+        data = pickle.dumps(batch)
+        # Blocks while the pipe is full, which backs up this process's queue
+        pipe.write(len(data).to_bytes(4, "big") + data)
+        pipe.flush()
+
+    return send
+
+
+async def receive_batches(fd: int, writer: "ScanWriter"):
+    """Enqueue batches from a pipe_sink() on `writer` until the pipe closes."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb")
+    )
+    try:
+        while True:
+            try:
+                size = int.from_bytes(await reader.readexactly(4), "big")
+                batch = pickle.loads(await reader.readexactly(size))
+            except asyncio.IncompleteReadError:
+                return  # the sending process exited
+            for record in batch:
+                await writer.enqueue(record)
+    finally:
+        transport.close()
+
+
+scan_writer = ScanWriter(
+    settings.scan_write_queue,
+    settings.scan_write_batch,
+    settings.scan_write_interval_ms / 1000,
+)
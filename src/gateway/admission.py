@@ -0,0 +1,217 @@
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from mcp.types import ErrorData, INTERNAL_ERROR
+from mcp.shared.exceptions import McpError
+from dataclasses import dataclass, fields
+from collections import deque
+from config import settings
+import asyncio
+import math
+import time
+
+
+@dataclass(frozen=True)
+class AdmissionConfig:
+    max_concurrency: int = settings.admission_max_concurrency
+    max_queue: int = settings.admission_max_queue
+    queue_timeout: float = settings.admission_queue_timeout
+    adaptive: bool = settings.admission_adaptive
+    min_concurrency: int = settings.admission_min_concurrency
+    target_latency_ms: float = settings.admission_target_latency_ms
+
+    @classmethod
+    def from_alias(cls, cfg: dict | None) -> "AdmissionConfig":
+        """Read the optional "limits" section of an alias entry in config.json."""
+        section = (cfg or {}).get("limits") or {}
+        known = {f.name for f in fields(cls)}
+        unknown = set(section) - known
+        if unknown:
+            print(f"[ADMISSION] Ignoring unknown limit settings: {sorted(unknown)}")
+        return cls(**{k: v for k, v in section.items() if k in known})
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status  # 429 queue full, 503 queue timeout
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Limiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one alias and gate.
+    With `adaptive` the limit follows AIMD: +1 per limit's worth of calls
+    under the latency target, x0.9 (at most once per observed latency) when
+    a call comes back slower.
+    """
+
+    def __init__(self, config: AdmissionConfig):
+        self.config = config
+        self.limit = float(config.max_concurrency)
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.avg_latency_ms = 0.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+    def _retry_after(self) -> int:
+        # Rough time until the queue ahead of a new caller has drained
+        per_call = (self.avg_latency_ms or 1000) / 1000
+        backlog = (len(self._waiters) + 1) / max(self.limit, 1)
+        return min(30, max(1, math.ceil(per_call * backlog)))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the start time to hand back to release()."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return time.monotonic()
+
+        if len(self._waiters) >= self.config.max_queue:
+            self.rejected_full += 1
+            raise Rejected(429, "Too many queued requests", self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted just as we timed out; give the slot back
+                self._release_slot()
+            else:
+                future.cancel()
+            self.rejected_timeout += 1
+            raise Rejected(503, "Timed out waiting for a slot", self._retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release_slot()
+            else:
+                future.cancel()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started: float):
+        latency_ms = (time.monotonic() - started) * 1000
+        self.avg_latency_ms = (
+            latency_ms
+            if not self.avg_latency_ms
+            else 0.9 * self.avg_latency_ms + 0.1 * latency_ms
+        )
+        if self.config.adaptive:
+            self._adapt(latency_ms)
+        self._release_slot()
+
+    def _adapt(self, latency_ms: float):
+        ceiling = self.config.max_concurrency
+        floor = self.config.min_concurrency
+        now = time.monotonic()
+
+        if latency_ms <= self.config.target_latency_ms:
+            self.limit = min(ceiling, self.limit + 1 / self.limit)
+        elif now - self._last_decrease > latency_ms / 1000:
+            self.limit = max(floor, self.limit * 0.9)
+            self._last_decrease = now
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        # Hand freed slots straight to waiters, oldest first
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "max_concurrency": self.config.max_concurrency,
+            "adaptive": self.config.adaptive,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.config.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_latency_ms": round(self.avg_latency_ms, 3),
+        }
+
+
+class AdmissionController:
+    """
+    Limiters per alias and gate. "http" guards proxy_alias, "mcp" guards the
+    FastMCP proxies; they are separate because an in-process /v1 call passes
+    through both.
+    """
+
+    GATES = ("http", "mcp")
+
+    def __init__(self):
+        self._configs: dict[str, AdmissionConfig] = {}
+        self._limiters: dict[tuple[str, str], Limiter] = {}
+
+    def get(self, alias: str, gate: str) -> Limiter:
+        limiter = self._limiters.get((alias, gate))
+        if limiter is None:
+            config = self._configs.get(alias) or AdmissionConfig()
+            limiter = self._limiters[(alias, gate)] = Limiter(config)
+        return limiter
+
+    def configure(self, alias: str, cfg: dict):
+        config = AdmissionConfig.from_alias(cfg)
+        if self._configs.get(alias) == config:
+            return
+        self._configs[alias] = config
+        for gate in self.GATES:
+            self._limiters.pop((alias, gate), None)
+
+    def remove(self, alias: str):
+        self._configs.pop(alias, None)
+        for gate in self.GATES:
+            self._limiters.pop((alias, gate), None)
+
+    def stats(self) -> dict:
+        data = {}
+        for (alias, gate), limiter in self._limiters.items():
+            data.setdefault(alias, {})[gate] = limiter.stats()
+        return data
+
+
+admission = AdmissionController()
+
+
+class AdmissionMiddleware(Middleware):
+    """Applies the alias's "mcp" gate to every request through its proxy."""
+
+    def __init__(self, alias: str):
+        super().__init__()
+        self.alias = alias
+
+    async def on_request(self, context: MiddlewareContext, call_next):
+        limiter = admission.get(self.alias, "mcp")
+        try:
+            started = await limiter.acquire()
+        except Rejected as e:
+            raise McpError(
+                ErrorData(
+                    code=INTERNAL_ERROR,
+                    message=f"{e.reason} for '{self.alias}', retry after {e.retry_after}s",
+                    data={"status": e.status, "retry_after": e.retry_after},
+                )
+            )
+
+        try:
+            return await call_next(context)
+        finally:
+            limiter.release(started)
@@ -0,0 +1,204 @@
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.server.dependencies import get_http_headers
+from src.gateway.singleflight import mcp_inflight
+from collections import OrderedDict
+from dataclasses import dataclass
+from config import settings
+import hashlib
+import json
+import time
+
+# Read-only MCP methods: safe to cache and to coalesce
+IDEMPOTENT_METHODS = frozenset(
+    {
+        "tools/list",
+        "prompts/list",
+        "resources/list",
+        "resources/templates/list",
+        "resources/read",
+    }
+)
+
+# Upstream notification -> cached methods it makes stale
+LIST_CHANGED = {
+    "notifications/tools/list_changed": ("tools/list",),
+    "notifications/prompts/list_changed": ("prompts/list",),
+    "notifications/resources/list_changed": (
+        "resources/list",
+        "resources/templates/list",
+        "resources/read",
+    ),
+    "notifications/resources/updated": ("resources/read",),
+}
+
+
+def _jsonable(obj):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json", exclude_none=True)
+    return str(obj)
+
+
+def params_hash(params) -> str:
+    """Stable hash of a request's params, ignoring _meta (trace context etc.)."""
+    if params is None:
+        return ""
+    data = _jsonable(params) if hasattr(params, "model_dump") else params
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in ("meta", "_meta")}
+    raw = json.dumps(data, sort_keys=True, default=_jsonable)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def auth_identity(headers: dict | None = None) -> str:
+    """Who is asking: a hash of the caller's Authorization header, if any."""
+    if headers is None:
+        try:
+            headers = get_http_headers(include_all=True)
+        except Exception:
+            return ""
+    token = headers.get("authorization", "")
+    return hashlib.sha256(token.encode()).hexdigest()[:16] if token else ""
+
+
+@dataclass
+class CachedResponse:
+    value: object
+    size: int
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of MCP list/read results, bounded by an estimate of the
+    serialized size of what it holds. Keys are
+    (alias, method, params hash, auth identity).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._drop(key)
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def put(self, key: tuple, value, ttl: float):
+        size = len(json.dumps(value, default=_jsonable))
+        if size > self.max_bytes:
+            return
+
+        if key in self._data:
+            self._drop(key)
+        self._data[key] = CachedResponse(value, size, time.monotonic() + ttl)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    def _drop(self, key: tuple):
+        self.bytes -= self._data.pop(key).size
+
+    def invalidate(self, alias: str | None = None, methods=None) -> int:
+        """Drop entries for `alias` (or every alias) and `methods` (or all)."""
+        stale = [
+            k
+            for k in self._data
+            if (alias is None or k[0] == alias) and (methods is None or k[1] in methods)
+        ]
+        for k in stale:
+            self._drop(k)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def notify(self, alias: str | None, method: str):
+        """Apply an upstream notification; unrelated methods are ignored."""
+        methods = LIST_CHANGED.get(method)
+        if methods:
+            self.invalidate(alias, methods)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(settings.response_cache_max_bytes)
+
+
+def cache_ttls(cfg: dict | None) -> dict:
+    """Per-method TTLs for an alias: settings defaults + its "cache" entry."""
+    return {**settings.response_cache_ttl, **((cfg or {}).get("cache") or {})}
+
+
+class ResponseCacheMiddleware(Middleware):
+    """
+    Answers repeated list/read calls for one alias from response_cache, and
+    lets concurrent identical calls share one upstream request.
+    """
+
+    def __init__(self, alias: str, ttls: dict):
+        super().__init__()
+        self.alias = alias
+        self.ttls = ttls
+
+    async def on_message(self, context: MiddlewareContext, call_next):
+        if context.method not in IDEMPOTENT_METHODS:
+            return await call_next(context)
+
+        key = (
+            self.alias,
+            context.method,
+            params_hash(context.message),
+            auth_identity(),
+        )
+        ttl = self.ttls.get(context.method, 0)
+        if ttl > 0:
+            cached = response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        led = False
+
+        async def lead():
+            nonlocal led
+            led = True
+            return await call_next(context)
+
+        try:
+            result = await mcp_inflight.do(key, lead)
+        except Exception:
+            if led:
+                raise
+            # Only a success is shared. The leader's failure (an admission
+            # rejection, a transient upstream error) may not be ours; try alone
+            result = await call_next(context)
+        if ttl > 0:
+            response_cache.put(key, result, ttl)
+        return result
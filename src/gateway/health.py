@@ -0,0 +1,283 @@
+from fastmcp.exceptions import (
+    NotFoundError,
+    PromptError,
+    ResourceError,
+    ToolError,
+    ValidationError,
+)
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from mcp.types import CONNECTION_CLOSED, ErrorData
+from mcp.shared.exceptions import McpError
+from urllib.parse import urlparse
+from collections import deque
+from config import settings
+import asyncio
+import time
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Errors that mean the upstream answered, just not with a success
+ANSWERED = (NotFoundError, PromptError, ResourceError, ToolError, ValidationError)
+
+
+class CircuitBreaker:
+    """
+    Per-target breaker over a sliding window of recent calls. A call fails
+    when it errors or takes longer than slow_call_ms; once the failure rate
+    reaches failure_rate the breaker opens and calls fail fast. After
+    open_seconds one trial call is let through (half-open): success closes
+    the breaker, failure re-opens it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self._window: deque[bool] = deque(maxlen=settings.breaker_window)
+        self._opened_at = 0.0
+        self._trial = False
+        self.reason = ""
+
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+        self.last_latency_ms = 0.0
+        self.last_probe = None  # (ok, monotonic time)
+
+    def allow(self) -> bool:
+        """Whether a call may go through; claims the trial when half-open."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < settings.breaker_open_seconds:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._trial = False
+
+        if self.state == HALF_OPEN:
+            if self._trial:
+                self.rejected += 1
+                return False
+            self._trial = True
+
+        return True
+
+    def is_open(self) -> bool:
+        """Open and still cooling down; doesn't claim a trial call."""
+        return (
+            self.state == OPEN
+            and time.monotonic() - self._opened_at < settings.breaker_open_seconds
+        )
+
+    def retry_after(self) -> int:
+        remaining = settings.breaker_open_seconds - (time.monotonic() - self._opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def record(self, ok: bool, latency_ms: float = 0.0, reason: str = ""):
+        self.last_latency_ms = latency_ms
+        if ok and latency_ms > settings.breaker_slow_call_ms:
+            ok, reason = False, f"slow call ({latency_ms:.0f} ms)"
+
+        if self.state == HALF_OPEN:
+            self._trial = False
+            if ok:
+                self.close()
+            else:
+                self.trip(reason or "trial call failed")
+            return
+
+        self._window.append(ok)
+        if not ok:
+            self.failures += 1
+            failed = self._window.count(False)
+            if (
+                self.state == CLOSED
+                and len(self._window) >= settings.breaker_min_calls
+                and failed / len(self._window) >= settings.breaker_failure_rate
+            ):
+                self.trip(reason or f"{failed}/{len(self._window)} recent calls failed")
+
+    def half_open(self):
+        """Allow a trial call now instead of after the cool-down."""
+        self.state = HALF_OPEN
+        self._trial = False
+
+    def abandon_trial(self):
+        """The trial call never finished; let the next call try instead."""
+        if self.state == HALF_OPEN:
+            self._trial = False
+
+    def trip(self, reason: str):
+        if self.state != OPEN:
+            self.trips += 1
+            print(f"[HEALTH] Circuit for '{self.name}' opened: {reason}")
+        self.state = OPEN
+        self.reason = reason
+        self._opened_at = time.monotonic()
+
+    def close(self):
+        if self.state != CLOSED:
+            print(f"[HEALTH] Circuit for '{self.name}' closed")
+        self.state = CLOSED
+        self.reason = ""
+        self._window.clear()
+
+    def describe(self) -> dict:
+        failed = self._window.count(False)
+        return {
+            "state": self.state,
+            "reason": self.reason,
+            "failure_rate": round(failed / len(self._window), 3) if self._window else 0,
+            "recent_calls": len(self._window),
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "trips": self.trips,
+            "last_latency_ms": round(self.last_latency_ms, 3),
+            "last_probe_ok": self.last_probe[0] if self.last_probe else None,
+            "retry_after": self.retry_after() if self.is_open() else 0,
+        }
+
+
+class HealthMonitor:
+    """
+    Breakers for each alias's upstream and, in port mode, its sub-proxy
+    port, plus a background task that TCP-probes both. A failed probe opens
+    the breaker straight away; a good probe moves an open one to half-open
+    so recovery doesn't wait out the full cool-down.
+    """
+
+    def __init__(self):
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        self._targets: dict[str, dict] = {}
+        self._task: asyncio.Task | None = None
+
+    def breaker(self, alias: str, target: str = "upstream") -> CircuitBreaker:
+        key = (alias, target)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(f"{alias}/{target}")
+        return breaker
+
+    def watch_upstream(self, alias: str, cfg: dict):
+        """Probe a remote upstream's host:port; stdio upstreams aren't probed."""
+        parsed = urlparse(cfg.get("url") or "")
+        if parsed.hostname:
+            default = 443 if parsed.scheme == "https" else 80
+            targets = self._targets.setdefault(alias, {})
+            targets["upstream"] = (parsed.hostname, parsed.port or default)
+
+    def watch_port(self, alias: str, port: int):
+        """Probe the alias's sub-proxy server (port mode only)."""
+        self._targets.setdefault(alias, {})["sub_proxy"] = ("127.0.0.1", port)
+
+    def unwatch(self, alias: str, target: str | None = None):
+        """Stop probing an alias, or just one of its targets."""
+        if target is not None:
+            self._targets.get(alias, {}).pop(target, None)
+            self._breakers.pop((alias, target), None)
+            return
+        self._targets.pop(alias, None)
+        for key in [k for k in self._breakers if k[0] == alias]:
+            del self._breakers[key]
+
+    async def _probe(self, host: str, port: int) -> bool:
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), settings.health_probe_timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    async def probe_all(self):
+        checks = [
+            (alias, target, addr)
+            for alias, targets in list(self._targets.items())
+            for target, addr in targets.items()
+        ]
+        results = await asyncio.gather(*(self._probe(*addr) for _, _, addr in checks))
+
+        for (alias, target, (host, port)), ok in zip(checks, results):
+            breaker = self.breaker(alias, target)
+            breaker.last_probe = (ok, time.monotonic())
+            if not ok:
+                breaker.trip(f"probe to {host}:{port} failed")
+            elif breaker.state == OPEN:
+                breaker.half_open()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.health_probe_interval)
+            try:
+                await self.probe_all()
+            except Exception as e:
+                print(f"[HEALTH] Probe round failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="health-probes")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def describe(self, alias: str) -> dict:
+        return {
+            target: breaker.describe()
+            for (name, target), breaker in self._breakers.items()
+            if name == alias
+        }
+
+
+health = HealthMonitor()
+
+
+class CircuitBreakerMiddleware(Middleware):
+    """
+    Innermost middleware on a proxy: fails fast while the alias's upstream
+    circuit is open and records how each upstream call went.
+    """
+
+    def __init__(self, alias: str):
+        super().__init__()
+        self.alias = alias
+
+    async def on_request(self, context: MiddlewareContext, call_next):
+        breaker = health.breaker(self.alias)
+        if not breaker.allow():
+            raise McpError(
+                ErrorData(
+                    code=CONNECTION_CLOSED,
+                    message=f"Upstream '{self.alias}' is unavailable "
+                    f"(circuit open: {breaker.reason}), retry after "
+                    f"{breaker.retry_after()}s",
+                )
+            )
+
+        start = time.perf_counter()
+        try:
+            result = await call_next(context)
+        except ANSWERED:
+            breaker.record(True, (time.perf_counter() - start) * 1000)
+            raise
+        except McpError as e:
+            answered = e.error.code != CONNECTION_CLOSED
+            breaker.record(answered, (time.perf_counter() - start) * 1000, str(e))
+            raise
+        except asyncio.CancelledError:
+            breaker.abandon_trial()
+            raise
+        except Exception as e:
+            breaker.record(False, (time.perf_counter() - start) * 1000, repr(e))
+            raise
+
+        breaker.record(True, (time.perf_counter() - start) * 1000)
+        return result
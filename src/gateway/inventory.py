@@ -0,0 +1,184 @@
+from fastapi.encoders import jsonable_encoder
+from src.gateway.models import proxy_info
+from dataclasses import dataclass
+from config import settings
+import asyncio
+import json
+import time
+
+
+@dataclass
+class InventoryEntry:
+    proxy: object  # the mounted proxy the listing came from
+    fragment: str  # the listing as a JSON object, minus its closing brace
+    fetched_at: float
+    ok: bool
+    error: str = ""
+
+    def ttl(self) -> float:
+        return settings.inventory_ttl if self.ok else settings.inventory_error_ttl
+
+    def expired(self, now: float) -> bool:
+        return now - self.fetched_at >= self.ttl()
+
+
+def _render(info: dict) -> str:
+    # Stored open-ended so live fields can be appended without re-encoding
+    return json.dumps(jsonable_encoder(info))[:-1]
+
+
+def _by_alias(proxies):
+    # One listing per alias; the latest mount wins
+    return {proxy.alias: proxy for proxy in proxies}.values()
+
+
+def _empty(proxy) -> dict:
+    return {"name": str(proxy), "tools": [], "prompts": [], "resources": []}
+
+
+class InventoryCache:
+    """
+    Per-alias tools/prompts/resources listings for /inventory, kept in
+    memory and pre-rendered. An expired listing is still served (stale)
+    while one background task per alias refetches it, and a loop refreshes
+    expired listings between requests, so /inventory never waits on an
+    upstream. Failed listings keep the last good data, if any, and are
+    retried after inventory_error_ttl instead of being cached as empty.
+    Aliases that aren't running (idle in lazy mode) are never refetched,
+    since listing one would reconnect its upstream; their last listing is
+    served as "idle" until a request starts them again.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, InventoryEntry] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._task: asyncio.Task | None = None
+        self.running = lambda alias: True  # set by start()
+
+        self.refreshes = 0
+        self.failures = 0
+        self.stale_served = 0
+
+    def schedule(self, proxy):
+        """Refetch a proxy's listing in the background, once at a time."""
+        alias = proxy.alias
+        task = self._refreshing.get(alias)
+        if task is not None and not task.done():
+            return
+        self._refreshing[alias] = asyncio.create_task(
+            self._refresh(proxy), name=f"inventory-{alias}"
+        )
+
+    async def _refresh(self, proxy):
+        alias = proxy.alias
+        previous = self._entries.get(alias)
+        try:
+            info = await asyncio.wait_for(proxy_info(proxy), settings.inventory_timeout)
+            entry = InventoryEntry(proxy, _render(info), time.monotonic(), ok=True)
+        except Exception as e:
+            self.failures += 1
+            error = str(e) or type(e).__name__
+            print(f"[INVENTORY] Listing '{alias}' failed: {error}")
+            keep = previous is not None and previous.proxy is proxy
+            fragment = previous.fragment if keep else _render(_empty(proxy))
+            entry = InventoryEntry(
+                proxy, fragment, time.monotonic(), ok=False, error=error
+            )
+        finally:
+            if self._refreshing.get(alias) is asyncio.current_task():
+                del self._refreshing[alias]
+
+        self.refreshes += 1
+        self._entries[alias] = entry
+
+    def invalidate(self, alias: str):
+        """Forget an alias's listing, e.g. when it's added, changed or removed."""
+        self._entries.pop(alias, None)
+        task = self._refreshing.pop(alias, None)
+        if task is not None:
+            task.cancel()
+
+    def revalidate(self, proxies):
+        now = time.monotonic()
+        for proxy in _by_alias(proxies):
+            if not self.running(proxy.alias):
+                continue
+            entry = self._entries.get(proxy.alias)
+            if entry is None or entry.proxy is not proxy or entry.expired(now):
+                self.schedule(proxy)
+
+    def render(self, proxies, extra) -> str:
+        """
+        The inventory as a JSON object, answered from memory. `extra(alias)`
+        gives live fields to add to each alias (e.g. circuit state).
+        """
+        now = time.monotonic()
+        parts = []
+        for proxy in _by_alias(proxies):
+            alias = proxy.alias
+            running = self.running(alias)
+            entry = self._entries.get(alias)
+            if entry is None or entry.proxy is not proxy:
+                if running:
+                    self.schedule(proxy)
+                fragment = _render(_empty(proxy))
+                meta = {"state": "loading" if running else "idle"}
+            else:
+                stale = entry.expired(now)
+                if stale and running:
+                    self.stale_served += 1
+                    self.schedule(proxy)
+                meta = {
+                    "state": "idle" if not running else "stale" if stale else "fresh",
+                    "age_s": round(now - entry.fetched_at, 3),
+                    "ok": entry.ok,
+                }
+                if entry.error:
+                    meta["error"] = entry.error
+                fragment = entry.fragment
+
+            live = {**extra(alias), "inventory": meta}
+            parts.append(f"{json.dumps(alias)}:{fragment},{json.dumps(live)[1:]}")
+        return "{" + ",".join(parts) + "}"
+
+    async def _run(self, mcp):
+        while True:
+            try:
+                self.revalidate(list(mcp.proxies))
+            except Exception as e:
+                print(f"[INVENTORY] Revalidation failed: {e}")
+            interval = min(settings.inventory_ttl, settings.inventory_error_ttl) / 2
+            await asyncio.sleep(max(1.0, interval))
+
+    def start(self, mcp, running=None):
+        """
+        Warm every running alias now and keep listings fresh in the
+        background. `running(alias)` says whether an alias may be listed.
+        """
+        if running is not None:
+            self.running = running
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(mcp), name="inventory-refresh")
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._refreshing.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._refreshing.clear()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "aliases": len(self._entries),
+            "stale": sum(e.expired(now) for e in self._entries.values()),
+            "failed": sum(not e.ok for e in self._entries.values()),
+            "refreshing": len(self._refreshing),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "stale_served": self.stale_served,
+        }
+
+
+inventory = InventoryCache()
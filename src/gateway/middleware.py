@@ -1,7 +1,9 @@
 from fastmcp.server.middleware import Middleware, MiddlewareContext
 from src.analyzer.filters import ScanFailure, dynamic_scan
 from fastmcp.telemetry import inject_trace_context
+from config import settings
 import logging
+import asyncio
 
 
 logger = logging.getLogger("mcpLogger")
@@ -9,49 +11,84 @@ logger.setLevel(logging.DEBUG)
 logger.addHandler(logging.FileHandler("mcp.log"))
 
 
+def get_traceparent(meta: dict | None) -> str | None:
+    if not meta:
+        return None
+    return meta.get("fastmcp.traceparent") or meta.get("traceparent")
+
+
 class LoggingMiddleware(Middleware):
     def __init__(self, name: str = "default"):
         super().__init__()
         self.name = name
 
     async def on_message(self, context: MiddlewareContext, call_next):
-        if context.method == "tools/call":
-            context.message.meta = inject_trace_context(context.message.meta)
-
-        result = await call_next(context)
-
         if context.method != "tools/call":
+            result = await call_next(context)
             logger.info("response: %s", result)
             return result
 
-        # Ensure result.meta is a dict
-        if result.meta is None:
-            result.meta = {}
+        context.message.meta = inject_trace_context(context.message.meta)
+        traceparent = get_traceparent(context.message.meta)
 
-        propagated_meta = inject_trace_context(result.meta)
-        traceparent = propagated_meta.get("fastmcp.traceparent") or propagated_meta.get("traceparent")
-        
         if not traceparent:
             logger.warning("No traceparent found in meta, skipping dynamic scan")
-            return result
-        
-        # Extract input arguments from the request
-        input_args = None
-        if context.message:
-            input_args = context.message
-        
+            return await call_next(context)
+
+        if settings.concurrent_input_scan:
+            return await self.call_with_input_scan(context, call_next, traceparent)
+
+        # Scan the input before the tool runs, so a flagged call never reaches
+        # the upstream
+        await self.scan_input(context.message, traceparent)
+        result = await call_next(context)
+
+        return await self.scan_output(result, traceparent)
+
+    async def call_with_input_scan(
+        self, context: MiddlewareContext, call_next, traceparent: str
+    ):
+        """
+        Run the input scan alongside the upstream tool call.
+        A flagged input cancels the upstream call before it returns.
+        """
+        input_scan = asyncio.create_task(self.scan_input(context.message, traceparent))
+        upstream = asyncio.create_task(call_next(context))
+
         try:
-            dynamic_scan(
-                logger,
-                traceparent,
-                "input",
-                input_args if input_args is not None else result.content,
-                self.name,
+            await input_scan
+            result = await upstream
+        finally:
+            # Don't leak either task if we were cancelled or the scan raised
+            pending = [t for t in (input_scan, upstream) if not t.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return await self.scan_output(result, traceparent)
+
+    async def scan_input(self, input_args, traceparent: str):
+        """
+        Scan a tools/call request. Raises if the scan raised or returned a
+        threat verdict; a scanner error (ScanFailure without threat) lets the
+        call through, as it always has.
+        """
+        try:
+            verdict = await dynamic_scan(
+                logger, traceparent, "input", input_args, self.name
             )
             print(f"[LoggingMiddleware] {input_args} - Input scan completed")
         except Exception as e:
             raise Exception(f"Input flagged: {e}") from e
 
+        if isinstance(verdict, ScanFailure) and verdict.threat:
+            raise Exception(f"Input flagged: {verdict.error}")
+
+    async def scan_output(self, result, traceparent: str):
+        # Ensure result.meta is a dict
+        if result.meta is None:
+            result.meta = {}
+
         out = {
             "content": result.content,
             "structured_content": result.structured_content,
@@ -61,7 +98,7 @@ class LoggingMiddleware(Middleware):
         logger.info("response: %s", result)
 
         try:
-            scan_result = dynamic_scan(
+            scan_result = await dynamic_scan(
                 logger,
                 traceparent,
                 "output",
@@ -1,6 +1,8 @@
+from src.gateway.cache import ResponseCacheMiddleware, cache_ttls, response_cache
+from src.gateway.admission import AdmissionMiddleware, admission
 from src.gateway.middleware import LoggingMiddleware, logger
-from fastmcp.server import create_proxy
-from async_lru import alru_cache
+from src.gateway.health import CircuitBreakerMiddleware, health
+from src.gateway.upstreams import upstream_config, upstreams
 from fastmcp import FastMCP
 from config import settings
 import asyncio
@@ -10,7 +12,7 @@ CONFIG_PATH = "config.json"
 
 # Monkey patch
 FastMCP.alias = "default"
-FastMCP.proxies = []
+FastMCP.proxies = ()  # read-only default; mount_proxy() gives each server its own list
 
 
 def load_config():
@@ -30,24 +32,72 @@ def save_config(cfg):
 
 
 async def mount_proxy(mcp: FastMCP, alias: str, cfg: dict):
-    proxy = create_proxy({alias: cfg}, name=alias)
-    proxy.alias = alias
-    
-    # Set backend_name to avoid telemetry errors
-    # This is used by OpenTelemetry span attributes
-    if not hasattr(proxy, 'backend_name') or proxy.backend_name is None:
-        proxy.backend_name = alias
-        print(f"[GATEWAY] Set backend_name for proxy '{alias}' to '{alias}'")
-
-    interceptor = LoggingMiddleware(alias)
-    proxy.add_middleware(interceptor)
+    # The /mcp server and the alias's sub-proxy mount the same proxy, so the
+    # alias has one upstream session and one middleware stack
+    shared, created = upstreams.acquire(alias, cfg, upstream_config(cfg))
+    proxy = shared.proxy
+
+    if created:
+        proxy.alias = alias
+
+        # Set backend_name to avoid telemetry errors
+        # This is used by OpenTelemetry span attributes
+        if not hasattr(proxy, 'backend_name') or proxy.backend_name is None:
+            proxy.backend_name = alias
+            print(f"[GATEWAY] Set backend_name for proxy '{alias}' to '{alias}'")
+
+        # A (re)mounted alias may point at a different upstream
+        response_cache.invalidate(alias)
+        proxy.add_middleware(ResponseCacheMiddleware(alias, cache_ttls(cfg)))
+        # Cache hits skip admission; everything else queues for a slot
+        admission.configure(alias, cfg)
+        proxy.add_middleware(AdmissionMiddleware(alias))
+
+        interceptor = LoggingMiddleware(alias)
+        proxy.add_middleware(interceptor)
+
+        # Innermost, so it only sees how the upstream call itself went
+        health.watch_upstream(alias, cfg)
+        proxy.add_middleware(CircuitBreakerMiddleware(alias))
+    else:
+        # Same upstream; its cache and limits settings may still have changed
+        tune_proxy(proxy, alias, cfg)
 
     mcp.mount(proxy, namespace=alias)
+    if "proxies" not in vars(mcp):
+        mcp.proxies = []
     mcp.proxies.append(proxy)
 
     return proxy
 
 
+def tune_proxy(proxy: FastMCP, alias: str, cfg: dict):
+    """Apply an alias entry's cache and limits sections to its proxy in place."""
+    for middleware in proxy.middleware:
+        if isinstance(middleware, ResponseCacheMiddleware):
+            middleware.ttls = cache_ttls(cfg)
+    admission.configure(alias, cfg)
+
+
+def _mounted_server(provider):
+    # mount() wraps the server in a FastMCPProvider, then a namespace wrapper
+    while hasattr(provider, "_inner"):
+        provider = provider._inner
+    return getattr(provider, "server", None)
+
+
+async def unmount_proxy(proxy, mcp: FastMCP | None = None):
+    """
+    Undo one mount_proxy(): detach the proxy from `mcp` (if given) and
+    release its upstream reference; the last one closes the upstream.
+    """
+    if mcp is not None:
+        if proxy in mcp.proxies:
+            mcp.proxies.remove(proxy)
+        mcp.providers = [p for p in mcp.providers if _mounted_server(p) is not proxy]
+    await upstreams.release(proxy)
+
+
 async def setup():
     mcp = FastMCP(name=settings.app_name)
     config = load_config()
@@ -58,49 +108,17 @@ async def setup():
     return mcp
 
 
-@alru_cache(maxsize=128)
 async def proxy_info(proxy):
-    try:
-        tools, prompts, resources = await asyncio.gather(
-            proxy.list_tools(),
-            proxy.list_prompts(),
-            proxy.list_resources(),
-        )
-
-        return {
-            "name": str(proxy),
-            "tools": tools,
-            "prompts": prompts,
-            "resources": resources,
-        }
-
-    except Exception:
-        return {
-            "name": str(proxy),
-            "tools": [],
-            "prompts": [],
-            "resources": [],
-        }
-
-
-@alru_cache(maxsize=1)
-async def gateway_info(prox):
-    proxies = list(prox.proxies)
-
-    results = await asyncio.gather(
-        *(proxy_info(p) for p in proxies), return_exceptions=True
+    """A proxy's listings; raises if the upstream can't be listed (see inventory.py)."""
+    tools, prompts, resources = await asyncio.gather(
+        proxy.list_tools(),
+        proxy.list_prompts(),
+        proxy.list_resources(),
     )
 
-    data = {}
-    for p, result in zip(proxies, results):
-        if isinstance(result, Exception):
-            data[p.alias] = {
-                "name": str(p),
-                "tools": [],
-                "prompts": [],
-                "resources": [],
-            }
-        else:
-            data[p.alias] = result
-
-    return data
+    return {
+        "name": str(proxy),
+        "tools": tools,
+        "prompts": prompts,
+        "resources": resources,
+    }
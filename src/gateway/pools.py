@@ -0,0 +1,190 @@
+from dataclasses import dataclass, fields
+from config import settings
+import asyncio
+import httpx
+import time
+
+try:
+    import h2  # noqa: F401  httpx needs it for http2=True
+except ImportError:
+    h2 = None
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    max_connections: int = settings.pool_max_connections
+    max_keepalive: int = settings.pool_max_keepalive
+    keepalive_expiry: float = settings.pool_keepalive_expiry
+    pool_timeout: float = settings.pool_timeout
+    http2: bool = settings.pool_http2
+
+    @classmethod
+    def from_alias(cls, cfg: dict | None) -> "PoolConfig":
+        """Read the optional "pool" section of an alias entry in config.json."""
+        section = (cfg or {}).get("pool") or {}
+        known = {f.name for f in fields(cls)}
+        unknown = set(section) - known
+        if unknown:
+            print(f"[POOLS] Ignoring unknown pool settings: {sorted(unknown)}")
+        return cls(**{k: v for k, v in section.items() if k in known})
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class AliasPool:
+    """
+    Connection pool and concurrency limit for one alias. `slots` caps the
+    requests in flight at max_connections, so a busy alias waits on its own
+    pool instead of taking connections from everyone else.
+    """
+
+    def __init__(self, alias: str, config: PoolConfig):
+        self.alias = alias
+        self.config = config
+        self.slots = asyncio.Semaphore(config.max_connections)
+        self._client: httpx.AsyncClient | None = None
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            http2 = self.config.http2
+            if http2 and h2 is None:
+                print(
+                    f"[POOLS] http2 requested for '{self.alias}' but h2 is not installed"
+                )
+                http2 = False
+
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    connect=10.0,  # 10 seconds to establish connection
+                    read=None,  # No timeout for reading (allows streaming)
+                    write=30.0,  # 30 seconds to write request
+                    pool=self.config.pool_timeout,
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive,
+                    keepalive_expiry=self.config.keepalive_expiry,
+                ),
+                http2=http2,
+            )
+        return self._client
+
+    async def acquire(self):
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.config.pool_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolExhausted(self.alias)
+        finally:
+            self.waiting -= 1
+
+        waited = (time.perf_counter() - start) * 1000
+        self.acquired += 1
+        self.total_wait_ms += waited
+        self.max_wait_ms = max(self.max_wait_ms, waited)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def release(self):
+        self.in_use -= 1
+        self.slots.release()
+
+    def reconfigure(self, config: PoolConfig):
+        """
+        Apply new pool settings in place. The slot count is adjusted as
+        requests come and go; a new client with the new limits is built on
+        next use, and the old one closes once its requests are done.
+        """
+        grow = config.max_connections - self.config.max_connections
+        self.config = config
+        for _ in range(grow):
+            self.slots.release()
+        if grow < 0:
+            asyncio.create_task(self._withhold(-grow))
+
+        old, self._client = self._client, None
+        if old is not None:
+            asyncio.create_task(self._retire_client(old))
+
+    async def _withhold(self, count: int):
+        # Take slots as they free up and keep them, shrinking the limit
+        for _ in range(count):
+            await self.slots.acquire()
+
+    async def _retire_client(self, client: httpx.AsyncClient):
+        deadline = time.monotonic() + settings.sub_proxy_drain_timeout
+        while self.in_use and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        await client.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "max_connections": self.config.max_connections,
+            "max_keepalive": self.config.max_keepalive,
+            "http2": self.config.http2 and h2 is not None,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "utilisation": round(self.in_use / self.config.max_connections, 3),
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "max": round(self.max_wait_ms, 3),
+                "avg": round(self.total_wait_ms / self.acquired, 3)
+                if self.acquired
+                else 0,
+            },
+        }
+
+
+class UpstreamPools:
+    def __init__(self):
+        self._pools: dict[str, AliasPool] = {}
+
+    def get(self, alias: str) -> AliasPool:
+        pool = self._pools.get(alias)
+        if pool is None:
+            pool = self._pools[alias] = AliasPool(alias, PoolConfig())
+        return pool
+
+    async def configure(self, alias: str, cfg: dict):
+        """Create or resize the pool for `alias` from its config.json entry."""
+        config = PoolConfig.from_alias(cfg)
+        pool = self._pools.get(alias)
+        if pool is None:
+            self._pools[alias] = AliasPool(alias, config)
+        elif pool.config != config:
+            pool.reconfigure(config)
+
+    async def remove(self, alias: str):
+        pool = self._pools.pop(alias, None)
+        if pool is not None:
+            await pool.aclose()
+
+    async def aclose(self):
+        await asyncio.gather(*(p.aclose() for p in self._pools.values()))
+        self._pools.clear()
+
+    def stats(self) -> dict:
+        return {alias: pool.stats() for alias, pool in self._pools.items()}
+
+
+upstream_pools = UpstreamPools()
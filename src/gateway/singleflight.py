@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key starts
+    the work, everyone arriving while it runs awaits the same result. The
+    work runs in its own task, so a caller that gives up (client
+    disconnect) doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: dict[tuple, asyncio.Task] = {}
+
+        self.calls = 0
+        self.upstream_calls = 0
+
+    async def do(self, key: tuple, fn):
+        self.calls += 1
+        task = self._inflight.get(key)
+
+        if task is None:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+
+        return await asyncio.shield(task)
+
+    def _done(self, key: tuple, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as seen even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        coalesced = self.calls - self.upstream_calls
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": coalesced,
+            "coalescing_ratio": round(coalesced / self.calls, 4) if self.calls else 0,
+        }
+
+
+def _rewrite(message, request_id):
+    if isinstance(message, dict) and ("result" in message or "error" in message):
+        message["id"] = request_id
+    return message
+
+
+def rewrite_jsonrpc_id(body: bytes, content_type: str, request_id) -> bytes:
+    """Point a JSON or SSE JSON-RPC response at another request's id."""
+    if "text/event-stream" not in content_type:
+        try:
+            message = json.loads(body)
+        except ValueError:
+            return body
+        return json.dumps(_rewrite(message, request_id)).encode()
+
+    lines = []
+    for line in body.split(b"\n"):
+        if line.startswith(b"data:"):
+            cr = b"\r" if line.endswith(b"\r") else b""
+            try:
+                message = json.loads(line[5:])
+            except ValueError:
+                pass
+            else:
+                rewritten = json.dumps(_rewrite(message, request_id)).encode()
+                line = b"data: " + rewritten + cr
+        lines.append(line)
+    return b"\n".join(lines)
+
+
+# /mcp and sub-proxy FastMCP calls, and raw /v1/{alias} requests
+mcp_inflight = SingleFlight()
+http_inflight = SingleFlight()
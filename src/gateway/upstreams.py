@@ -0,0 +1,330 @@
+from fastmcp.client.messages import MessageHandler
+from fastmcp.client.tasks import TaskNotificationHandler
+from fastmcp.server.context import Context, _current_context
+from fastmcp.server.dependencies import _current_server
+from mcp.server.lowlevel.server import request_ctx
+from src.gateway.cache import response_cache
+import mcp.types
+import hashlib
+import asyncio
+from dataclasses import dataclass, field
+import weakref
+import copy
+import json
+import time
+
+try:
+    from fastmcp.server.providers.proxy import (
+        FastMCPProxy,
+        ProxyClient,
+        default_proxy_elicitation_handler,
+        default_proxy_log_handler,
+        default_proxy_progress_handler,
+        default_proxy_roots_handler,
+        default_proxy_sampling_handler,
+    )
+except ImportError:  # older fastmcp layout
+    from fastmcp.server.proxy import (
+        FastMCPProxy,
+        ProxyClient,
+        default_proxy_elicitation_handler,
+        default_proxy_log_handler,
+        default_proxy_progress_handler,
+        default_proxy_roots_handler,
+        default_proxy_sampling_handler,
+    )
+
+
+# Alias entry keys read by the gateway itself, never passed to fastmcp
+GATEWAY_KEYS = frozenset({"pool", "cache", "limits"})
+
+
+def upstream_config(cfg: dict) -> dict:
+    """The part of an alias entry that describes the upstream MCP server."""
+    return {k: v for k, v in cfg.items() if k not in GATEWAY_KEYS}
+
+
+def config_digest(cfg: dict) -> str:
+    """
+    Hash of an alias's upstream connection settings. Gateway-only sections
+    (pool, cache, limits) are left out: editing them is applied in place,
+    not by reconnecting.
+    """
+    return hashlib.sha256(
+        json.dumps(upstream_config(cfg), sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+class UpstreamMessageHandler(MessageHandler):
+    """
+    Applies the upstream's notifications to the response cache, so a
+    list_changed drops the alias's cached listings however it's reached.
+    Everything is then passed on to the client's usual task handler.
+    """
+
+    def __init__(self, alias: str):
+        super().__init__()
+        self.alias = alias
+        self.tasks: MessageHandler = MessageHandler()
+
+    async def dispatch(self, message):
+        if isinstance(message, mcp.types.ServerNotification):
+            response_cache.notify(self.alias, message.root.method)
+        await self.tasks.dispatch(message)
+
+
+def _current_caller():
+    """The downstream request being served, or None outside of one."""
+    ctx = _current_context.get()
+    try:
+        rc = request_ctx.get()
+    except LookupError:
+        return None
+    return None if ctx is None else (rc, ctx._fastmcp)
+
+
+def _enter_caller(caller):
+    """
+    Point the request ContextVars at a caller's request. Upstream messages
+    are handled in the session's receive loop, whose ContextVars belong to
+    whichever request connected it; fastmcp's default proxy handlers read
+    them through get_context(). Set-only, like fastmcp's own repair of
+    that loop.
+    """
+    rc, server_ref = caller
+    request_ctx.set(rc)
+    server = server_ref()
+    if server is not None:
+        _current_context.set(Context(server))
+        _current_server.set(weakref.ref(server))
+
+
+@dataclass
+class Usage:
+    """Calls inside an upstream session, and when one last finished."""
+
+    in_flight: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class UpstreamClient(ProxyClient):
+    """
+    ProxyClient whose session is shared by every request to the alias.
+    Each request works through its own copy (for_request), so the
+    upstream's progress for a call is reported to the caller that made it.
+    Logs, sampling, elicitation and roots requests carry no call id: they
+    are forwarded when exactly one request is in flight, and otherwise
+    logged here (logs) or refused, never handed to the wrong caller.
+    """
+
+    def __init__(self, alias: str, upstream_cfg: dict, **kwargs):
+        self.alias = alias
+        # Shared by every copy: the requests currently inside the session
+        self._callers: list = []
+        self.usage = Usage()
+        self._request = False
+        self._caller = None
+        super().__init__(
+            {alias: upstream_cfg},
+            roots=self._for_caller(default_proxy_roots_handler),
+            sampling_handler=self._for_caller(default_proxy_sampling_handler),
+            elicitation_handler=self._for_caller(default_proxy_elicitation_handler),
+            log_handler=self._forward_log,
+            **kwargs,
+        )
+        # The session outlives any one caller, so it must not carry the
+        # headers of whichever request happened to connect it
+        if hasattr(self.transport, "forward_incoming_headers"):
+            self.transport.forward_incoming_headers = False
+
+    def for_request(self) -> "UpstreamClient":
+        """A copy on the same session, bound to the current request."""
+        client = copy.copy(self)
+        client._request = True
+        client._caller = _current_caller()
+        if client._caller is not None:
+            client._progress_handler = self._bound(
+                default_proxy_progress_handler, client._caller
+            )
+        return client
+
+    async def __aenter__(self):
+        # Counted before connecting, so an idle close can't slip in between
+        if self._request:
+            self.usage.in_flight += 1
+        try:
+            await super().__aenter__()
+        except BaseException:
+            self._finished()
+            raise
+        if self._caller is not None:
+            self._callers.append(self._caller)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self._caller is not None:
+            self._callers.remove(self._caller)
+        try:
+            await super().__aexit__(exc_type, exc_value, traceback)
+        finally:
+            self._finished()
+
+    def _finished(self):
+        if self._request:
+            self.usage.in_flight -= 1
+            self.usage.last_used = time.monotonic()
+
+    def _sole_caller(self):
+        return self._callers[0] if len(self._callers) == 1 else None
+
+    @staticmethod
+    def _bound(handler, caller):
+        async def forward(*args, **kwargs):
+            _enter_caller(caller)
+            return await handler(*args, **kwargs)
+
+        return forward
+
+    def _for_caller(self, handler):
+        async def forward(*args, **kwargs):
+            caller = self._sole_caller()
+            if caller is None:
+                raise RuntimeError(
+                    f"'{self.alias}' has {len(self._callers)} requests in flight; "
+                    "can't tell which one this is for"
+                )
+            _enter_caller(caller)
+            return await handler(*args, **kwargs)
+
+        return forward
+
+    async def _forward_log(self, message):
+        caller = self._sole_caller()
+        if caller is None:
+            print(f"[UPSTREAMS] '{self.alias}' log ({message.level}): {message.data}")
+            return
+        _enter_caller(caller)
+        await default_proxy_log_handler(message)
+
+
+class SharedUpstream:
+    """
+    One upstream client and proxy server for an alias, mounted by both the
+    gateway's /mcp server and the alias's sub-proxy. The client connects on
+    first use, inside the serving event loop, and the session is held open
+    until the last mount releases it. Calls through either mount count
+    towards its usage.
+    """
+
+    def __init__(self, alias: str, digest: str, upstream_cfg: dict):
+        self.alias = alias
+        self.digest = digest
+        handler = UpstreamMessageHandler(alias)
+        self.client = UpstreamClient(alias, upstream_cfg, message_handler=handler)
+        handler.tasks = TaskNotificationHandler(self.client)
+        self.proxy = FastMCPProxy(client_factory=self.get_client, name=alias)
+        self.refs = 0
+
+        self._held = False
+        self._lock = asyncio.Lock()
+        self.connects = 0
+
+    async def get_client(self) -> UpstreamClient:
+        if self._held and self.client.is_connected():
+            return self.client.for_request()
+
+        # A call waiting for the session to open is in flight too
+        self.client.usage.in_flight += 1
+        try:
+            async with self._lock:
+                if self._held and not self.client.is_connected():
+                    # The session died (upstream restart etc.); start a new one
+                    await self._let_go()
+                if not self._held:
+                    await self.client.__aenter__()
+                    self._held = True
+                    self.connects += 1
+        finally:
+            self.client.usage.in_flight -= 1
+        return self.client.for_request()
+
+    async def _let_go(self):
+        self._held = False
+        try:
+            await self.client.__aexit__(None, None, None)
+        except Exception as e:
+            print(f"[UPSTREAMS] Error closing '{self.alias}': {e}")
+
+    @property
+    def in_flight(self) -> int:
+        return self.client.usage.in_flight
+
+    @property
+    def last_used(self) -> float:
+        return self.client.usage.last_used
+
+    async def close(self, idle: bool = False) -> bool:
+        """Drop the held session. With `idle`, only if no call is using it."""
+        async with self._lock:
+            if idle and self.in_flight:
+                return False
+            if self._held:
+                await self._let_go()
+        return True
+
+
+class UpstreamRegistry:
+    """Reference-counted SharedUpstreams keyed by (alias, config digest)."""
+
+    def __init__(self):
+        self._shared: dict[tuple[str, str], SharedUpstream] = {}
+
+    def acquire(
+        self, alias: str, cfg: dict, upstream_cfg: dict
+    ) -> tuple[SharedUpstream, bool]:
+        """The shared upstream for this alias config, and whether it is new."""
+        key = (alias, config_digest(cfg))
+        shared = self._shared.get(key)
+        created = shared is None
+        if created:
+            shared = self._shared[key] = SharedUpstream(alias, key[1], upstream_cfg)
+        shared.refs += 1
+        return shared, created
+
+    def find(self, proxy) -> SharedUpstream | None:
+        return next((s for s in self._shared.values() if s.proxy is proxy), None)
+
+    async def release(self, proxy) -> bool:
+        """Drop one mount's reference; closes the upstream after the last."""
+        shared = self.find(proxy)
+        if shared is None:
+            return False
+
+        shared.refs -= 1
+        if shared.refs <= 0:
+            del self._shared[(shared.alias, shared.digest)]
+            await shared.close()
+        return True
+
+    async def disconnect(self, proxy) -> bool:
+        """
+        Close the proxy's upstream session but keep it registered; the next
+        call reconnects. Used when an idle alias is put to sleep, so a
+        session with calls still in flight (from any mount) is left open.
+        """
+        shared = self.find(proxy)
+        return shared is not None and await shared.close(idle=True)
+
+    def stats(self) -> dict:
+        return {
+            f"{shared.alias}@{shared.digest}": {
+                "refs": shared.refs,
+                "connected": shared.client.is_connected(),
+                "connects": shared.connects,
+                "in_flight": shared.in_flight,
+            }
+            for shared in self._shared.values()
+        }
+
+
+upstreams = UpstreamRegistry()
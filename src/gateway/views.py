@@ -1,6 +1,13 @@
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from fastapi import APIRouter, HTTPException
-from src.sub_proxy.test import refresh
+from src.gateway.singleflight import http_inflight, mcp_inflight
+from src.gateway.cache import response_cache
+from src.gateway.admission import admission
+from src.gateway.upstreams import upstreams
+from src.gateway.inventory import inventory
+from src.gateway.health import health
+from src.gateway.pools import upstream_pools
+from src.sub_proxy.test import refresh, sub_proxy_stats
 from pydantic import BaseModel
 from config import settings
 import asyncio
@@ -8,9 +15,9 @@ import json
 import re
 
 from src.gateway.models import (
-    gateway_info,
     load_config,
     mount_proxy,
+    unmount_proxy,
     save_config,
     setup,
 )
@@ -28,8 +35,28 @@ class ProxyCreate(BaseModel):
 
 
 @router.get("/inventory")
-async def inventory():
-    return await gateway_info(mcp)
+async def get_inventory():
+    # Circuit state is live; listings come from the background-refreshed cache
+    body = inventory.render(
+        list(mcp.proxies), lambda alias: {"health": health.describe(alias)}
+    )
+    return Response(body, media_type="application/json")
+
+
+@router.get("/metrics")
+async def metrics():
+    return {
+        "sub_proxies": sub_proxy_stats(),
+        "pools": upstream_pools.stats(),
+        "admission": admission.stats(),
+        "upstreams": upstreams.stats(),
+        "response_cache": response_cache.stats(),
+        "inventory": inventory.stats(),
+        "coalescing": {
+            "mcp": mcp_inflight.stats(),
+            "http": http_inflight.stats(),
+        },
+    }
 
 
 @router.post("/new")
@@ -49,17 +76,20 @@ async def add_proxy(payload: ProxyCreate):
         return RedirectResponse(url=f"/resolve_oauth?alias={alias}")
 
     # --- Non-OAuth flow ---
-    for p in list(mcp.proxies):
-        if p.alias == alias:
-            mcp.proxies.remove(p)
+    # Only /mcp's reference goes here; a reloading sub-proxy keeps its own on
+    # the old upstream until its in-flight requests have drained
+    for p in [p for p in mcp.proxies if p.alias == alias]:
+        await unmount_proxy(p, mcp)
 
-    await mount_proxy(mcp, alias, cfg)
+    proxy = await mount_proxy(mcp, alias, cfg)
 
     config = load_config()
     config[alias] = cfg
     save_config(config)
 
-    gateway_info.cache_clear()
+    # Drop the old listing and start fetching the new one
+    inventory.invalidate(alias)
+    inventory.schedule(proxy)
     await refresh()
 
     return {"status": "ok", "alias": alias}
@@ -75,7 +105,7 @@ async def remove_proxy(alias: str):
     config.pop(alias)
     save_config(config)
 
-    gateway_info.cache_clear()
+    inventory.invalidate(alias)
     await refresh()
 
     # Find mounted proxy
@@ -95,10 +125,8 @@ async def remove_proxy(alias: str):
         if hasattr(mounted_proxy, "disable"):
             mounted_proxy.disable()
 
-        mcp.proxies = [p for p in mcp.proxies if p.alias != alias]
-
-        if hasattr(mcp, "providers"):
-            mcp.providers = [p for p in mcp.providers if p != mounted_proxy]
+        for p in [p for p in mcp.proxies if p.alias == alias]:
+            await unmount_proxy(p, mcp)
 
         """
         # Remove from _local_provider if it exists there
@@ -1,4 +1,10 @@
-from src.gateway.models import gateway_info, load_config, mount_proxy, save_config
+from src.gateway.inventory import inventory
+from src.gateway.models import (
+    load_config,
+    mount_proxy,
+    save_config,
+    unmount_proxy,
+)
 from src.oauth.utils import decode_token_endpoint, exchange_token, run_oauth_flow
 from fastapi import Request, HTTPException, Query
 from fastapi.responses import RedirectResponse
@@ -112,18 +118,18 @@ async def oauth_callback(
             json.dump(cfg, f, indent=2)
 
         # Mount proxy now that token exists
-        for p in list(mcp.proxies):
-            if p.alias == alias:
-                mcp.proxies.remove(p)
+        for p in [p for p in mcp.proxies if p.alias == alias]:
+            await unmount_proxy(p, mcp)
 
-        await mount_proxy(mcp, alias, cfg)
+        proxy = await mount_proxy(mcp, alias, cfg)
 
         # Persist final config
         full_config = load_config()
         full_config[alias] = cfg
         save_config(full_config)
 
-        gateway_info.cache_clear()
+        inventory.invalidate(alias)
+        inventory.schedule(proxy)
         await refresh()
 
         base_path = Path(settings.temp_dir)
@@ -1,5 +1,15 @@
+from dataclasses import dataclass, field
+from functools import cached_property
+from types import MappingProxyType
+from typing import List, Mapping
 from pydantic import BaseModel
-from typing import List
+from config import settings
+import threading
+import tempfile
+import json
+import time
+import re
+import os
 
 
 class PolicyRequest(BaseModel):
@@ -15,3 +25,264 @@ class KeyPoliciesResponse(BaseModel):
 class GlobalPolicyRequest(BaseModel):
     name: str
     description: str | None = None
+    local_rules: List[str] = []  # regexes the local scan tier treats as threats
+    local_allow: List[str] = []  # regexes it may clear without the llm tier
+
+
+# -------------------------
+# Policy store
+# -------------------------
+POLICY_MAP_FILE = f"{settings.temp_dir}/key_policies.json"
+GLOBAL_POLICIES = f"{settings.temp_dir}/policies.json"
+
+
+def _compile(patterns: tuple):
+    # Case-sensitive, so secret signatures like AKIA[0-9A-Z]{16} keep their
+    # meaning; wording rules opt in with a scoped (?i:...) group
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+@dataclass(frozen=True)
+class LocalRules:
+    """
+    A policy's rules for the local scan tier. A `threats` match is a threat
+    outright; an `allow` match marks the text as known-safe for the policy.
+    Text matching neither is left to the next tier.
+    """
+
+    threats: tuple = ()
+    allow: tuple = ()
+
+    @cached_property
+    def threat_re(self):
+        return _compile(self.threats)
+
+    @cached_property
+    def allow_re(self):
+        return _compile(self.allow)
+
+
+NO_RULES = LocalRules()
+
+
+def parse_definition(definition) -> tuple[str, LocalRules]:
+    """
+    A policies.json entry is either its description, or an object with a
+    "description" and optional "local_rules" / "local_allow" regex lists.
+    """
+    if isinstance(definition, str):
+        return definition, NO_RULES
+    return definition.get("description", ""), LocalRules(
+        tuple(definition.get("local_rules", ())),
+        tuple(definition.get("local_allow", ())),
+    )
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """Immutable view of the policy files at one version."""
+
+    version: int
+    policies: Mapping[str, str]  # name -> description
+    key_policies: Mapping[str, tuple]  # alias -> policy names
+    revisions: Mapping[str, int]  # name -> version its definition last changed
+    # name -> local tier rules
+    rules: Mapping[str, LocalRules] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+
+    def for_key(self, key: str) -> tuple:
+        return self.key_policies.get(key, ())
+
+    def select(self, names) -> dict:
+        return {name: self.policies[name] for name in names if name in self.policies}
+
+    def select_rules(self, names) -> dict:
+        return {
+            name: self.rules.get(name, NO_RULES)
+            for name in names
+            if name in self.policies
+        }
+
+    def revision_of(self, names) -> tuple:
+        return tuple(self.revisions.get(name, 0) for name in sorted(names))
+
+
+def _read_json(path: str, default: dict) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _atomic_write(path: str, data: dict):
+    dirname = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix=".policies-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class PolicyStore:
+    """
+    Process-wide policy store. Loads both policy files once and serves
+    lookups from an immutable snapshot; writes go through to disk atomically
+    and publish a new snapshot. External edits are picked up by polling the
+    files' mtimes at most once per `poll_interval` seconds.
+    """
+
+    def __init__(self, map_file: str, policies_file: str, poll_interval: float):
+        self.map_file = map_file
+        self.policies_file = policies_file
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._definitions = {}  # policies.json as last read or written
+        self._snapshot = PolicySnapshot(
+            0, MappingProxyType({}), MappingProxyType({}), MappingProxyType({})
+        )
+        self._mtimes = None
+        self._next_poll = 0.0
+        self.reload()
+
+    # --- reads ---
+
+    def snapshot(self) -> PolicySnapshot:
+        if time.monotonic() >= self._next_poll:
+            self._poll()
+        return self._snapshot
+
+    def _stat(self) -> tuple:
+        mtimes = []
+        for path in (self.map_file, self.policies_file):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _poll(self):
+        self._next_poll = time.monotonic() + self.poll_interval
+        if self._stat() != self._mtimes:
+            print("[POLICIES] Policy files changed on disk, reloading")
+            self.reload()
+
+    def reload(self):
+        with self._lock:
+            self._mtimes = self._stat()
+            self._publish(
+                _read_json(self.policies_file, {}), _read_json(self.map_file, {})
+            )
+
+    # --- writes ---
+
+    def subscribe(self, callback):
+        """callback(old, new) runs after every published change."""
+        self._listeners.append(callback)
+
+    def _publish(self, definitions: dict, key_policies: dict):
+        old = self._snapshot
+        version = old.version + 1
+
+        parsed = {name: parse_definition(d) for name, d in definitions.items()}
+        revisions = {
+            name: old.revisions[name]
+            if name in old.policies
+            and (old.policies[name], old.rules.get(name, NO_RULES)) == parsed[name]
+            else version
+            for name in parsed
+        }
+
+        self._definitions = dict(definitions)
+        self._snapshot = PolicySnapshot(
+            version,
+            MappingProxyType({name: desc for name, (desc, _) in parsed.items()}),
+            MappingProxyType({k: tuple(v) for k, v in key_policies.items()}),
+            MappingProxyType(revisions),
+            MappingProxyType({name: rules for name, (_, rules) in parsed.items()}),
+        )
+
+        for callback in self._listeners:
+            try:
+                callback(old, self._snapshot)
+            except Exception as e:
+                print(f"[POLICIES] Listener failed: {e}")
+
+    def _write(self, policies: dict | None = None, key_policies: dict | None = None):
+        current = self._snapshot
+        if policies is not None:
+            _atomic_write(self.policies_file, policies)
+        if key_policies is not None:
+            _atomic_write(self.map_file, key_policies)
+        # our own writes are not external edits
+        self._mtimes = self._stat()
+
+        self._publish(
+            policies if policies is not None else self._definitions,
+            key_policies
+            if key_policies is not None
+            else {k: list(v) for k, v in current.key_policies.items()},
+        )
+
+    def _key_policies(self) -> dict:
+        return {k: list(v) for k, v in self._snapshot.key_policies.items()}
+
+    def ensure_keys(self, keys):
+        with self._lock:
+            key_policies = self._key_policies()
+            for key in keys:
+                key_policies.setdefault(key, [])
+            self._write(key_policies=key_policies)
+
+    def add_policy(self, key: str, policy_name: str) -> list:
+        with self._lock:
+            key_policies = self._key_policies()
+            names = key_policies.setdefault(key, [])
+            if policy_name not in names:
+                names.append(policy_name)
+                self._write(key_policies=key_policies)
+            return names
+
+    def remove_policy(self, key: str, policy_name: str) -> bool:
+        with self._lock:
+            key_policies = self._key_policies()
+            if policy_name not in key_policies.get(key, []):
+                return False
+            key_policies[key].remove(policy_name)
+            self._write(key_policies=key_policies)
+            return True
+
+    def create(self, name: str, description: str, rules: LocalRules = NO_RULES) -> bool:
+        with self._lock:
+            policies = dict(self._definitions)
+            if name in policies:
+                return False
+            if rules == NO_RULES:
+                policies[name] = description
+            else:
+                policies[name] = {
+                    "description": description,
+                    "local_rules": list(rules.threats),
+                    "local_allow": list(rules.allow),
+                }
+            self._write(policies=policies)
+            return True
+
+    def delete(self, name: str):
+        with self._lock:
+            policies = dict(self._definitions)
+            policies.pop(name, None)
+            self._write(policies=policies)
+
+
+policy_store = PolicyStore(
+    POLICY_MAP_FILE, GLOBAL_POLICIES, settings.policy_poll_interval
+)
@@ -1,30 +1,22 @@
-from .models import GlobalPolicyRequest, PolicyRequest
+from .models import (
+    GlobalPolicyRequest,
+    LocalRules,
+    PolicyRequest,
+    PolicySnapshot,
+    policy_store,
+)
+from src.analyzer.models import clear_report_registry
+from src.analyzer.cache import verdict_cache
 from fastapi import APIRouter, HTTPException
-from config import settings
 from typing import Dict
 import json
+import re
 import os
 
 
 router = APIRouter()
 
 CONFIG_FILE = "config.json"
-POLICY_MAP_FILE = f"{settings.temp_dir}/key_policies.json"
-GLOBAL_POLICIES = f"{settings.temp_dir}/policies.json"
-
-
-def load_json(path, default):
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            return json.load(f)
-    with open(path, "w") as f:
-        json.dump(default, f, indent=2)
-    return default
-
-
-def save_json(path, data):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
 
 
 def initialize_policy_map():
@@ -34,38 +26,37 @@ def initialize_policy_map():
     with open(CONFIG_FILE, "r") as f:
         config = json.load(f)
 
-    policy_map = load_json(POLICY_MAP_FILE, {})
+    policy_store.ensure_keys(config.keys())
 
-    for key in config.keys():
-        policy_map.setdefault(key, [])
 
-    save_json(POLICY_MAP_FILE, policy_map)
+def invalidate_changed_policies(old: PolicySnapshot, new: PolicySnapshot):
+    """Drop cached scan state built from policy definitions that changed."""
+    changed = {
+        name
+        for name in old.policies.keys() | new.policies.keys()
+        if old.revisions.get(name) != new.revisions.get(name)
+    }
+    if not changed:
+        return
+
+    for name in changed:
+        verdict_cache.invalidate_policy(name)
+    clear_report_registry()
 
 
+policy_store.subscribe(invalidate_changed_policies)
 initialize_policy_map()
 
 
 @router.post("/add")
 def add_policy(payload: PolicyRequest):
-    policy_map = load_json(POLICY_MAP_FILE, {})
-
-    policy_map.setdefault(payload.key, [])
-
-    if payload.policy_name not in policy_map[payload.key]:
-        policy_map[payload.key].append(payload.policy_name)
-
-    save_json(POLICY_MAP_FILE, policy_map)
-
-    return {"status": "ok", "key": payload.key, "policies": policy_map[payload.key]}
+    policies = policy_store.add_policy(payload.key, payload.policy_name)
+    return {"status": "ok", "key": payload.key, "policies": policies}
 
 
 @router.post("/remove")
 def remove_policy(payload: PolicyRequest):
-    policy_map = load_json(POLICY_MAP_FILE, {})
-
-    if payload.key in policy_map and payload.policy_name in policy_map[payload.key]:
-        policy_map[payload.key].remove(payload.policy_name)
-        save_json(POLICY_MAP_FILE, policy_map)
+    if policy_store.remove_policy(payload.key, payload.policy_name):
         return {"status": "ok"}
 
     raise HTTPException(status_code=404, detail="Policy or key not found")
@@ -73,51 +64,55 @@ def remove_policy(payload: PolicyRequest):
 
 @router.get("/{key}")
 def get_policies(key: str):
-    policy_map = load_json(POLICY_MAP_FILE, {})
-    return {"key": key, "policies": policy_map.get(key, [])}
+    snapshot = policy_store.snapshot()
+    return {"key": key, "policies": list(snapshot.for_key(key))}
 
 
 @router.post("/create")
 def add_global_policy(payload: GlobalPolicyRequest):
-    policies = load_json(GLOBAL_POLICIES, {})
-
-    if payload.name in policies:
+    description = payload.description or ""
+    for pattern in [*payload.local_rules, *payload.local_allow]:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid local rule {pattern!r}: {e}"
+            )
+    rules = LocalRules(tuple(payload.local_rules), tuple(payload.local_allow))
+
+    if not policy_store.create(payload.name, description, rules):
         raise HTTPException(status_code=400, detail="Policy already exists")
 
-    policies[payload.name] = payload.description or ""
-
-    save_json(GLOBAL_POLICIES, policies)
-
     return {
         "status": "ok",
         "policy": {
             "name": payload.name,
-            "description": policies[payload.name],
+            "description": description,
+            "local_rules": payload.local_rules,
+            "local_allow": payload.local_allow,
         },
     }
 
 
 @router.delete("/delete/{policy_name}")
 def delete_global_policy(policy_name: str):
-    policies = load_json(GLOBAL_POLICIES, {})
-    policy_map = load_json(POLICY_MAP_FILE, {})
+    snapshot = policy_store.snapshot()
 
-    if policy_name not in policies:
+    if policy_name not in snapshot.policies:
         raise HTTPException(status_code=404, detail="Policy not found")
 
-    used_by = [k for k, v in policy_map.items() if policy_name in v]
+    used_by = [k for k, v in snapshot.key_policies.items() if policy_name in v]
     if used_by:
         raise HTTPException(
             status_code=409,
             detail=f"Policy in use by keys: {used_by}",
         )
 
-    del policies[policy_name]
-    save_json(GLOBAL_POLICIES, policies)
+    policy_store.delete(policy_name)
 
     return {"status": "ok", "deleted": policy_name}
 
 
 @router.get("/")
 def all_policies() -> Dict:
-    return load_json(GLOBAL_POLICIES, {})
+    return dict(policy_store.snapshot().policies)
@@ -0,0 +1,18 @@
+import socket
+
+
+def bind_socket(host: str = "0.0.0.0", port: int = 0) -> socket.socket:
+    """
+    A bound socket for a sub-proxy server; port 0 lets the kernel pick a
+    free port, read back with getsockname(). uvicorn listens on it via
+    Server.serve(sockets=[...]), so there's no window between choosing the
+    port and taking it.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
@@ -1,20 +1,42 @@
 from config import settings  # always import first for telemetry
-from src.gateway.models import load_config, mount_proxy
+from src.gateway.models import load_config, mount_proxy, tune_proxy, unmount_proxy
+from src.gateway.admission import admission
+from src.gateway.cache import response_cache
+from src.gateway.health import health
+from src.gateway.upstreams import config_digest, upstreams
+from src.gateway.pools import upstream_pools
+from src.sub_proxy.workers import worker_pool
+from src.sub_proxy.sockets import bind_socket
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from fastapi.responses import JSONResponse
 from fastapi import FastAPI
 from fastmcp import FastMCP
 from pathlib import Path
+import tempfile
 import asyncio
 import uvicorn
 import json
+import time
+import os
 
 
 class ServerRoutes:
+    """
+    Alias -> port table. Readers get an immutable snapshot, so a lookup on
+    the request path is one dict access with no lock, copy or I/O. Writers
+    publish a new snapshot and persist it in the background (coalesced, so
+    a burst of changes is one write).
+    """
+
     _file = Path(f"{settings.temp_dir}/server_routes.json")
 
     def __new__(cls):
         if not hasattr(cls, "inst"):
             cls.inst = super().__new__(cls)
-            cls.inst._data = cls._load()
+            cls.inst._routes = MappingProxyType(cls._load())
+            cls.inst._saving = None
+            cls.inst._dirty = False
         return cls.inst
 
     @classmethod
@@ -24,33 +46,137 @@ class ServerRoutes:
                 return json.load(f)
         return {}
 
+    def _write(self, routes):
+        fd, tmp = tempfile.mkstemp(dir=self._file.parent, prefix=".routes-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(dict(routes), f)
+            os.replace(tmp, self._file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
     def _save(self):
-        with open(self._file, "w") as f:
-            json.dump(self._data, f)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self._routes)  # no loop (CLI / import time)
+            return
+
+        self._dirty = True
+        if self._saving is None or self._saving.done():
+            self._saving = asyncio.create_task(self._save_loop())
+
+    async def _save_loop(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, self._routes)
+            except Exception as e:
+                print(f"[ROUTES] Failed to persist routes: {e}")
+
+    async def flush(self):
+        """Wait for any pending background write."""
+        if self._saving is not None:
+            await self._saving
+
+    def _publish(self, routes: dict):
+        self._routes = MappingProxyType(routes)
+        self._save()
 
     def add(self, alias: str, port: int):
-        self._data[alias] = port
-        self._save()
+        self._publish({**self._routes, alias: port})
 
     def get(self, alias: str):
-        return self._data.get(alias)
+        return self._routes.get(alias)
 
     def all(self):
-        return dict(self._data)
+        """Current read-only snapshot; later changes don't affect it."""
+        return self._routes
 
     def remove(self, alias: str):
-        if alias in self._data:
-            del self._data[alias]
-            self._save()
+        if alias in self._routes:
+            self._publish({k: v for k, v in self._routes.items() if k != alias})
             return True
         return False
 
     def clear(self):
-        self._data.clear()
-        self._save()
+        self._publish({})
 
 
-_running_servers: dict[str, tuple[uvicorn.Server, asyncio.Task]] = {}
+class DrainableApp:
+    """
+    Counts the requests in flight on a sub-proxy app. Once a reload sets
+    `successor`, new requests go to the replacement while the ones already
+    here finish, so the old app can be closed when drained.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.active = 0
+        self.successor = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(self, scope, receive, send):
+        if self.successor is not None:
+            return await self.successor(scope, receive, send)
+
+        self.active += 1
+        self._idle.clear()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.active -= 1
+            if not self.active:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait for in-flight requests; False if some were still running."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+@dataclass
+class SubProxy:
+    alias: str
+    app: FastAPI | None  # None when served by a worker process
+    task: asyncio.Task | None
+    port: int | None = None  # None when served in-process
+    server: uvicorn.Server | None = None
+    stop_event: asyncio.Event | None = None
+    upstream: FastMCP | None = None  # shared with the /mcp mount
+    last_used: float = field(default_factory=time.monotonic)
+    worker: bool = False
+    config: dict = field(default_factory=dict)  # the alias entry it runs with
+    handler: DrainableApp | None = None  # in-process and multiplex modes
+
+    @property
+    def digest(self) -> str:
+        return config_digest(self.config)
+
+    async def stop(self):
+        if self.worker:
+            await worker_pool.unassign(self.alias)
+            return
+        if self.server is not None:
+            self.server.should_exit = True  # signals uvicorn to stop
+        else:
+            self.stop_event.set()
+        try:
+            # uvicorn waits up to the drain timeout for open connections
+            await asyncio.wait_for(
+                self.task, timeout=settings.sub_proxy_drain_timeout + 10
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.task.cancel()
+
+
+_running_servers: dict[str, SubProxy] = {}
+_stopping: dict[str, asyncio.Future] = {}  # aliases whose stop_server() is running
 
 
 def create_app(proxy, alias):
@@ -60,36 +186,273 @@ def create_app(proxy, alias):
     return app
 
 
-async def start_server(alias: str, cfg: dict, port: int):
+def get_app(alias: str) -> DrainableApp | None:
+    """The in-process sub-proxy app for `alias`, if one is running."""
+    entry = _running_servers.get(alias)
+    if entry is None or entry.port is not None:
+        return None
+    return entry.handler
+
+
+async def _hold_lifespan(app: FastAPI, started: asyncio.Event, stop: asyncio.Event):
+    # The MCP session manager's task group has to be entered and exited in
+    # the same task, so the lifespan lives in its own task until stopped.
+    async with app.router.lifespan_context(app):
+        started.set()
+        await stop.wait()
+
+
+async def _start_lifespan(app: FastAPI, alias: str):
+    """Run the app's lifespan in its own task; returns (task, stop event)."""
+    started, stop = asyncio.Event(), asyncio.Event()
+    task = asyncio.create_task(
+        _hold_lifespan(app, started, stop), name=f"lifespan-{alias}"
+    )
+    waiter = asyncio.create_task(started.wait())
+    await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    waiter.cancel()
+    if task.done():
+        task.result()  # re-raise the startup failure
+    return task, stop
+
+
+class MultiplexApp:
+    """
+    One ASGI app in front of every sub-proxy, dispatching on the
+    /v1/{alias}/ path prefix. Sub-app lifespans are held by their own tasks,
+    so this app's lifespan has nothing to do.
+    """
+
+    def __init__(self):
+        self.apps: dict[str, FastAPI] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        parts = scope.get("path", "").split("/", 3)  # "", "v1", alias, rest
+        app = self.apps.get(parts[2]) if len(parts) > 2 and parts[1] == "v1" else None
+        if app is None:
+            response = JSONResponse({"detail": "Alias not found"}, status_code=404)
+            return await response(scope, receive, send)
+
+        await app(scope, receive, send)
+
+
+async def _wait_started(server: uvicorn.Server, task: asyncio.Task, name: str):
+    """Wait until a uvicorn server is accepting connections."""
+    while not server.started:
+        if task.done():
+            raise RuntimeError(f"Sub-proxy server for '{name}' exited during startup")
+        await asyncio.sleep(0.01)
+
+
+class MultiplexServer:
+    def __init__(self):
+        self.app = MultiplexApp()
+        self.server: uvicorn.Server | None = None
+        self.task: asyncio.Task | None = None
+        self.port: int | None = None
+
+    async def ensure_started(self) -> int:
+        """Start the server if it isn't running; returns its port."""
+        if self.task is None or self.task.done():
+            # sub_proxy_port = 0 lets the kernel pick
+            sock = bind_socket(port=settings.sub_proxy_port)
+            self.port = sock.getsockname()[1]
+            self.server = uvicorn.Server(uvicorn.Config(self.app, log_level="info"))
+            self.task = asyncio.create_task(
+                self.server.serve(sockets=[sock]), name="sub-proxy-multiplex"
+            )
+            print(f"Started multiplexed sub-proxy server on port {self.port}")
+        await _wait_started(self.server, self.task, "multiplex")
+        return self.port
+
+
+_multiplex = MultiplexServer()
+
+
+async def start_server(alias: str, cfg: dict):
+    """
+    Start an alias's sub-proxy and publish its route once it's accepting
+    requests. Servers bind kernel-assigned ports, so any number can start
+    concurrently without colliding with each other or other processes.
+    """
     sd = ServerRoutes()
+    stopping = _stopping.get(alias)
+    if stopping is not None:
+        # Its teardown removes the alias's pool and route; let it finish
+        # so it can't take down the instance started here
+        await asyncio.shield(stopping)
+
+    if settings.sub_proxy_mode == "workers":
+        # The worker builds the sub-proxy and its own upstream session
+        await upstream_pools.configure(alias, cfg)
+        port = await worker_pool.assign(alias, cfg)
+        _running_servers[alias] = SubProxy(
+            alias, None, None, port=port, worker=True, config=cfg
+        )
+        health.watch_port(alias, port)
+        sd.add(alias, port)
+        print(f"Started proxy '{alias}' on worker port {port}")
+        return
+
     proxy = FastMCP(name=alias)
-    await mount_proxy(proxy, alias, cfg)
+    upstream = await mount_proxy(proxy, alias, cfg)
+    await upstream_pools.configure(alias, cfg)
     app = create_app(proxy, alias)
 
-    uvi_cfg = uvicorn.Config(app, host="0.0.0.0", port=port, log_level="info")
+    if settings.sub_proxy_mode == "inprocess":
+        task, stop = await _start_lifespan(app, alias)
+        _running_servers[alias] = SubProxy(
+            alias,
+            app,
+            task,
+            stop_event=stop,
+            upstream=upstream,
+            config=cfg,
+            handler=DrainableApp(app),
+        )
+        print(f"Started proxy '{alias}' in-process")
+        return
+
+    if settings.sub_proxy_mode == "multiplex":
+        task, stop = await _start_lifespan(app, alias)
+        handler = DrainableApp(app)
+        _multiplex.app.apps[alias] = handler
+        try:
+            port = await _multiplex.ensure_started()
+        except Exception:
+            _multiplex.app.apps.pop(alias, None)
+            stop.set()
+            await unmount_proxy(upstream)
+            raise
+        _running_servers[alias] = SubProxy(
+            alias,
+            app,
+            task,
+            port=port,
+            stop_event=stop,
+            upstream=upstream,
+            config=cfg,
+            handler=handler,
+        )
+        health.watch_port(alias, port)
+        sd.add(alias, port)
+        print(f"Started proxy '{alias}' on shared port {port}")
+        return
+
+    sock = bind_socket()
+    port = sock.getsockname()[1]
+    uvi_cfg = uvicorn.Config(
+        app,
+        log_level="info",
+        timeout_graceful_shutdown=settings.sub_proxy_drain_timeout,
+    )
     server = uvicorn.Server(uvi_cfg)
 
-    task = asyncio.create_task(server.serve(), name=f"server-{alias}")
-    _running_servers[alias] = (server, task)
+    task = asyncio.create_task(server.serve(sockets=[sock]), name=f"server-{alias}")
+    try:
+        await _wait_started(server, task, alias)
+    except Exception:
+        sock.close()
+        await unmount_proxy(upstream)
+        raise
+
+    _running_servers[alias] = SubProxy(
+        alias, app, task, port=port, server=server, upstream=upstream, config=cfg
+    )
+    health.watch_port(alias, port)
     sd.add(alias, port)
     print(f"Started proxy '{alias}' on port {port}")
 
 
-async def stop_server(alias: str):
+async def stop_server(alias: str, idle: bool = False):
+    """
+    Stop an alias's sub-proxy. `idle` only puts it to sleep: the alias is
+    still configured (and mounted on /mcp), so its cache, admission limits
+    and breakers are kept for when it starts again.
+    """
     sd = ServerRoutes()
     entry = _running_servers.pop(alias, None)
     if entry is None:
         return
 
-    server, task = entry
-    server.should_exit = True  # signals uvicorn to stop
+    # start_server() waits on this, so a restart can't race the teardown
+    done = _stopping[alias] = asyncio.get_running_loop().create_future()
     try:
-        await asyncio.wait_for(task, timeout=10)
-    except (asyncio.TimeoutError, asyncio.CancelledError):
-        task.cancel()
+        _multiplex.app.apps.pop(alias, None)
+        await entry.stop()
+        await unmount_proxy(entry.upstream)
+        await upstream_pools.remove(alias)
+        if idle:
+            health.unwatch(alias, "sub_proxy")
+            if entry.upstream is not None:
+                # The /mcp mount still holds it; just drop the session
+                await upstreams.disconnect(entry.upstream)
+        else:
+            response_cache.invalidate(alias)
+            admission.remove(alias)
+            health.unwatch(alias)
+
+        sd.remove(alias)
+        print(f"Stopped proxy '{alias}'")
+    finally:
+        if _stopping.get(alias) is done:
+            del _stopping[alias]
+        done.set_result(None)
+
+
+async def reload_server(alias: str, cfg: dict):
+    """
+    Move a running alias onto a new config without dropping requests. The
+    new sub-proxy and upstream session start next to the old ones, the
+    route switches in one step, and the old ones close once their in-flight
+    requests finish (or sub_proxy_drain_timeout passes).
+    """
+    old = _running_servers.get(alias)
+    await start_server(alias, cfg)  # port mode: on a new port, next to the old
+    if old is None:
+        return
+
+    new = _running_servers[alias]
+    if old.handler is not None:
+        old.handler.successor = new.handler
+    print(f"Reloaded proxy '{alias}' with its new config")
+    asyncio.create_task(_retire(alias, old), name=f"retire-{alias}")
 
-    sd.remove(alias)
-    print(f"Stopped proxy '{alias}'")
+
+async def tune_server(alias: str, cfg: dict):
+    """Apply an alias's pool, cache and limits edits to its running sub-proxy."""
+    entry = _running_servers[alias]
+    entry.config = cfg
+    await upstream_pools.configure(alias, cfg)
+    if entry.worker:
+        await worker_pool.assign(alias, cfg)  # the worker tunes its copy
+    elif entry.upstream is not None:
+        tune_proxy(entry.upstream, alias, cfg)
+    print(f"Applied new settings to proxy '{alias}'")
+
+
+async def _retire(alias: str, old: SubProxy):
+    if old.worker:
+        return  # the worker swaps and drains its own copy
+
+    if old.handler is not None:
+        if not await old.handler.drain(settings.sub_proxy_drain_timeout):
+            print(
+                f"Closing old proxy '{alias}' with {old.handler.active} requests in flight"
+            )
+    # Port mode: uvicorn's graceful shutdown drains the old server
+    await old.stop()
+    # Released only now, so drained requests kept their upstream session
+    await unmount_proxy(old.upstream)
 
 
 async def refresh():
@@ -97,6 +460,7 @@ async def refresh():
     Reload the config and reconcile running servers:
       - Stop servers whose alias is no longer in the config.
       - Start servers for aliases that are new to the config.
+      - Hot-reload servers whose alias config changed.
       - Leave unchanged aliases alone.
     """
     sd = ServerRoutes()
@@ -107,49 +471,135 @@ async def refresh():
 
     to_stop = current_aliases - new_aliases
     to_start = new_aliases - current_aliases
+    to_reload = {
+        alias
+        for alias in current_aliases & new_aliases
+        if _running_servers[alias].digest != config_digest(new_config[alias])
+    }
+    # Same upstream, edited pool/cache/limits: applied without a reload
+    to_tune = {
+        alias
+        for alias in current_aliases & new_aliases - to_reload
+        if _running_servers[alias].config != new_config[alias]
+    }
 
     # Stop removed servers
     await asyncio.gather(*[stop_server(alias) for alias in to_stop])
+    await asyncio.gather(
+        *[reload_server(alias, new_config[alias]) for alias in to_reload]
+    )
+    await asyncio.gather(*[tune_server(alias, new_config[alias]) for alias in to_tune])
 
-    # Determine next available port (above the highest currently used, or base)
-    used_ports = set(sd.all().values())
-    base_port = 8001
-
-    def next_free_port():
-        port = base_port
-        while port in used_ports:
-            port += 1
-        used_ports.add(port)
-        return port
+    if settings.sub_proxy_lazy:
+        # New aliases start on their first request
+        _lazy_config.clear()
+        _lazy_config.update(new_config)
+        print(f"Refresh complete. Running: {dict(sd.all())}")
+        return
 
     # Start new servers
     await asyncio.gather(
-        *[
-            start_server(alias, new_config[alias], next_free_port())
-            for alias in to_start
-        ]
+        *[start_server(alias, new_config[alias]) for alias in to_start]
     )
 
-    print(f"Refresh complete. Running: {sd.all()}")
+    print(f"Refresh complete. Running: {dict(sd.all())}")
+
+
+# ---- lazy mode ----
+
+_lazy_config: dict[str, dict] = {}
+_starting: dict[str, asyncio.Task] = {}
+
+
+async def ensure_started(alias: str) -> SubProxy | None:
+    """
+    The running sub-proxy for `alias`, starting it first in lazy mode.
+    Concurrent first requests share one startup; None if the alias isn't
+    configured.
+    """
+    entry = _running_servers.get(alias)
+    if entry is None and settings.sub_proxy_lazy and alias in _lazy_config:
+        task = _starting.get(alias)
+        if task is None:
+            task = _starting[alias] = asyncio.create_task(
+                start_server(alias, _lazy_config[alias]), name=f"start-{alias}"
+            )
+            task.add_done_callback(lambda _: _starting.pop(alias, None))
+        await asyncio.shield(task)
+        entry = _running_servers.get(alias)
+
+    if entry is not None:
+        entry.last_used = time.monotonic()
+    return entry
+
+
+def is_running(alias: str) -> bool:
+    """False for an alias lazy mode has stopped (or not started yet)."""
+    return not settings.sub_proxy_lazy or alias in _running_servers
+
+
+async def _reap_idle():
+    """Stop sub-proxies, and close their upstream sessions, once idle."""
+    timeout = settings.sub_proxy_idle_timeout
+    while True:
+        await asyncio.sleep(max(1.0, min(timeout / 4, 30.0)))
+        now = time.monotonic()
+
+        for alias, entry in list(_running_servers.items()):
+            if _running_servers.get(alias) is not entry:
+                continue  # stopped or replaced while we were stopping another
+            # Requests still streaming here, or calls through /mcp
+            busy = upstream_pools.get(alias).in_use
+            last_used = entry.last_used
+            shared = upstreams.find(entry.upstream)
+            if shared is not None:
+                busy = busy or shared.in_flight
+                last_used = max(last_used, shared.last_used)
+            if busy or now - last_used < timeout:
+                continue
+
+            print(f"Stopping idle proxy '{alias}'")
+            try:
+                await stop_server(alias, idle=True)
+            except Exception as e:
+                print(f"Failed to stop idle proxy '{alias}': {e}")
+
+
+def sub_proxy_stats() -> dict:
+    return {
+        "mode": settings.sub_proxy_mode,
+        "lazy": settings.sub_proxy_lazy,
+        "running": len(_running_servers),
+        "starting": len(_starting),
+        "stopping": len(_stopping),
+        "configured": len(_lazy_config)
+        if settings.sub_proxy_lazy
+        else len(_running_servers),
+        "workers": worker_pool.stats(),
+    }
 
 
 async def run_all():
-    base_port = 8001
     config = load_config()
     sd = ServerRoutes()
     sd.clear()
 
-    await asyncio.gather(
-        *[
-            start_server(alias, cfg, base_port + idx)
-            for idx, (alias, cfg) in enumerate(config.items())
-        ]
-    )
+    if settings.sub_proxy_lazy:
+        _lazy_config.clear()
+        _lazy_config.update(config)
+        print(f"Lazy mode: {len(config)} proxies start on first request")
+        if settings.sub_proxy_idle_timeout > 0:
+            await _reap_idle()
+        return
 
-    print(sd.all())
+    await asyncio.gather(*[start_server(alias, cfg) for alias, cfg in config.items()])
+
+    print(dict(sd.all()))
 
     # Keep the event loop alive while servers run
-    await asyncio.gather(*[task for _, task in _running_servers.values()])
+    await asyncio.gather(
+        *[entry.task for entry in _running_servers.values() if entry.task is not None]
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+"""
+A sub-proxy worker process, started by WorkerPool (src/sub_proxy/workers.py).
+
+Serves its aliases under /v1/{alias}/ on one port, and a small control API
+under /_worker/ that the gateway uses to start and stop aliases:
+
+    GET    /_worker/health
+    PUT    /_worker/aliases/{alias}   body: the alias config
+    DELETE /_worker/aliases/{alias}
+
+    python -m src.sub_proxy.worker --fd 3 --scan-fd 4
+
+The listening socket is inherited from the gateway (--fd), which keeps it
+open across worker restarts. Scan records are not written to scan.db here:
+they go to the gateway over the --scan-fd pipe, and its writer is the only
+one that touches the database.
+"""
+
+from config import settings  # always import first for telemetry
+from src.sub_proxy.test import DrainableApp, MultiplexApp, _start_lifespan, create_app
+from src.gateway.models import mount_proxy, tune_proxy, unmount_proxy
+from src.sub_proxy.workers import TOKEN_ENV, TOKEN_HEADER
+from src.gateway.upstreams import config_digest
+from src.analyzer.writer import pipe_sink, scan_writer
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+from fastmcp import FastMCP
+import argparse
+import asyncio
+import uvicorn
+import socket
+import hmac
+import os
+
+
+class WorkerApp:
+    def __init__(self, token: str):
+        self.token = token
+        self.mux = MultiplexApp()
+        # alias -> (config digest, upstream, handler, lifespan task, stop event)
+        self.entries: dict[str, tuple] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/_worker/"):
+            response = await self.control(Request(scope, receive))
+            return await response(scope, receive, send)
+        await self.mux(scope, receive, send)
+
+    async def control(self, request: Request) -> JSONResponse:
+        if not hmac.compare_digest(request.headers.get(TOKEN_HEADER, ""), self.token):
+            return JSONResponse({"detail": "Forbidden"}, status_code=403)
+
+        path = request.url.path
+        if path == "/_worker/health":
+            return JSONResponse({"pid": os.getpid(), "aliases": list(self.entries)})
+
+        alias = path.removeprefix("/_worker/aliases/")
+        if alias == path or not alias:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+
+        try:
+            if request.method == "PUT":
+                await self.start(alias, await request.json())
+            elif request.method == "DELETE":
+                await self.stop(alias)
+            else:
+                return JSONResponse({"detail": "Method not allowed"}, status_code=405)
+        except Exception as e:
+            print(f"[WORKER] '{alias}' failed: {e}")
+            return JSONResponse({"detail": str(e)}, status_code=500)
+        return JSONResponse({"alias": alias})
+
+    async def start(self, alias: str, cfg: dict):
+        digest = config_digest(cfg)
+        old = self.entries.get(alias)
+        if old is not None and old[0] == digest:
+            # Same upstream; pool/cache/limits edits are applied in place
+            tune_proxy(old[1], alias, cfg)
+            return
+
+        proxy = FastMCP(name=alias)
+        upstream = await mount_proxy(proxy, alias, cfg)
+        app = create_app(proxy, alias)
+        task, stop = await _start_lifespan(app, alias)
+        handler = DrainableApp(app)
+        self.entries[alias] = (digest, upstream, handler, task, stop)
+        self.mux.apps[alias] = handler
+        print(f"[WORKER] Started proxy '{alias}' on port {settings.sub_proxy_port}")
+
+        if old is not None:
+            # Reload: new requests already go to the new app; drain the old one
+            old[2].successor = handler
+            asyncio.create_task(self._close(alias, old[1:]))
+
+    async def stop(self, alias: str):
+        entry = self.entries.pop(alias, None)
+        if entry is None:
+            return
+        self.mux.apps.pop(alias, None)
+        await self._close(alias, entry[1:])
+
+    async def _close(self, alias: str, entry: tuple):
+        upstream, handler, task, stop = entry
+        await handler.drain(settings.sub_proxy_drain_timeout)
+        stop.set()
+        try:
+            await asyncio.wait_for(task, timeout=10)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            task.cancel()
+        await unmount_proxy(upstream)
+        print(f"[WORKER] Stopped proxy '{alias}'")
+
+    async def aclose(self):
+        await asyncio.gather(*(self.stop(alias) for alias in list(self.entries)))
+
+
+async def serve(fd: int, scan_fd: int):
+    sock = socket.socket(fileno=fd)
+    scan_writer.sink = pipe_sink(scan_fd)
+    settings.sub_proxy_port = sock.getsockname()[1]
+    app = WorkerApp(os.environ[TOKEN_ENV])
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+
+    async def watch_parent(parent: int):
+        # Don't outlive the gateway if it dies without stopping us
+        while os.getppid() == parent:
+            await asyncio.sleep(1)
+        server.should_exit = True
+
+    watcher = asyncio.create_task(watch_parent(os.getppid()))
+    try:
+        await server.serve(sockets=[sock])
+    finally:
+        watcher.cancel()
+        await app.aclose()
+        await scan_writer.drain()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fd", type=int, required=True)
+    parser.add_argument("--scan-fd", type=int, required=True)
+    args = parser.parse_args()
+    asyncio.run(serve(args.fd, args.scan_fd))
@@ -0,0 +1,256 @@
+from src.analyzer.writer import receive_batches, scan_writer
+from src.sub_proxy.sockets import bind_socket
+from config import settings
+from pathlib import Path
+import secrets
+import asyncio
+import httpx
+import time
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[2]
+
+TOKEN_ENV = "GATEWAY_WORKER_TOKEN"
+TOKEN_HEADER = "x-gateway-worker-token"
+STARTUP_TIMEOUT = 30.0  # seconds for a worker to start answering
+STABLE_AFTER = 60.0  # uptime after which a crash no longer counts as a streak
+
+
+class Worker:
+    def __init__(self, index: int):
+        self.index = index
+        # Held here for the worker's lifetime: a restarted worker reuses the
+        # port, and connections made while it's down wait in the backlog
+        self.socket = bind_socket("127.0.0.1")
+        self.socket.listen(128)
+        self.port = self.socket.getsockname()[1]
+        self.process: asyncio.subprocess.Process | None = None
+        self.aliases: dict[str, dict] = {}  # alias -> config, kept for restarts
+        self.task: asyncio.Task | None = None  # supervisor
+        self.scans: asyncio.Task | None = None  # reads the worker's scan records
+        self.started_at = 0.0
+        self.restarts = 0
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+class WorkerPool:
+    """
+    Worker processes for sub_proxy_mode="workers", each with its own event
+    loop serving its aliases on one port (see src/sub_proxy/worker.py). An
+    alias goes to the least-loaded worker and that worker's port goes into
+    the route table. A worker that dies is restarted on the same port and
+    given its aliases back; the other workers keep serving.
+    """
+
+    def __init__(self):
+        self.workers: list[Worker] = []
+        self._token = secrets.token_urlsafe(24)
+        self._client: httpx.AsyncClient | None = None
+        self._lock: asyncio.Lock | None = None
+        self._closing = False
+
+    def size(self) -> int:
+        return settings.sub_proxy_workers or os.cpu_count() or 1
+
+    async def ensure_started(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.workers:
+                return
+            self._closing = False
+            self._client = httpx.AsyncClient(
+                headers={TOKEN_HEADER: self._token}, timeout=STARTUP_TIMEOUT
+            )
+            workers = [Worker(i) for i in range(self.size())]
+            try:
+                await asyncio.gather(*(self._spawn(w) for w in workers))
+            except BaseException:
+                for w in workers:
+                    if w.alive():
+                        w.process.kill()
+                    w.socket.close()
+                raise
+            for w in workers:
+                w.task = asyncio.create_task(
+                    self._supervise(w), name=f"sub-proxy-worker-{w.index}"
+                )
+            self.workers = workers
+            print(
+                f"[WORKERS] Started {len(workers)} sub-proxy workers on ports "
+                f"{', '.join(str(w.port) for w in workers)}"
+            )
+
+    async def _spawn(self, worker: Worker):
+        path = [str(ROOT), os.environ.get("PYTHONPATH", "")]
+        env = {
+            **os.environ,
+            TOKEN_ENV: self._token,
+            "PYTHONPATH": os.pathsep.join(p for p in path if p),
+        }
+        fd = worker.socket.fileno()
+        # Scan records come back over a pipe; only this process writes scan.db
+        scan_read, scan_write = os.pipe()
+        try:
+            worker.process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "src.sub_proxy.worker",
+                "--fd",
+                str(fd),
+                "--scan-fd",
+                str(scan_write),
+                env=env,
+                pass_fds=(fd, scan_write),
+            )
+        except BaseException:
+            os.close(scan_read)
+            raise
+        finally:
+            os.close(scan_write)
+        worker.scans = asyncio.create_task(
+            receive_batches(scan_read, scan_writer), name=f"worker-{worker.index}-scans"
+        )
+        worker.started_at = time.monotonic()
+
+        try:
+            await self._wait_ready(worker)
+        except BaseException:
+            if worker.alive():
+                worker.process.kill()
+            raise
+
+        # A restarted worker gets its aliases back
+        for alias, cfg in list(worker.aliases.items()):
+            try:
+                await self._put(worker, alias, cfg)
+            except Exception as e:
+                print(
+                    f"[WORKERS] Failed to restore '{alias}' on worker {worker.index}: {e}"
+                )
+
+    async def _wait_ready(self, worker: Worker):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if not worker.alive():
+                raise RuntimeError(
+                    f"Worker {worker.index} exited during startup "
+                    f"(code {worker.process.returncode})"
+                )
+            try:
+                r = await self._client.get(self._url(worker, "health"), timeout=1.0)
+                if r.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+        raise RuntimeError(
+            f"Worker {worker.index} did not start within {STARTUP_TIMEOUT}s"
+        )
+
+    async def _supervise(self, worker: Worker):
+        streak = 0
+        while True:
+            code = await worker.process.wait()
+            if self._closing:
+                return
+
+            worker.restarts += 1
+            uptime = time.monotonic() - worker.started_at
+            streak = 0 if uptime > STABLE_AFTER else streak + 1
+            delay = min(2**streak / 2, 30.0)  # back off on crash loops
+            print(
+                f"[WORKERS] Worker {worker.index} (port {worker.port}) exited with "
+                f"code {code}; restarting in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+            try:
+                await self._spawn(worker)
+            except Exception as e:
+                print(f"[WORKERS] Restart of worker {worker.index} failed: {e}")
+
+    def _url(self, worker: Worker, path: str) -> str:
+        return f"http://127.0.0.1:{worker.port}/_worker/{path}"
+
+    async def _put(self, worker: Worker, alias: str, cfg: dict):
+        r = await self._client.put(self._url(worker, f"aliases/{alias}"), json=cfg)
+        r.raise_for_status()
+
+    def owner(self, alias: str) -> Worker | None:
+        for worker in self.workers:
+            if alias in worker.aliases:
+                return worker
+        return None
+
+    async def assign(self, alias: str, cfg: dict) -> int:
+        """Start `alias` on a worker and return the port it's served on."""
+        await self.ensure_started()
+        worker = self.owner(alias) or min(self.workers, key=lambda w: len(w.aliases))
+
+        # Recorded first, so a crash mid-start still brings it back
+        worker.aliases[alias] = cfg
+        try:
+            await self._put(worker, alias, cfg)
+        except Exception:
+            worker.aliases.pop(alias, None)
+            raise
+        return worker.port
+
+    async def unassign(self, alias: str):
+        worker = self.owner(alias)
+        if worker is None:
+            return
+        del worker.aliases[alias]
+        if worker.alive():
+            try:
+                r = await self._client.delete(self._url(worker, f"aliases/{alias}"))
+                r.raise_for_status()
+            except Exception as e:
+                print(
+                    f"[WORKERS] Failed to stop '{alias}' on worker {worker.index}: {e}"
+                )
+
+    async def aclose(self):
+        self._closing = True
+        workers, self.workers = self.workers, []
+        for worker in workers:
+            if worker.task is not None:
+                worker.task.cancel()
+            if worker.alive():
+                worker.process.terminate()
+
+        for worker in workers:
+            if worker.process is None:
+                continue
+            try:
+                await asyncio.wait_for(worker.process.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                worker.process.kill()
+                await worker.process.wait()
+        for worker in workers:
+            worker.socket.close()
+        # The pipes close as the workers exit; take what they sent on the way
+        scans = [w.scans for w in workers if w.scans is not None]
+        await asyncio.gather(*scans, return_exceptions=True)
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "port": w.port,
+                "pid": w.process.pid if w.process else None,
+                "alive": w.alive(),
+                "aliases": len(w.aliases),
+                "restarts": w.restarts,
+            }
+            for w in self.workers
+        ]
+
+
+worker_pool = WorkerPool()
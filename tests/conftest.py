@@ -0,0 +1,26 @@
+"""
+The gateway reads config.json, temp/ and scan.db from the working
+directory at import time, so every test session runs in a scratch one.
+"""
+
+from pathlib import Path
+import tempfile
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+
+os.chdir(tempfile.mkdtemp(prefix="gateway-tests-"))
+os.makedirs("temp", exist_ok=True)
+Path("config.json").write_text("{}")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+sys.path.insert(0, str(ROOT))
+
+
+def upstream_config(**env) -> dict:
+    """An alias config for the stdio test server in tests/upstream_server.py."""
+    return {
+        "command": sys.executable,
+        "args": [str(ROOT / "tests" / "upstream_server.py")],
+        "env": {k: str(v) for k, v in env.items()},
+    }
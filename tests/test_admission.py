@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+
+from src.gateway.admission import (
+    AdmissionConfig,
+    AdmissionController,
+    Limiter,
+    Rejected,
+)
+
+
+def limiter(**kwargs) -> Limiter:
+    defaults = dict(max_concurrency=1, max_queue=1, queue_timeout=1.0)
+    return Limiter(AdmissionConfig(**{**defaults, **kwargs}))
+
+
+def test_queued_callers_are_admitted_in_order():
+    lim = limiter(max_concurrency=1, max_queue=5)
+    order = []
+
+    async def call(n):
+        started = await lim.acquire()
+        order.append(n)
+        await asyncio.sleep(0.01)
+        lim.release(started)
+
+    async def main_():
+        await asyncio.gather(*(call(n) for n in range(4)))
+
+    asyncio.run(main_())
+    assert order == [0, 1, 2, 3]
+    assert lim.in_flight == 0 and lim.queued == 3
+
+
+def test_full_queue_is_rejected_with_429():
+    lim = limiter(max_concurrency=1, max_queue=1)
+
+    async def main_():
+        held = await lim.acquire()
+        waiter = asyncio.create_task(lim.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as rejected:
+            await lim.acquire()
+        lim.release(held)
+        lim.release(await waiter)
+        return rejected.value
+
+    rejected = asyncio.run(main_())
+    assert rejected.status == 429 and rejected.retry_after >= 1
+    assert lim.rejected_full == 1 and lim.in_flight == 0
+
+
+def test_queue_timeout_is_rejected_with_503():
+    lim = limiter(queue_timeout=0.05)
+
+    async def main_():
+        held = await lim.acquire()
+        with pytest.raises(Rejected) as rejected:
+            await lim.acquire()
+        lim.release(held)
+        return rejected.value
+
+    assert asyncio.run(main_()).status == 503
+    assert lim.in_flight == 0 and lim.stats()["queue_depth"] == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    lim = limiter(max_queue=5)
+
+    async def main_():
+        held = await lim.acquire()
+        gone = asyncio.create_task(lim.acquire())
+        waiting = asyncio.create_task(lim.acquire())
+        await asyncio.sleep(0)
+        gone.cancel()
+        await asyncio.sleep(0)
+        lim.release(held)
+        lim.release(await waiting)
+
+    asyncio.run(main_())
+    assert lim.in_flight == 0 and lim.admitted == 2
+
+
+def test_adaptive_limit_backs_off_on_slow_calls_and_recovers():
+    lim = limiter(
+        max_concurrency=10, adaptive=True, min_concurrency=2, target_latency_ms=100
+    )
+    lim._adapt(500)
+    assert lim.limit == pytest.approx(9.0)
+
+    # At most one decrease per observed latency
+    lim._adapt(500)
+    assert lim.limit == pytest.approx(9.0)
+
+    for _ in range(20):
+        lim._adapt(10)
+    assert lim.limit == 10
+
+
+def test_configure_replaces_limiters_only_on_change():
+    controller = AdmissionController()
+    controller.configure("a", {"limits": {"max_concurrency": 3}})
+    first = controller.get("a", "mcp")
+    assert first.config.max_concurrency == 3
+
+    controller.configure("a", {"limits": {"max_concurrency": 3}})
+    assert controller.get("a", "mcp") is first
+
+    controller.configure("a", {"limits": {"max_concurrency": 5}})
+    assert controller.get("a", "mcp").config.max_concurrency == 5
+    assert controller.get("a", "http") is not controller.get("a", "mcp")
+
+    controller.remove("a")
+    assert controller.get("a", "mcp").config == AdmissionConfig()
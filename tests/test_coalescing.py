@@ -0,0 +1,74 @@
+from starlette.requests import Request
+import asyncio
+import json
+
+import main
+
+
+def request() -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/v1/a", "headers": []})
+
+
+def call(request_id):
+    message = {"jsonrpc": "2.0", "id": request_id, "method": "tools/list"}
+    return main.coalesced_call(
+        "a", request(), json.dumps(message).encode(), message, None
+    )
+
+
+def fake_upstream(monkeypatch, statuses: list[int]):
+    calls = []
+
+    async def fetch(alias, request, body, target_url):
+        request_id = json.loads(body)["id"]
+        calls.append(request_id)
+        await asyncio.sleep(0.05)
+        status = statuses.pop(0)
+        content = json.dumps(
+            {"jsonrpc": "2.0", "id": request_id, "result": {"status": status}}
+        )
+        return status, {"content-type": "application/json"}, content.encode()
+
+    monkeypatch.setattr(main, "fetch_buffered", fetch)
+    return calls
+
+
+def test_followers_share_a_success(monkeypatch):
+    calls = fake_upstream(monkeypatch, [200])
+
+    async def main_():
+        return await asyncio.gather(call(1), call(2))
+
+    first, second = asyncio.run(main_())
+    assert calls == [1]
+    assert json.loads(second.body)["id"] == 2 and second.status_code == 200
+
+
+def test_followers_retry_after_a_leader_error(monkeypatch):
+    calls = fake_upstream(monkeypatch, [503, 200, 200])
+
+    async def main_():
+        return await asyncio.gather(call(1), call(2), call(3))
+
+    responses = asyncio.run(main_())
+    assert [r.status_code for r in responses] == [503, 200, 200]
+    assert sorted(calls) == [1, 2, 3]
+    assert [json.loads(r.body)["id"] for r in responses] == [1, 2, 3]
+
+
+def test_followers_retry_after_a_leader_exception(monkeypatch):
+    async def fetch(alias, request, body, target_url):
+        request_id = json.loads(body)["id"]
+        await asyncio.sleep(0.05)
+        if request_id == 1:
+            raise main.HTTPException(status_code=502)
+        return 200, {}, json.dumps({"id": request_id}).encode()
+
+    monkeypatch.setattr(main, "fetch_buffered", fetch)
+
+    async def main_():
+        return await asyncio.gather(call(1), call(2), return_exceptions=True)
+
+    leader, follower = asyncio.run(main_())
+    assert isinstance(leader, main.HTTPException)
+    assert follower.status_code == 200
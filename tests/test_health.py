@@ -0,0 +1,101 @@
+import asyncio
+import socket
+import pytest
+
+from config import settings
+from src.gateway import health as health_module
+from src.gateway.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthMonitor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(health_module.time, "monotonic", clock)
+    monkeypatch.setattr(settings, "breaker_window", 10)
+    monkeypatch.setattr(settings, "breaker_min_calls", 4)
+    monkeypatch.setattr(settings, "breaker_failure_rate", 0.5)
+    monkeypatch.setattr(settings, "breaker_open_seconds", 15.0)
+    monkeypatch.setattr(settings, "breaker_slow_call_ms", 1000.0)
+    return clock
+
+
+def test_breaker_trips_at_the_failure_rate(clock):
+    breaker = CircuitBreaker("a/upstream")
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == CLOSED  # fewer than breaker_min_calls
+
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.trips == 1
+    assert not breaker.allow() and breaker.rejected == 1
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker("a/upstream")
+    for _ in range(4):
+        breaker.record(True, latency_ms=5000)
+    assert breaker.state == OPEN
+    assert "slow call" in breaker.reason
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker("a/upstream")
+    breaker.trip("down")
+    assert not breaker.allow()
+
+    clock.now += 15
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker("a/upstream")
+    breaker.trip("down")
+    clock.now += 15
+    assert breaker.allow()
+
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.is_open()
+    assert breaker.retry_after() == 15
+
+
+def test_abandoned_trial_frees_the_slot(clock):
+    breaker = CircuitBreaker("a/upstream")
+    breaker.half_open()
+    assert breaker.allow()
+    breaker.abandon_trial()
+    assert breaker.allow()
+
+
+def test_probes_trip_and_recover_breakers(clock):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+
+    monitor = HealthMonitor()
+    monitor.watch_port("a", port)
+    breaker = monitor.breaker("a", "sub_proxy")
+    breaker.trip("down")
+
+    asyncio.run(monitor.probe_all())
+    assert breaker.state == HALF_OPEN and breaker.last_probe[0]
+
+    listener.close()
+    asyncio.run(monitor.probe_all())
+    assert breaker.state == OPEN and not breaker.last_probe[0]
+
+    monitor.unwatch("a")
+    assert monitor.describe("a") == {}
@@ -0,0 +1,102 @@
+from opentelemetry import trace
+from types import SimpleNamespace
+import asyncio
+import pytest
+
+from config import settings
+from src.analyzer.filters import ScanFailure, ScanSuccess
+from src.gateway import middleware
+
+tracer = trace.get_tracer("tests.input_scan")
+
+
+@pytest.fixture(params=[False, True], ids=["sequential", "concurrent"])
+def concurrent(request, monkeypatch):
+    monkeypatch.setattr(settings, "concurrent_input_scan", request.param)
+    return request.param
+
+
+def fake_scans(monkeypatch, input_verdict):
+    scanned = []
+
+    async def dynamic_scan(logger, traceparent, text_type, text, server_alias):
+        scanned.append(text_type)
+        await asyncio.sleep(0.01)
+        if text_type == "input":
+            if isinstance(input_verdict, Exception):
+                raise input_verdict
+            return input_verdict
+        return ScanSuccess(result={"threat": False})
+
+    monkeypatch.setattr(middleware, "dynamic_scan", dynamic_scan)
+    return scanned
+
+
+def tools_call(tool: list | None = None):
+    """Run one tools/call through the middleware; `tool` records what the tool saw."""
+    tool = [] if tool is None else tool
+
+    async def call_next(context):
+        tool.append("started")
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            tool.append("cancelled")
+            raise
+        tool.append("finished")
+        return SimpleNamespace(meta={}, content="ok", structured_content=None)
+
+    async def run():
+        context = SimpleNamespace(
+            method="tools/call",
+            message=SimpleNamespace(meta={}, name="echo", arguments={"x": 1}),
+        )
+        with tracer.start_as_current_span("tools/call"):
+            return await middleware.LoggingMiddleware("test").on_message(
+                context, call_next
+            )
+
+    return asyncio.run(run())
+
+
+def test_clean_input_returns_the_result(monkeypatch, concurrent):
+    scanned = fake_scans(monkeypatch, ScanSuccess(result={"threat": False}))
+    assert tools_call().content == "ok"
+    assert sorted(scanned) == ["input", "output"]
+
+
+def test_threat_verdict_blocks_the_call(monkeypatch, concurrent):
+    scanned = fake_scans(monkeypatch, ScanFailure(error="injection", threat=True))
+    tool = []
+    with pytest.raises(Exception, match="Input flagged: injection"):
+        tools_call(tool)
+    assert scanned == ["input"]
+    # Concurrently the call is cancelled mid-flight; sequentially it never starts
+    assert tool == (["started", "cancelled"] if concurrent else [])
+
+
+def test_scanner_error_is_not_a_verdict(monkeypatch, concurrent):
+    scanned = fake_scans(monkeypatch, ScanFailure(error="model down"))
+    assert tools_call().content == "ok"
+    assert sorted(scanned) == ["input", "output"]
+
+
+def test_raising_scan_blocks_the_call(monkeypatch, concurrent):
+    fake_scans(monkeypatch, RuntimeError("boom"))
+    tool = []
+    with pytest.raises(Exception, match="Input flagged: boom"):
+        tools_call(tool)
+    assert "finished" not in tool
+
+
+def test_sequential_scan_finishes_before_the_tool_runs(monkeypatch):
+    monkeypatch.setattr(settings, "concurrent_input_scan", False)
+    order = []
+
+    async def dynamic_scan(logger, traceparent, text_type, text, server_alias):
+        order.append(text_type)
+        return ScanSuccess(result={"threat": False})
+
+    monkeypatch.setattr(middleware, "dynamic_scan", dynamic_scan)
+    tools_call(order)
+    assert order == ["input", "started", "finished", "output"]
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from src.gateway.inventory import InventoryCache
+
+
+class StubProxy:
+    def __init__(self, alias: str):
+        self.alias = alias
+        self.listed = 0
+
+    async def list_tools(self):
+        self.listed += 1
+        return [{"name": f"{self.alias}_tool"}]
+
+    async def list_prompts(self):
+        return []
+
+    async def list_resources(self):
+        return []
+
+    def __str__(self):
+        return self.alias
+
+
+def test_render_lists_each_alias_once():
+    async def main():
+        cache = InventoryCache()
+        old, new = StubProxy("a"), StubProxy("a")
+        cache.render([old, new], lambda alias: {})
+        await asyncio.sleep(0.05)
+
+        body = json.loads(cache.render([old, new], lambda alias: {}))
+        assert list(body) == ["a"]
+        assert body["a"]["inventory"]["state"] == "fresh"
+        assert (old.listed, new.listed) == (0, 1)
+
+    asyncio.run(main())
+
+
+def test_idle_aliases_are_not_relisted():
+    async def main():
+        cache = InventoryCache()
+        running = {"up"}
+        cache.running = lambda alias: alias in running
+        up, idle = StubProxy("up"), StubProxy("idle")
+
+        cache.revalidate([up, idle])
+        body = json.loads(cache.render([up, idle], lambda alias: {}))
+        await asyncio.sleep(0.05)
+        assert (up.listed, idle.listed) == (1, 0)
+        assert body["idle"]["inventory"]["state"] == "idle"
+
+        # Listed again once a request starts it
+        running.add("idle")
+        cache.revalidate([up, idle])
+        await asyncio.sleep(0.05)
+        assert idle.listed == 1
+
+    asyncio.run(main())
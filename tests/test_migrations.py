@@ -0,0 +1,31 @@
+from sqlalchemy import func, select
+
+from src.analyzer.models import (
+    Scan,
+    ScanResult,
+    ScanRollup,
+    SessionLocal,
+    run_migrations,
+)
+
+
+def count(model, **where) -> int:
+    with SessionLocal() as session:
+        query = select(func.count()).select_from(model).filter_by(**where)
+        return session.execute(query).scalar_one()
+
+
+def test_backfills_run_at_startup_not_import():
+    verdict = {"threat": True, "rating": 8.0, "category": "prompt_injection"}
+    with SessionLocal.begin() as session:
+        session.add(Scan(scan_id="legacy", scans={"input": verdict}))
+
+    # Importing the models left the old scan alone
+    assert count(ScanResult, scan_id="legacy") == 0
+
+    run_migrations()
+    assert count(ScanResult, scan_id="legacy") == 1
+    assert count(ScanRollup) == 3  # its minute, hour and day buckets
+
+    run_migrations()  # already applied
+    assert count(ScanResult, scan_id="legacy") == 1
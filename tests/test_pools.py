@@ -0,0 +1,81 @@
+from conftest import upstream_config
+from pathlib import Path
+import asyncio
+import pytest
+import json
+
+from src.gateway.admission import admission
+from src.gateway.pools import AliasPool, PoolConfig, PoolExhausted, upstream_pools
+from src.gateway.upstreams import config_digest
+from src.sub_proxy import test as sub_proxy
+
+
+def test_digest_only_covers_the_upstream_connection():
+    cfg = upstream_config()
+    tuned = {
+        **cfg,
+        "pool": {"max_connections": 2},
+        "cache": {"tools/list": 0},
+        "limits": {"max_concurrency": 1},
+    }
+    assert config_digest(tuned) == config_digest(cfg)
+    assert config_digest(upstream_config(VERSION=2)) != config_digest(cfg)
+
+
+def test_reconfigure_resizes_the_pool_in_place():
+    async def main():
+        pool = AliasPool("resize", PoolConfig(max_connections=2, pool_timeout=0.05))
+        client = pool.client
+        await pool.acquire()
+        await pool.acquire()
+
+        pool.reconfigure(PoolConfig(max_connections=3, pool_timeout=0.05))
+        await pool.acquire()  # the new slot
+        assert pool.client is not client and pool.in_use == 3
+
+        pool.reconfigure(PoolConfig(max_connections=1, pool_timeout=0.05))
+        for _ in range(3):
+            pool.release()
+        await asyncio.sleep(0)
+        await pool.acquire()
+        with pytest.raises(PoolExhausted):
+            await pool.acquire()
+        assert pool.acquired == 4  # same pool, stats carried over
+        pool.release()
+        await pool.aclose()
+
+    asyncio.run(main())
+
+
+def test_tuning_edits_apply_without_a_reload():
+    async def main():
+        alias, cfg = "tuned", upstream_config()
+        config_file = Path("config.json")
+        config_file.write_text(json.dumps({alias: cfg}))
+        try:
+            await sub_proxy.refresh()
+            entry = sub_proxy._running_servers[alias]
+            pool = upstream_pools.get(alias)
+
+            tuned = {
+                **cfg,
+                "pool": {"max_connections": 7},
+                "limits": {"max_concurrency": 3},
+                "cache": {"tools/list": 0},
+            }
+            config_file.write_text(json.dumps({alias: tuned}))
+            await sub_proxy.refresh()
+
+            assert sub_proxy._running_servers[alias] is entry
+            assert entry.config == tuned
+            assert upstream_pools.get(alias) is pool
+            assert pool.config.max_connections == 7
+            assert admission.get(alias, "mcp").config.max_concurrency == 3
+            ttls = [m.ttls for m in entry.upstream.middleware if hasattr(m, "ttls")]
+            assert ttls[0]["tools/list"] == 0
+        finally:
+            config_file.write_text("{}")
+            await sub_proxy.refresh()
+        assert alias not in sub_proxy._running_servers
+
+    asyncio.run(main())
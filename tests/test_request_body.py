@@ -0,0 +1,39 @@
+from conftest import upstream_config
+import logging
+import asyncio
+
+import httpx
+import main
+from src.sub_proxy import test as sub_proxy
+
+
+def test_oversized_chunked_body_is_rejected_before_dispatch(monkeypatch, caplog):
+    monkeypatch.setattr(main.settings, "max_request_body", 1024)
+
+    async def body():
+        for _ in range(8):
+            yield b"x" * 512
+
+    async def run():
+        await sub_proxy.start_server("big", upstream_config())
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://gw"
+            ) as client:
+                response = await client.post(
+                    "/v1/big",
+                    content=body(),
+                    headers={
+                        "accept": "application/json, text/event-stream",
+                        "content-type": "application/json",
+                    },
+                )
+        finally:
+            await sub_proxy.stop_server("big")
+        return response
+
+    with caplog.at_level(logging.ERROR):
+        response = asyncio.run(run())
+    assert response.status_code == 413
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
@@ -0,0 +1,76 @@
+import pytest
+
+from src.gateway import cache
+from src.gateway.cache import ResponseCache, params_hash
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_params_hash_ignores_meta():
+    assert params_hash({"name": "echo", "_meta": {"traceparent": "a"}}) == params_hash(
+        {"name": "echo", "_meta": {"traceparent": "b"}}
+    )
+    assert params_hash({"name": "echo"}) != params_hash({"name": "add"})
+
+
+def test_response_cache_expires_by_ttl(clock):
+    cache = ResponseCache(max_bytes=1024)
+    cache.put(("a", "tools/list", "", ""), ["echo"], ttl=5)
+    assert cache.get(("a", "tools/list", "", "")) == ["echo"]
+
+    clock.now += 5
+    assert cache.get(("a", "tools/list", "", "")) is None
+    assert cache.bytes == 0
+
+
+def test_response_cache_is_bounded_by_size(clock):
+    value = "x" * 40  # 42 bytes serialized
+    cache = ResponseCache(max_bytes=100)
+    cache.put(("a",), value, ttl=60)
+    cache.put(("b",), value, ttl=60)
+    cache.put(("c",), value, ttl=60)
+
+    assert cache.get(("a",)) is None
+    assert cache.bytes == 84 and cache.evictions == 1
+
+    cache.put(("big",), "x" * 200, ttl=60)
+    assert cache.get(("big",)) is None
+    assert cache.get(("b",)) == value
+
+
+def test_response_cache_replacing_a_key_keeps_the_byte_count(clock):
+    cache = ResponseCache(max_bytes=1024)
+    cache.put(("a",), "x" * 10, ttl=60)
+    cache.put(("a",), "x" * 20, ttl=60)
+    assert cache.bytes == 22 and cache.stats()["entries"] == 1
+
+
+def test_response_cache_notify_invalidates_related_methods(clock):
+    cache = ResponseCache(max_bytes=4096)
+    for alias in ("a", "b"):
+        for method in ("tools/list", "prompts/list", "resources/read"):
+            cache.put((alias, method, "", ""), [method], ttl=60)
+
+    cache.notify("a", "notifications/tools/list_changed")
+    assert cache.get(("a", "tools/list", "", "")) is None
+    assert cache.get(("a", "prompts/list", "", "")) == ["prompts/list"]
+    assert cache.get(("b", "tools/list", "", "")) == ["tools/list"]
+
+    cache.notify("a", "notifications/progress")
+    assert cache.get(("a", "resources/read", "", "")) == ["resources/read"]
+
+    cache.notify("b", "notifications/resources/updated")
+    assert cache.get(("b", "resources/read", "", "")) is None
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+
+from src.analyzer.models import (
+    Migration,
+    ScanRecord,
+    SessionLocal,
+    engine,
+    run_migrations,
+    store_many,
+)
+from src.analyzer.views import rollup_graph_state
+
+NOON = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def verdict(category=None, rating=1.0):
+    return {"threat": category is not None, "rating": rating, "category": category}
+
+
+def record(scan_id, alias, category=None, created_at=NOON):
+    return ScanRecord(
+        scan_id, "input", "text", {"p": verdict(category)}, alias, 1, created_at
+    )
+
+
+def graph(**filters):
+    with SessionLocal() as session:
+        return rollup_graph_state(session, "hour", **filters)
+
+
+def test_rollups_filter_by_alias_and_category():
+    store_many(
+        [
+            record("r1", "rollup-a", "prompt_injection"),
+            record("r2", "rollup-a", "prompt_injection"),
+            record("r3", "rollup-a", "data_exfiltration"),
+            record("r4", "rollup-a"),
+            record("r5", "rollup-b", "prompt_injection"),
+            record("r6", "rollup-a", "prompt_injection", NOON + timedelta(days=1)),
+        ]
+    )
+    until = NOON + timedelta(hours=1)
+
+    alias = graph(alias="rollup-a", since=NOON, until=until)
+    assert alias["rating_count"] == 4 and alias["threats"] == 3
+
+    category = graph(category="prompt_injection", since=NOON, until=until)
+    assert category["rating_count"] == 3
+    assert dict(category["threat_types"]) == {"prompt_injection": 3}
+
+    both = graph(alias="rollup-a", category="prompt_injection")
+    assert both["rating_count"] == 3  # both days
+
+    clean = graph(alias="rollup-a", category="", since=NOON, until=until)
+    assert clean["rating_count"] == 1 and clean["threats"] == 0
+
+
+def test_rollups_without_a_category_key_are_rebuilt():
+    store_many([record("old1", "rollup-old", "prompt_injection")])
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE scan_rollups"))
+        conn.execute(
+            text(
+                "CREATE TABLE scan_rollups (granularity VARCHAR, bucket DATETIME, "
+                "alias VARCHAR, state JSON NOT NULL, "
+                "PRIMARY KEY (granularity, bucket, alias))"
+            )
+        )
+    with SessionLocal.begin() as session:
+        session.merge(Migration(name="backfill_scan_rollups"))
+
+    run_migrations()
+    rebuilt = graph(alias="rollup-old", category="prompt_injection")
+    assert rebuilt["rating_count"] == 1
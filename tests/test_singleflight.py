@@ -0,0 +1,114 @@
+from mcp.shared.exceptions import McpError
+from mcp.types import INTERNAL_ERROR, ErrorData
+from types import SimpleNamespace
+import asyncio
+import json
+import pytest
+
+from src.gateway.cache import ResponseCacheMiddleware
+from src.gateway.singleflight import SingleFlight, rewrite_jsonrpc_id
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main_():
+        return await asyncio.gather(*(flight.do(("k",), work) for _ in range(5)))
+
+    assert asyncio.run(main_()) == ["result"] * 5
+    assert len(runs) == 1
+    assert flight.stats()["coalesced"] == 4 and flight.stats()["in_flight"] == 0
+
+
+def test_later_calls_start_a_new_run():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        return len(runs)
+
+    async def main_():
+        return [await flight.do(("k",), work), await flight.do(("k",), work)]
+
+    assert asyncio.run(main_()) == [1, 2]
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main_():
+        return await asyncio.gather(
+            flight.do(("k",), work), flight.do(("k",), work), return_exceptions=True
+        )
+
+    results = asyncio.run(main_())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_a_cancelled_caller_doesnt_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main_():
+        first = asyncio.create_task(flight.do(("k",), work))
+        second = asyncio.create_task(flight.do(("k",), work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main_()) == "result"
+
+
+def test_rewrite_jsonrpc_id_in_json_and_sse():
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "result": {}}).encode()
+    assert json.loads(rewrite_jsonrpc_id(body, "application/json", 7))["id"] == 7
+
+    sse = b"event: message\r\ndata: " + body + b"\r\n\r\n"
+    rewritten = rewrite_jsonrpc_id(sse, "text/event-stream", 7)
+    data = [line for line in rewritten.split(b"\n") if line.startswith(b"data:")]
+    assert json.loads(data[0][5:])["id"] == 7
+    assert rewritten.startswith(b"event: message\r\n")
+
+
+def test_mcp_followers_retry_after_a_leader_error():
+    middleware = ResponseCacheMiddleware("flaky", {})
+    calls = []
+
+    async def call_next(context):
+        calls.append(context.name)
+        await asyncio.sleep(0.05)
+        if context.name == "leader":
+            raise McpError(ErrorData(code=INTERNAL_ERROR, message="queue full"))
+        return context.name
+
+    def call(name):
+        context = SimpleNamespace(method="tools/list", message={}, name=name)
+        return middleware.on_message(context, call_next)
+
+    async def main_():
+        leader = asyncio.create_task(call("leader"))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(
+            leader, call("f1"), call("f2"), return_exceptions=True
+        )
+
+    leader, *followers = asyncio.run(main_())
+    assert isinstance(leader, McpError)
+    assert followers == ["f1", "f2"]
+    assert sorted(calls) == ["f1", "f2", "leader"]
@@ -0,0 +1,131 @@
+from conftest import upstream_config
+import asyncio
+
+from src.gateway.models import mount_proxy, unmount_proxy
+from src.gateway.upstreams import upstreams
+from src.sub_proxy import test as sub_proxy
+from fastmcp import FastMCP, Client
+
+
+def refs(alias: str) -> dict:
+    return {
+        k.split("@")[1]: v["refs"]
+        for k, v in upstreams.stats().items()
+        if k.startswith(f"{alias}@")
+    }
+
+
+def test_reload_keeps_old_upstream_until_drained():
+    async def main():
+        alias = "reload"
+        old_cfg, new_cfg = upstream_config(), upstream_config(VERSION=2)
+        gateway = FastMCP("gateway")
+        await mount_proxy(gateway, alias, old_cfg)
+        await sub_proxy.start_server(alias, old_cfg)
+        old = sub_proxy._running_servers[alias]
+
+        # A request still running on the old sub-proxy
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+
+        old.handler.app = slow_app
+        in_flight = asyncio.create_task(old.handler({"type": "http"}, None, None))
+        await asyncio.sleep(0)
+
+        # What POST /new does with a changed config
+        for p in [p for p in gateway.proxies if p.alias == alias]:
+            await unmount_proxy(p, gateway)
+        await mount_proxy(gateway, alias, new_cfg)
+        await sub_proxy.reload_server(alias, new_cfg)
+        retire = next(
+            t for t in asyncio.all_tasks() if t.get_name() == f"retire-{alias}"
+        )
+
+        await asyncio.sleep(0.1)
+        assert not retire.done()
+        assert refs(alias)[old.digest] == 1  # the draining sub-proxy's
+        async with Client(old.upstream) as client:
+            assert (await client.call_tool("echo", {"text": "hi"})).data == "hi"
+
+        release.set()
+        await in_flight
+        await retire
+        assert old.digest not in refs(alias)
+
+        await sub_proxy.stop_server(alias)
+        for p in list(gateway.proxies):
+            await unmount_proxy(p, gateway)
+        assert refs(alias) == {}
+
+    asyncio.run(main())
+
+
+def test_restart_waits_for_stop(monkeypatch):
+    from src.gateway.pools import upstream_pools
+    from config import settings
+
+    monkeypatch.setattr(settings, "sub_proxy_mode", "port")
+    monkeypatch.setattr(settings, "sub_proxy_lazy", True)
+
+    async def main():
+        alias, cfg = "restart", upstream_config()
+        gateway = FastMCP("gateway")
+        await mount_proxy(gateway, alias, cfg)
+        monkeypatch.setitem(sub_proxy._lazy_config, alias, cfg)
+        first = await sub_proxy.ensure_started(alias)
+
+        # An idle stop and the next request's start, interleaved
+        stop = asyncio.create_task(sub_proxy.stop_server(alias, idle=True))
+        await asyncio.sleep(0)
+        assert alias in sub_proxy._stopping
+        second = await sub_proxy.ensure_started(alias)
+        await stop
+
+        assert second is not first and sub_proxy._running_servers[alias] is second
+        assert sub_proxy.ServerRoutes().get(alias) == second.port
+        assert alias in upstream_pools.stats()
+        assert not sub_proxy._stopping
+        async with Client(second.upstream) as client:
+            assert (await client.call_tool("echo", {"text": "hi"})).data == "hi"
+
+        await sub_proxy.stop_server(alias)
+        for p in list(gateway.proxies):
+            await unmount_proxy(p, gateway)
+
+    asyncio.run(main())
+
+
+def test_reaper_skips_alias_with_mcp_call_running(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "sub_proxy_idle_timeout", 0.5)
+
+    async def main():
+        alias, cfg = "reap", upstream_config()
+        gateway = FastMCP("gateway")
+        await mount_proxy(gateway, alias, cfg)
+        await sub_proxy.start_server(alias, cfg)
+        entry = sub_proxy._running_servers[alias]
+        entry.last_used -= 60  # no /v1 traffic for a minute
+        shared = upstreams.find(entry.upstream)
+
+        reaper = asyncio.create_task(sub_proxy._reap_idle())
+        async with Client(gateway) as client:
+            # Spans the reaper's first pass, one second in
+            call = client.call_tool("reap_report", {"label": "x", "delay": 1.5})
+            assert (await call).data == "x"
+            assert sub_proxy._running_servers.get(alias) is entry
+            assert shared.client.is_connected()
+
+        # Once the /mcp call has been idle for the timeout, it is put to sleep
+        await asyncio.sleep(1.5)
+        assert alias not in sub_proxy._running_servers
+        assert not shared.client.is_connected()
+
+        reaper.cancel()
+        for p in list(gateway.proxies):
+            await unmount_proxy(p, gateway)
+
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+from conftest import upstream_config
+import asyncio
+
+from src.gateway.models import mount_proxy, unmount_proxy
+from src.gateway.upstreams import upstreams
+from fastmcp import FastMCP, Client
+
+
+def shared_stats(alias: str) -> dict:
+    return next(v for k, v in upstreams.stats().items() if k.startswith(f"{alias}@"))
+
+
+def test_surfaces_share_one_upstream():
+    async def main():
+        gateway, sub = FastMCP("gateway"), FastMCP("sub")
+        cfg = upstream_config()
+        proxy = await mount_proxy(gateway, "shared", cfg)
+        assert await mount_proxy(sub, "shared", cfg) is proxy
+        assert gateway.proxies == [proxy] and sub.proxies == [proxy]
+
+        async with Client(gateway) as client:
+            assert (await client.call_tool("shared_echo", {"text": "hi"})).data == "hi"
+        async with Client(sub) as client:
+            await client.list_tools()
+        assert shared_stats("shared") == {
+            "refs": 2,
+            "connected": True,
+            "connects": 1,
+            "in_flight": 0,
+        }
+
+        await unmount_proxy(proxy, sub)
+        assert shared_stats("shared")["refs"] == 1
+        await unmount_proxy(proxy, gateway)
+        assert not any(k.startswith("shared@") for k in upstreams.stats())
+
+    asyncio.run(main())
+
+
+def test_readding_alias_releases_one_reference():
+    async def main():
+        gateway, sub = FastMCP("gateway"), FastMCP("sub")
+        cfg = upstream_config()
+        proxy = await mount_proxy(gateway, "readd", cfg)
+        await mount_proxy(sub, "readd", cfg)
+        async with Client(gateway) as client:
+            await client.list_tools()
+
+        # What POST /new does for an alias that's already mounted
+        for p in [p for p in gateway.proxies if p.alias == "readd"]:
+            await unmount_proxy(p, gateway)
+        assert await mount_proxy(gateway, "readd", cfg) is proxy
+
+        assert gateway.proxies == [proxy] and sub.proxies == [proxy]
+        assert shared_stats("readd") == {
+            "refs": 2,
+            "connected": True,
+            "connects": 1,
+            "in_flight": 0,
+        }
+        async with Client(gateway) as client:
+            names = [t.name for t in await client.list_tools()]
+        assert sorted(names) == ["readd_add_tool", "readd_echo", "readd_report"]
+
+        await unmount_proxy(proxy, gateway)
+        await unmount_proxy(proxy, sub)
+
+    asyncio.run(main())
+
+
+def test_list_changed_invalidates_cached_listing():
+    from src.gateway.cache import response_cache
+
+    def cached(alias):
+        return [
+            k for k in response_cache._data if k[0] == alias and k[1] == "tools/list"
+        ]
+
+    async def main():
+        gateway = FastMCP("gateway")
+        proxy = await mount_proxy(gateway, "notify", upstream_config())
+        async with Client(proxy) as client:
+            await client.list_tools()
+            assert cached("notify")
+
+            # The upstream sends notifications/tools/list_changed
+            await client.call_tool("add_tool", {})
+            await asyncio.sleep(0.2)
+            assert not cached("notify")
+
+        await unmount_proxy(proxy, gateway)
+
+    asyncio.run(main())
+
+
+def test_logs_and_progress_reach_the_calling_client():
+    async def main():
+        gateway = FastMCP("gateway")
+        proxy = await mount_proxy(gateway, "report", upstream_config())
+        seen = {"a": [], "b": []}
+
+        def client_for(label):
+            async def log_handler(message):
+                seen[label].append(("log", message.data["msg"]))
+
+            async def progress_handler(progress, total, message):
+                seen[label].append(("progress", message))
+
+            return Client(
+                gateway, log_handler=log_handler, progress_handler=progress_handler
+            )
+
+        async with client_for("a") as a, client_for("b") as b:
+            await a.call_tool("report_report", {"label": "a"})
+            assert seen["a"] == [("log", "working on a"), ("progress", "a")]
+
+            # Calls overlapping on the shared session: each caller still gets
+            # its own progress, and no one gets another caller's log
+            seen["a"].clear()
+            await asyncio.gather(
+                a.call_tool("report_report", {"label": "a", "delay": 0.2}),
+                b.call_tool("report_report", {"label": "b", "delay": 0.2}),
+            )
+        assert ("progress", "a") in seen["a"] and ("progress", "b") in seen["b"]
+        assert all(item[1].endswith("a") for item in seen["a"])
+        assert all(item[1].endswith("b") for item in seen["b"])
+        assert shared_stats("report")["connects"] == 1
+
+        await unmount_proxy(proxy, gateway)
+
+    asyncio.run(main())
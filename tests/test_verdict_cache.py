@@ -0,0 +1,68 @@
+import pytest
+
+from src.analyzer import cache
+from src.analyzer.cache import VerdictCache, verdict_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_verdict_key_ignores_policy_order_but_not_revisions():
+    a = verdict_key("text", "input", ["b", "a"], (1, 2))
+    assert a == verdict_key("text", "input", ["a", "b"], (1, 2))
+    assert a != verdict_key("text", "input", ["a", "b"], (1, 3))
+    assert a != verdict_key("text", "output", ["a", "b"], (1, 2))
+    assert a != verdict_key("other", "input", ["a", "b"], (1, 2))
+
+
+def test_verdict_cache_expires_entries(clock):
+    cache = VerdictCache(max_entries=10, ttl=60)
+    cache.put(("k",), "clean")
+    assert cache.get(("k",)) == "clean"
+
+    clock.now += 60
+    assert cache.get(("k",)) is None
+    assert cache.stats()["evictions"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_verdict_cache_evicts_least_recently_used(clock):
+    cache = VerdictCache(max_entries=2, ttl=60)
+    cache.put(("a",), 1)
+    cache.put(("b",), 2)
+    cache.get(("a",))
+    cache.put(("c",), 3)
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == 1 and cache.get(("c",)) == 3
+
+
+def test_verdict_cache_disabled_at_zero_entries(clock):
+    cache = VerdictCache(max_entries=0, ttl=60)
+    cache.put(("a",), 1)
+    assert cache.get(("a",)) is None
+
+
+def test_verdict_cache_invalidates_by_policy(clock):
+    cache = VerdictCache(max_entries=10, ttl=60)
+    both = verdict_key("x", "input", ["pi", "exfil"], ())
+    pi = verdict_key("y", "input", ["pi"], ())
+    exfil = verdict_key("z", "input", ["exfil"], ())
+    for key in (both, pi, exfil):
+        cache.put(key, "clean")
+
+    assert cache.invalidate_policy("pi") == 2
+    assert cache.get(both) is None and cache.get(pi) is None
+    assert cache.get(exfil) == "clean"
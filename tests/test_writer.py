@@ -0,0 +1,30 @@
+import asyncio
+import os
+
+from src.analyzer.models import ScanRecord
+from src.analyzer.writer import ScanWriter, pipe_sink, receive_batches
+
+
+def test_worker_records_reach_the_gateway_writer():
+    async def main():
+        stored = []
+        gateway = ScanWriter(max_queue=100, batch_size=10, flush_interval=0.01)
+        gateway.sink = stored.extend
+
+        read_fd, write_fd = os.pipe()
+        worker = ScanWriter(max_queue=100, batch_size=3, flush_interval=0.01)
+        worker.sink = pipe_sink(write_fd)
+        receiving = asyncio.create_task(receive_batches(read_fd, gateway))
+
+        for i in range(7):
+            await worker.enqueue(
+                ScanRecord(f"scan-{i}", "input", "text", {}, alias="a")
+            )
+        await worker.drain()
+        worker.sink = None  # the worker exits, closing its end of the pipe
+        await receiving
+        await gateway.drain()
+
+        assert [r.scan_id for r in stored] == [f"scan-{i}" for i in range(7)]
+
+    asyncio.run(main())
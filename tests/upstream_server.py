@@ -0,0 +1,32 @@
+"""A small stdio MCP server the tests use as an upstream."""
+
+from fastmcp import FastMCP, Context
+import mcp.types
+import asyncio
+
+server = FastMCP("test-upstream")
+
+
+@server.tool
+def echo(text: str) -> str:
+    return text
+
+
+@server.tool
+async def add_tool(ctx: Context) -> str:
+    """Tell the client the tool list changed."""
+    await ctx.send_notification(mcp.types.ToolListChangedNotification())
+    return "ok"
+
+
+@server.tool
+async def report(ctx: Context, label: str = "", delay: float = 0.0) -> str:
+    """Send a log message and progress for this call, then answer."""
+    await ctx.info(f"working on {label}")
+    await asyncio.sleep(delay)
+    await ctx.report_progress(1.0, 1.0, label)
+    return label
+
+
+if __name__ == "__main__":
+    server.run(transport="stdio", show_banner=False)